@@ -25,6 +25,16 @@ class Settings(BaseSettings):
     GRAPH_QUERY_URL: str | None = None
     CODE_ANALYST_URL: str | None = None
 
+    # Sharded indexing: explicit indexer replica URLs, or the number of
+    # parallel connections to INDEXER_URL (replicas behind one service name,
+    # which picks the replica per connection). Each replica gets
+    # INDEX_SHARDS_PER_REPLICA shards on average; a failed shard is retried
+    # up to INDEX_SHARD_RETRIES times on the next URL (a new connection).
+    INDEXER_URLS: list[str] = []
+    INDEXER_REPLICAS: int = 1
+    INDEX_SHARDS_PER_REPLICA: int = 4
+    INDEX_SHARD_RETRIES: int = 2
+
     model_config = SettingsConfigDict(
         env_file=str(ENV_FILE),
         env_file_encoding="utf-8",
@@ -57,7 +67,13 @@ def get_code_analyst_path() -> str:
         return settings.CODE_ANALYST_URL
     return str(PROJECT_ROOT / "code-analyst-agent" / "code_analyst_mcp.py")
 
+def get_indexer_replicas() -> list[str]:
+    if settings.INDEXER_URLS:
+        return settings.INDEXER_URLS
+    return [get_indexer_path()] * max(settings.INDEXER_REPLICAS, 1)
+
 ORCHESTRATOR_MCP = get_orchestrator_path()
 INDEXER_MCP = get_indexer_path()
 GRAPH_QUERY_MCP = get_graph_query_path()
 CODE_ANALYST_MCP = get_code_analyst_path()
+INDEXER_REPLICAS = get_indexer_replicas()
@@ -13,10 +13,12 @@ async def start_index():
 
 @router.post("/api/index")
 async def index_repo(req: Optional[IndexRequest] = None):
-    """Start indexing with optional custom path."""
+    """Start indexing with optional custom path, path policy and repository."""
     path = req.path if req else None
     incremental = req.incremental if req else False
-    job_id = await start_indexing(path, incremental)
+    policy = req.dict(include={"include", "exclude", "max_file_bytes"}, exclude_none=True) if req else {}
+    repo = req.dict(include={"repo_url", "ref", "namespace"}, exclude_none=True) if req else {}
+    job_id = await start_indexing(path, incremental, policy, repo)
     return {"job_id": job_id}
 
 @router.get("/api/index/status/{job_id}")
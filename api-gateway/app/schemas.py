@@ -13,3 +13,12 @@ class ChatResponse(BaseModel):
 class IndexRequest(BaseModel):
     path: str
     incremental: bool = False
+    # Path policy overrides; None keeps the indexer's configured defaults
+    include: Optional[list[str]] = None
+    exclude: Optional[list[str]] = None
+    max_file_bytes: Optional[int] = None
+    # Repository to index (default: the indexer's FASTAPI_REPO_URL), branch or
+    # tag, and the graph namespace its nodes are kept under (default: repo name)
+    repo_url: Optional[str] = None
+    ref: Optional[str] = None
+    namespace: Optional[str] = None
@@ -2,13 +2,15 @@ import uuid
 import asyncio
 from fastmcp import Client
 from app.state import state, IndexJobStatus, IndexJob
-from app.config import INDEXER_MCP
+from app.config import INDEXER_REPLICAS, settings
 
 
-async def start_indexing(path: str = None, incremental: bool = False):
+async def start_indexing(
+    path: str = None, incremental: bool = False, policy: dict | None = None, repo: dict | None = None
+):
     """Start an indexing job in the background."""
     job_id = str(uuid.uuid4())
-    job = IndexJob(job_id, path or "default", incremental)
+    job = IndexJob(job_id, path or "default", incremental, policy, repo)
     state.index_jobs[job_id] = job
     job.update(IndexJobStatus.RUNNING)
 
@@ -18,22 +20,137 @@ async def start_indexing(path: str = None, incremental: bool = False):
     return job_id
 
 
+STAT_KEYS = ("indexed_files", "failed_files", "statements", "rows", "cache_hits", "cache_misses")
+# Per-replica memory high-water marks: the job reports the highest shard
+PEAK_KEYS = ("peak_inflight_bytes", "peak_rss_bytes", "workers_peak_rss_bytes")
+
+
+def _split(files: list[str], count: int) -> list[list[str]]:
+    """Split the file list into `count` contiguous, near-equal shards."""
+    count = max(1, min(count, len(files)))
+    size, extra = divmod(len(files), count)
+    shards, start = [], 0
+    for i in range(count):
+        end = start + size + (1 if i < extra else 0)
+        shards.append(files[start:end])
+        start = end
+    return [shard for shard in shards if shard]
+
+
+async def _index_shard(job: IndexJob, index: int, paths: list[str], plan: dict, slot: int) -> dict | None:
+    """
+    Index one shard, starting on the worker's own endpoint and moving to the
+    next endpoint on each failure. Returns the shard result, or None once
+    INDEX_SHARD_RETRIES retries are exhausted.
+
+    Endpoints repeat when INDEXER_URLS is empty (INDEXER_REPLICAS workers
+    share INDEXER_URL), so the shard records `replica` as reported by the
+    indexer that ran it, not the endpoint it was sent to.
+    """
+    for attempt in range(settings.INDEX_SHARD_RETRIES + 1):
+        endpoint = INDEXER_REPLICAS[(slot + attempt) % len(INDEXER_REPLICAS)]
+        job.update_shard(index, status="running", endpoint=endpoint, replica=None, attempts=attempt + 1)
+        try:
+            async with Client(endpoint) as client:
+                result = await client.call_tool("index_files", {
+                    "paths": paths, "generation": plan["generation"], "commit": plan["commit"],
+                    **job.repo,
+                })
+        except Exception as e:
+            job.update_shard(index, status="retrying", error=str(e))
+            continue
+        job.update_shard(
+            index, status="completed", error=None, replica=result.data.get("replica"),
+            **{key: result.data.get(key, 0) for key in ("indexed_files", "failed_files", "checkpointed_files")},
+        )
+        return result.data
+    job.update_shard(index, status="failed")
+    return None
+
+
 async def _run_indexer(job_id: str):
     """
-    Run the indexer MCP agent using the FastMCP Client.
-    
-    The index_repo tool uses the configured FASTAPI_REPO_URL from settings,
-    so no parameters are needed.
+    Run a sharded index over the indexer MCP replicas using the FastMCP Client.
+
+    One replica prepares the run (clone update, file list for the requested
+    repository or the configured FASTAPI_REPO_URL, incremental diff, path
+    policy overrides), the files are split into shards that replicas index
+    concurrently, and the run is finalized (stale-entity sweep, indexed
+    commit) once every shard is done. Every call carries the job's
+    repo_url/ref/namespace.
     """
     job = state.index_jobs.get(job_id)
     if not job:
         return
 
     try:
-        async with Client(INDEXER_MCP) as client:
-            # index_repo takes no parameters - uses configured repo URL
-            result = await client.call_tool("index_repo", {})
-            job.update(IndexJobStatus.COMPLETED)
+        # Resubmitting a job for a commit whose run was interrupted resumes it:
+        # prepare_index only returns the files that are not checkpointed yet
+        job.set_phase("preparing")
+        async with Client(INDEXER_REPLICAS[0]) as client:
+            result = await client.call_tool(
+                "prepare_index", {"incremental": job.incremental, **job.policy, **job.repo}
+            )
+        plan = result.data
+        files = plan.pop("files")
+        if plan.get("graph_backend") == "memory" and len(INDEXER_REPLICAS) > 1:
+            # Each replica would write to a graph of its own
+            raise RuntimeError(
+                f"The indexer runs GRAPH_BACKEND=memory, which needs a single replica; "
+                f"got {len(INDEXER_REPLICAS)} (INDEXER_URLS/INDEXER_REPLICAS)"
+            )
+
+        shards = _split(files, len(INDEXER_REPLICAS) * settings.INDEX_SHARDS_PER_REPLICA)
+        job.shards = [
+            {"shard": i, "files": len(paths), "status": "pending", "endpoint": None, "replica": None, "attempts": 0}
+            for i, paths in enumerate(shards)
+        ]
+
+        # One worker per replica slot pulls shards until none are left
+        job.set_phase("indexing")
+        queue: asyncio.Queue = asyncio.Queue()
+        for i, paths in enumerate(shards):
+            queue.put_nowait((i, paths))
+        results: dict[int, dict | None] = {}
+
+        async def worker(slot: int):
+            while not queue.empty():
+                i, paths = queue.get_nowait()
+                results[i] = await _index_shard(job, i, paths, plan, slot)
+
+        await asyncio.gather(*[worker(slot) for slot in range(len(INDEXER_REPLICAS))])
+
+        totals = {key: 0 for key in STAT_KEYS + PEAK_KEYS}
+        failed: list[dict] = []
+        for i, paths in enumerate(shards):
+            shard = results.get(i)
+            if shard is None:
+                # Shard never made it through: count all of its files as failed
+                totals["failed_files"] += len(paths)
+                failed += [{"file": p, "stage": "shard", "error": job.shards[i].get("error")} for p in paths]
+                continue
+            for key in STAT_KEYS:
+                totals[key] += shard.get(key, 0)
+            for key in PEAK_KEYS:
+                totals[key] = max(totals[key], shard.get(key, 0))
+            failed += shard.get("failed", [])
+
+        failed_paths = {f["file"] for f in failed}
+        job.set_phase("finalizing")
+        async with Client(INDEXER_REPLICAS[0]) as client:
+            result = await client.call_tool("finalize_index", {
+                "commit": plan["commit"],
+                "generation": plan["generation"],
+                "indexed": [p for p in files if p not in failed_paths],
+                "failed_files": totals["failed_files"],
+                "incremental": job.incremental,
+                **job.repo,
+            })
+        plan["swept"] = result.data
+
+        job.update(IndexJobStatus.COMPLETED, result={
+            **plan, **totals, "shards": len(shards), "failed": failed,
+        })
     except Exception as e:
             job.update(IndexJobStatus.FAILED, error=str(e))
 
@@ -47,6 +164,9 @@ async def get_job_status(job_id: str):
     return {
         "job_id": job.job_id,
         "status": job.status,
+        "phase": job.phase,
         "error": job.error,
+        "result": job.result,
+        "shards": job.shards,
         "updated_at": job.updated_at,
     }
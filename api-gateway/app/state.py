@@ -9,19 +9,39 @@ class IndexJobStatus(str, Enum):
     FAILED = "failed"
 
 class IndexJob:
-    def __init__(self, job_id: str, path: str, incremental: bool):
+    def __init__(
+        self, job_id: str, path: str, incremental: bool, policy: dict | None = None, repo: dict | None = None
+    ):
         self.job_id = job_id
         self.path = path
         self.incremental = incremental
+        self.policy = policy or {}
+        # repo_url / ref / namespace, passed to every indexer call of the run
+        self.repo = repo or {}
         self.status = IndexJobStatus.PENDING
         self.created_at = datetime.utcnow()
         self.updated_at = datetime.utcnow()
         self.error: str | None = None
+        self.result: dict | None = None
+        # preparing → indexing → finalizing while RUNNING
+        self.phase: str | None = None
+        # Per-shard progress of sharded runs: files, status, endpoint, replica, attempts, ...
+        self.shards: list[dict] = []
 
-    def update(self, status: IndexJobStatus, error: str | None = None):
+    def update(self, status: IndexJobStatus, error: str | None = None, result: dict | None = None):
         self.status = status
         self.updated_at = datetime.utcnow()
         self.error = error
+        if result is not None:
+            self.result = result
+
+    def set_phase(self, phase: str):
+        self.phase = phase
+        self.updated_at = datetime.utcnow()
+
+    def update_shard(self, index: int, **fields):
+        self.shards[index].update(fields)
+        self.updated_at = datetime.utcnow()
 
 class AppState:
     def __init__(self):
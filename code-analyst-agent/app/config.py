@@ -25,6 +25,11 @@ class Settings(BaseSettings):
     NEO4J_USER: str = "neo4j"
     NEO4J_PASSWORD: str = "password"
 
+    # Graph backend: "neo4j", or "memory" (reads the snapshot the indexer
+    # saves to GRAPH_SNAPSHOT, reloaded whenever it changes)
+    GRAPH_BACKEND: str = "neo4j"
+    GRAPH_SNAPSHOT: str = ""
+
     model_config = SettingsConfigDict(
         env_file=str(ENV_FILE),
         env_file_encoding="utf-8",
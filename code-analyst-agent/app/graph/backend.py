@@ -0,0 +1,188 @@
+# apps/code-analyst-agent/app/graph/backend.py
+import asyncio
+import os
+import pickle
+from abc import ABC, abstractmethod
+from array import array
+from itertools import islice
+from ..config import settings
+from .driver import fetch_rows
+
+# ---------------------------------------------------------
+# Graph backends. The analyst only resolves entity names to
+# their files and line ranges, through one interface with
+# two implementations:
+#   neo4j   Cypher through app.graph.driver (default)
+#   memory  the snapshot file (GRAPH_SNAPSHOT) the indexer
+#           saves, reloaded whenever it changes
+# Selected with GRAPH_BACKEND. Lookups take a projection:
+# "full" nodes, or "minimal" ones (label, name, qname,
+# file, start, end).
+#
+# The indexer keeps the write side of this module and the
+# query agent the other reads; the memory graph's
+# attributes and snapshot format (SNAPSHOT_VERSION) must
+# match across the copies.
+# ---------------------------------------------------------
+SNAPSHOT_VERSION = 1
+
+PROJECTIONS = ("minimal", "full")
+# Most specific label first; reported as the `label` of minimal nodes
+PRIMARY_LABELS = (
+    "Class", "Method", "Function", "File", "Module", "Import",
+    "Decorator", "Parameter", "Docstring", "Repository",
+)
+
+
+def check_projection(projection: str) -> str:
+    if projection not in PROJECTIONS:
+        raise ValueError(f"Unknown projection: {projection!r}. Allowed: {list(PROJECTIONS)}")
+    return projection
+
+
+def minimal_node(props: dict, labels) -> dict:
+    """The minimal projection of a node; File nodes report their path as `file`."""
+    row = {
+        "label": next((label for label in PRIMARY_LABELS if label in labels), None),
+        "name": props.get("name"),
+        "qname": props.get("qname"),
+        "file": props.get("file", props.get("path")),
+        "start": props.get("start"),
+        "end": props.get("end"),
+    }
+    return {k: v for k, v in row.items() if v is not None}
+
+
+class GraphBackend(ABC):
+    @abstractmethod
+    async def find_by_name(
+        self, name: str, repo: str | None = None, projection: str = "full", skip: int = 0, limit: int | None = None
+    ) -> list[dict]:
+        """Entities whose short or qualified name is `name`."""
+
+    async def close(self):
+        pass
+
+
+# ---------------------------------------------------------
+# Neo4j
+# ---------------------------------------------------------
+def _minimal_cypher(var: str) -> str:
+    # Same fields as minimal_node; nulls are dropped after the query
+    labels = ", ".join(f"'{label}'" for label in PRIMARY_LABELS)
+    return (
+        f"{{label: [label IN [{labels}] WHERE label IN labels({var})][0], name: {var}.name, "
+        f"qname: {var}.qname, file: coalesce({var}.file, {var}.path), start: {var}.start, end: {var}.end}}"
+    )
+
+
+def _compact(node: dict) -> dict:
+    return {k: v for k, v in node.items() if v is not None}
+
+
+def _page(skip: int, limit: int | None) -> str:
+    return "SKIP $skip" + ("" if limit is None else " LIMIT $limit")
+
+
+class Neo4jBackend(GraphBackend):
+    async def find_by_name(self, name, repo=None, projection="full", skip=0, limit=None):
+        # Short name (APIRouter) or qualified name (fastapi.routing.APIRouter)
+        minimal = check_projection(projection) == "minimal"
+        records = await fetch_rows(f"""
+            MATCH (n:Entity)
+            WHERE (n.name = $name OR n.qname = $name)
+              AND ($repo IS NULL OR n.repo = $repo)
+            RETURN {_minimal_cypher("n") if minimal else "n"} AS n
+            {_page(skip, limit)}
+        """, {"name": name, "repo": repo, "skip": skip, "limit": limit})
+        return [_compact(r["n"]) if minimal else r["n"] for r in records]
+
+
+# ---------------------------------------------------------
+# In-memory graph
+# ---------------------------------------------------------
+class MemoryBackend(GraphBackend):
+    """
+    Nodes live in parallel lists indexed by node id, and a dict maps
+    names to ids, so a lookup is a dict access. Read-only: the graph
+    is the indexer's snapshot.
+    """
+
+    def __init__(self, snapshot: str = ""):
+        self.snapshot = snapshot
+        self._snapshot_mtime: int | None = None
+        self._reload = asyncio.Lock()
+        # The snapshot is loaded by the first read
+        self._reset()
+
+    def _reset(self):
+        self.labels: list[set[str] | None] = []
+        self.props: list[dict | None] = []
+        self.ids: dict[tuple, int] = {}
+        self.names: dict[str, array] = {}
+        self.repo_nodes: dict[str, set[int]] = {}
+        self.out: dict[str, dict[int, array]] = {}
+        self.inc: dict[str, dict[int, array]] = {}
+        self.rel_props: dict[tuple[int, str, int], dict] = {}
+
+    def _read_snapshot(self) -> dict:
+        # Written only by our own indexer (GRAPH_SNAPSHOT is a trusted local path)
+        with open(self.snapshot, "rb") as f:
+            return pickle.load(f)
+
+    def _mtime(self) -> int | None:
+        try:
+            return os.stat(self.snapshot).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    async def _refresh(self):
+        """
+        Reload the snapshot if the indexer saved a newer one. It is
+        unpickled off the event loop; reads go on against the old graph
+        meanwhile, and concurrent reads wait for one reload.
+        """
+        if not self.snapshot or self._mtime() in (None, self._snapshot_mtime):
+            return
+        async with self._reload:
+            mtime = self._mtime()
+            if mtime in (None, self._snapshot_mtime):
+                return
+            state = await asyncio.to_thread(self._read_snapshot)
+            self._snapshot_mtime = mtime
+            if state.get("version") != SNAPSHOT_VERSION:
+                print(f"Ignoring graph snapshot {self.snapshot}: version {state.get('version')}")
+                return
+            for name, value in state.items():
+                if name != "version":
+                    setattr(self, name, value)
+
+    def _node(self, node: int, projection: str = "full") -> dict:
+        if projection == "minimal":
+            return minimal_node(self.props[node], self.labels[node])
+        return {k: v for k, v in self.props[node].items() if k != "_key"}
+
+    async def find_by_name(self, name, repo=None, projection="full", skip=0, limit=None):
+        check_projection(projection)
+        await self._refresh()
+        found = (
+            n for n in self.names.get(name, ())
+            if "Entity" in self.labels[n] and (repo is None or self.props[n]["repo"] == repo)
+        )
+        return [self._node(n, projection) for n in islice(found, skip, None if limit is None else skip + limit)]
+
+
+_backend: GraphBackend | None = None
+
+
+def get_backend() -> GraphBackend:
+    """The configured backend (GRAPH_BACKEND), created on first use."""
+    global _backend
+    if _backend is None:
+        if settings.GRAPH_BACKEND == "neo4j":
+            _backend = Neo4jBackend()
+        elif settings.GRAPH_BACKEND == "memory":
+            _backend = MemoryBackend(settings.GRAPH_SNAPSHOT)
+        else:
+            raise ValueError(f"Unknown GRAPH_BACKEND: {settings.GRAPH_BACKEND}")
+    return _backend
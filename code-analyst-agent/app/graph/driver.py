@@ -11,3 +11,24 @@ async def run_query(cypher: str, params: dict = None):
         result = await session.run(cypher, params or {})
         records = await result.data()
         return records
+
+# Records are pulled from the server in batches of this size
+FETCH_SIZE = 1000
+
+async def fetch_rows(cypher: str, params: dict = None, limit: int | None = None, skip: int = 0):
+    """
+    Like run_query, but iterates the result record by record and stops
+    after `skip` + `limit` records; the rest is discarded on the server
+    side instead of being buffered, so memory stays bounded by `limit`.
+    """
+    rows = []
+    async with driver.session(fetch_size=FETCH_SIZE) as session:
+        result = await session.run(cypher, params or {})
+        async for record in result:
+            if skip:
+                skip -= 1
+                continue
+            rows.append(record.data())
+            if limit is not None and len(rows) >= limit:
+                break
+    return rows
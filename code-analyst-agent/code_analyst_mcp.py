@@ -13,38 +13,31 @@ from app.models import (
     ImplementationExplanation,
     ImplementationComparison,
 )
-from app.graph.driver import run_query
+from app.graph.backend import get_backend
 
 mcp = FastMCP(name="Code Analyst Agent")
 
-async def resolve_entity(name: str):
-    # Search across all node types (Class, Function, Method, etc.) that have the required properties
-    result = await run_query("""
-        MATCH (n {name:$name})
-        WHERE n.file IS NOT NULL AND n.start IS NOT NULL AND n.end IS NOT NULL
-        RETURN n.file AS file, n.start AS start, n.end AS end
-        LIMIT 1
-    """, {"name": name})
-    
-    if not result:
-        return None
-    
-    file = result[0].get("file")
-    start = result[0].get("start")
-    end = result[0].get("end")
-    
-    # Validate that we have all required fields (should be guaranteed by WHERE clause, but double-check)
-    if file is None or start is None or end is None:
+RESOLVE_LIMIT = 100
+
+async def resolve_entity(name: str, repo: str | None = None):
+    # Search across all entity types (Class, Function, Method, etc.) that have the required properties,
+    # optionally within one indexed repository (namespace); exact qualified names win.
+    # Common short names (get, run) match thousands of nodes: only the first RESOLVE_LIMIT are read
+    nodes = [
+        n for n in await get_backend().find_by_name(name, repo, limit=RESOLVE_LIMIT)
+        if n.get("file") is not None and n.get("start") is not None and n.get("end") is not None
+    ]
+    if not nodes:
         return None
-    
-    return file, start, end
+    node = next((n for n in nodes if n.get("qname") == name), nodes[0])
+    return node["file"], node["start"], node["end"]
 
 # -----------------------------------------------------------
 # 1) Analyze Function
 # -----------------------------------------------------------
 @mcp.tool
-async def analyze_function(name: str) -> dict:
-    resolved = await resolve_entity(name)
+async def analyze_function(name: str, repo: str | None = None) -> dict:
+    resolved = await resolve_entity(name, repo)
     if not resolved:
         return {"error": f"Entity '{name}' not found in graph database. The entity may not be indexed yet."}
     file, start, end = resolved
@@ -59,8 +52,8 @@ async def analyze_function(name: str) -> dict:
 # 2) Analyze Class
 # -----------------------------------------------------------
 @mcp.tool
-async def analyze_class(name: str) -> dict:
-    resolved = await resolve_entity(name)
+async def analyze_class(name: str, repo: str | None = None) -> dict:
+    resolved = await resolve_entity(name, repo)
     if not resolved:
         return {"error": f"Entity '{name}' not found in graph database. The entity may not be indexed yet."}
     file, start, end = resolved
@@ -75,8 +68,8 @@ async def analyze_class(name: str) -> dict:
 # 3) Detect Patterns
 # -----------------------------------------------------------
 @mcp.tool
-async def find_patterns(name: str) -> dict:
-    resolved = await resolve_entity(name)
+async def find_patterns(name: str, repo: str | None = None) -> dict:
+    resolved = await resolve_entity(name, repo)
     if not resolved:
         return {"error": f"Entity '{name}' not found in graph database. The entity may not be indexed yet."}
     file, start, end = resolved
@@ -90,8 +83,8 @@ async def find_patterns(name: str) -> dict:
 # 4) Get Snippet
 # -----------------------------------------------------------
 @mcp.tool
-async def get_code_snippet_tool(name: str, context: int = 3) -> dict:
-    resolved = await resolve_entity(name)
+async def get_code_snippet_tool(name: str, context: int = 3, repo: str | None = None) -> dict:
+    resolved = await resolve_entity(name, repo)
     if not resolved:
         return {"error": f"Entity '{name}' not found in graph database. The entity may not be indexed yet."}
     file, start, end = resolved
@@ -105,8 +98,8 @@ async def get_code_snippet_tool(name: str, context: int = 3) -> dict:
 # 5) Explain Code (LLM)
 # -----------------------------------------------------------
 @mcp.tool
-async def explain_implementation(name: str) -> dict:
-    resolved = await resolve_entity(name)
+async def explain_implementation(name: str, repo: str | None = None) -> dict:
+    resolved = await resolve_entity(name, repo)
     if not resolved:
         return {"error": f"Entity '{name}' not found in graph database. The entity may not be indexed yet."}
     file, start, end = resolved
@@ -126,9 +119,12 @@ async def explain_implementation(name: str) -> dict:
 # 6) Compare Implementations
 # -----------------------------------------------------------
 @mcp.tool
-async def compare_implementations(name_a: str, name_b: str) -> dict:
-    resolved_a = await resolve_entity(name_a)
-    resolved_b = await resolve_entity(name_b)
+async def compare_implementations(
+    name_a: str, name_b: str, repo_a: str | None = None, repo_b: str | None = None
+) -> dict:
+    # repo_a/repo_b allow comparing across repositories, e.g. fastapi vs starlette
+    resolved_a = await resolve_entity(name_a, repo_a)
+    resolved_b = await resolve_entity(name_b, repo_b)
     
     if not resolved_a:
         return {"error": f"Entity '{name_a}' not found in graph database. The entity may not be indexed yet."}
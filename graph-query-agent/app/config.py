@@ -18,6 +18,37 @@ class Settings(BaseSettings):
     NEO4J_USER: str = "neo4j"
     NEO4J_PASSWORD: str = "password"
 
+    # Graph backend: "neo4j", or "memory" (reads the snapshot the indexer
+    # saves to GRAPH_SNAPSHOT, reloaded whenever it changes)
+    GRAPH_BACKEND: str = "neo4j"
+    GRAPH_SNAPSHOT: str = ""
+
+    # Rows per page when a tool is called without `limit`, and the most a
+    # single call may return whatever `limit` asks for
+    QUERY_DEFAULT_LIMIT: int = 100
+    QUERY_MAX_LIMIT: int = 1000
+    # Most names one batch lookup (find_entities, ..._many) may ask for
+    QUERY_MAX_BATCH: int = 50
+
+    # Result cache of the lookup tools: entries kept in process (0 disables
+    # the cache), their lifetime in seconds, and how often the indexer's
+    # index markers are checked for new writes
+    QUERY_CACHE_SIZE: int = 1024
+    QUERY_CACHE_TTL: float = 300.0
+    QUERY_CACHE_CHECK_INTERVAL: float = 2.0
+    # Optional second tier on local disk, shared by replicas (empty disables)
+    QUERY_CACHE_DIR: str = ""
+    QUERY_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+
+    # Guards of ad-hoc Cypher (execute_query): server-side transaction
+    # timeout in seconds, most rows read over all pages of one query,
+    # largest estimated row count at any plan operator, and most hops
+    # of a variable-length pattern
+    CYPHER_TIMEOUT: float = 10.0
+    CYPHER_MAX_ROWS: int = 10_000
+    CYPHER_MAX_ESTIMATED_ROWS: int = 1_000_000
+    CYPHER_MAX_HOPS: int = 10
+
     model_config = SettingsConfigDict(
         env_file=str(ENV_FILE),
         env_file_encoding="utf-8",
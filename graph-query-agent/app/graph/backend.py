@@ -0,0 +1,503 @@
+# apps/graph-query-agent/app/graph/backend.py
+import asyncio
+import os
+import pickle
+import re
+from abc import ABC, abstractmethod
+from array import array
+from itertools import islice
+from ..config import settings
+from .driver import fetch_rows, run_query
+
+# ---------------------------------------------------------
+# Graph backends. The reads the query agent needs from
+# the graph (look up by name, neighbours, k-hop traversal,
+# repositories) behind one interface, with two
+# implementations:
+#   neo4j   Cypher through app.graph.driver (default)
+#   memory  an in-process graph with dict and array
+#           adjacency indexes, for single-node use and CI
+# Selected with GRAPH_BACKEND. The memory graph is the
+# snapshot file (GRAPH_SNAPSHOT) the indexer saves; it is
+# reloaded whenever it changes.
+#
+# Nodes are identified by (repo, label, key): label is the
+# key label (File, Entity, Import, Module, Decorator,
+# Parameter, Docstring, Repository) and key the properties
+# it is unique on, as in graph/schema.py. Results have the
+# shapes Neo4j's result.data() gives: nodes as property
+# dicts and relationships as (start, type, end) tuples.
+# Read operations take a projection: "full" nodes, or
+# "minimal" ones (label, name, qname, file, start, end)
+# with relationships reduced to their type. Traversals
+# return a deduplicated node table and paths as lists of
+# indexes into it. They also take skip/limit: Neo4j stops
+# matching once `limit` rows are produced (SKIP/LIMIT) and
+# the rows are read record by record, never all at once.
+#
+# The indexer keeps the write side of this module and the
+# analyst agent the name lookup; the memory graph's
+# attributes and snapshot format (SNAPSHOT_VERSION) must
+# match across the copies.
+# ---------------------------------------------------------
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+SNAPSHOT_VERSION = 1
+
+PROJECTIONS = ("minimal", "full")
+# Most specific label first; reported as the `label` of minimal nodes
+PRIMARY_LABELS = (
+    "Class", "Method", "Function", "File", "Module", "Import",
+    "Decorator", "Parameter", "Docstring", "Repository",
+)
+
+
+def check_projection(projection: str) -> str:
+    if projection not in PROJECTIONS:
+        raise ValueError(f"Unknown projection: {projection!r}. Allowed: {list(PROJECTIONS)}")
+    return projection
+
+
+def minimal_node(props: dict, labels) -> dict:
+    """The minimal projection of a node; File nodes report their path as `file`."""
+    row = {
+        "label": next((label for label in PRIMARY_LABELS if label in labels), None),
+        "name": props.get("name"),
+        "qname": props.get("qname"),
+        "file": props.get("file", props.get("path")),
+        "start": props.get("start"),
+        "end": props.get("end"),
+    }
+    return {k: v for k, v in row.items() if v is not None}
+
+
+def _identifier(name: str) -> str:
+    # Labels, relationship types and property names are spliced into Cypher
+    if not _IDENTIFIER.match(name):
+        raise ValueError(f"Invalid graph identifier: {name!r}")
+    return name
+
+
+class GraphBackend(ABC):
+    @abstractmethod
+    async def find_by_name(
+        self, name: str, repo: str | None = None, projection: str = "full", skip: int = 0, limit: int | None = None
+    ) -> list[dict]:
+        """Entities whose short or qualified name is `name`."""
+
+    @abstractmethod
+    async def neighbors(
+        self,
+        name: str,
+        rel: str,
+        direction: str = "out",
+        repo: str | None = None,
+        label: str = "Entity",
+        include_hubs: bool = True,
+        projection: str = "full",
+        skip: int = 0,
+        limit: int | None = None,
+    ) -> list[dict]:
+        """
+        {"a", "r", "b"} for every `rel` relationship of the `label` nodes
+        named `name`: outgoing (a)-[r]->(b) or incoming (a)<-[r]-(b).
+        Unless `include_hubs`, :Hub nodes are neither expanded nor returned.
+        """
+
+    async def find_by_names(
+        self, names: list[str], repo: str | None = None, projection: str = "full", limit: int | None = None
+    ) -> dict[str, list[dict]]:
+        """find_by_name for each of `names` (at most `limit` entities per name)."""
+        return {name: await self.find_by_name(name, repo, projection, limit=limit) for name in names}
+
+    async def neighbors_many(
+        self,
+        names: list[str],
+        rel: str,
+        direction: str = "out",
+        repo: str | None = None,
+        label: str = "Entity",
+        include_hubs: bool = True,
+        projection: str = "full",
+        limit: int | None = None,
+    ) -> dict[str, list[dict]]:
+        """neighbors for each of `names` (at most `limit` rows per name)."""
+        return {
+            name: await self.neighbors(name, rel, direction, repo, label, include_hubs, projection, limit=limit)
+            for name in names
+        }
+
+    @abstractmethod
+    async def traverse(
+        self,
+        label: str,
+        key: dict,
+        rel: str,
+        max_hops: int,
+        repo: str | None = None,
+        projection: str = "full",
+        skip: int = 0,
+        limit: int | None = None,
+    ) -> dict:
+        """
+        Every path of 1 to max_hops outgoing `rel` relationships from the
+        (label, key) nodes, as {"nodes": [node, ...], "paths": [[index, ...], ...]}.
+        """
+
+    @abstractmethod
+    async def repositories(self) -> list[dict]:
+        """Every indexed namespace with its URL, ref and last indexed commit."""
+
+    @abstractmethod
+    async def index_markers(self) -> dict[str, int]:
+        """{repo: index marker}; the indexer bumps the marker after each completed write."""
+
+    async def close(self):
+        pass
+
+
+class _NodeTable:
+    """Each node of a set of paths once; paths refer to nodes by index."""
+
+    def __init__(self):
+        self.nodes: list[dict] = []
+        self._index: dict = {}
+
+    def index(self, node_id, render) -> int:
+        if node_id not in self._index:
+            self._index[node_id] = len(self.nodes)
+            self.nodes.append(render())
+        return self._index[node_id]
+
+
+# ---------------------------------------------------------
+# Neo4j
+# ---------------------------------------------------------
+def _key_pattern(key: dict, param: str) -> str:
+    return "".join(f", {_identifier(k)}:${param}.{k}" for k in key)
+
+
+def _minimal_cypher(var: str) -> str:
+    # Same fields as minimal_node; nulls are dropped after the query
+    labels = ", ".join(f"'{label}'" for label in PRIMARY_LABELS)
+    return (
+        f"{{label: [label IN [{labels}] WHERE label IN labels({var})][0], name: {var}.name, "
+        f"qname: {var}.qname, file: coalesce({var}.file, {var}.path), start: {var}.start, end: {var}.end}}"
+    )
+
+
+def _compact(node: dict) -> dict:
+    return {k: v for k, v in node.items() if v is not None}
+
+
+def _page(skip: int, limit: int | None) -> str:
+    return "SKIP $skip" + ("" if limit is None else " LIMIT $limit")
+
+
+def _batch_cap(names: list[str], limit: int | None) -> int | None:
+    # Rows a batch lookup can return at most: `limit` per name
+    return None if limit is None else len(names) * limit
+
+
+class Neo4jBackend(GraphBackend):
+    async def find_by_name(self, name, repo=None, projection="full", skip=0, limit=None):
+        # Short name (APIRouter) or qualified name (fastapi.routing.APIRouter)
+        minimal = check_projection(projection) == "minimal"
+        records = await fetch_rows(f"""
+            MATCH (n:Entity)
+            WHERE (n.name = $name OR n.qname = $name)
+              AND ($repo IS NULL OR n.repo = $repo)
+            RETURN {_minimal_cypher("n") if minimal else "n"} AS n
+            {_page(skip, limit)}
+        """, {"name": name, "repo": repo, "skip": skip, "limit": limit})
+        return [_compact(r["n"]) if minimal else r["n"] for r in records]
+
+    async def neighbors(
+        self, name, rel, direction="out", repo=None, label="Entity", include_hubs=True, projection="full",
+        skip=0, limit=None,
+    ):
+        minimal = check_projection(projection) == "minimal"
+        pattern = {"out": "(a)-[r:{rel}]->(b)", "in": "(a)<-[r:{rel}]-(b)"}[direction]
+        returns = f"{_minimal_cypher('a')} AS a, type(r) AS r, {_minimal_cypher('b')} AS b" if minimal else "a,r,b"
+        records = await fetch_rows(
+            f"""
+            MATCH (a:{_identifier(label)} {{name:$name}})
+            WHERE ($include_hubs OR NOT a:Hub) AND ($repo IS NULL OR a.repo = $repo)
+            MATCH {pattern.format(rel=_identifier(rel))}
+            WHERE $include_hubs OR NOT b:Hub
+            RETURN {returns}
+            {_page(skip, limit)}
+            """,
+            {"name": name, "include_hubs": include_hubs, "repo": repo, "skip": skip, "limit": limit},
+        )
+        if minimal:
+            return [{"a": _compact(r["a"]), "r": r["r"], "b": _compact(r["b"])} for r in records]
+        return records
+
+    # The batch lookups run one query: each name is matched in its own
+    # subquery, so LIMIT applies per name, and reading stops after
+    # len(names) * limit rows overall
+
+    async def find_by_names(self, names, repo=None, projection="full", limit=None):
+        minimal = check_projection(projection) == "minimal"
+        records = await fetch_rows(f"""
+            UNWIND $names AS name
+            CALL {{
+                WITH name
+                MATCH (n:Entity)
+                WHERE (n.name = name OR n.qname = name)
+                  AND ($repo IS NULL OR n.repo = $repo)
+                RETURN {_minimal_cypher("n") if minimal else "n"} AS n
+                {_page(0, limit)}
+            }}
+            RETURN name, n
+        """, {"names": names, "repo": repo, "skip": 0, "limit": limit}, limit=_batch_cap(names, limit))
+        found = {name: [] for name in names}
+        for r in records:
+            found[r["name"]].append(_compact(r["n"]) if minimal else r["n"])
+        return found
+
+    async def neighbors_many(
+        self, names, rel, direction="out", repo=None, label="Entity", include_hubs=True, projection="full",
+        limit=None,
+    ):
+        minimal = check_projection(projection) == "minimal"
+        pattern = {"out": "(a)-[r:{rel}]->(b)", "in": "(a)<-[r:{rel}]-(b)"}[direction]
+        returns = f"{_minimal_cypher('a')} AS a, type(r) AS r, {_minimal_cypher('b')} AS b" if minimal else "a,r,b"
+        records = await fetch_rows(
+            f"""
+            UNWIND $names AS name
+            CALL {{
+                WITH name
+                MATCH (a:{_identifier(label)} {{name:name}})
+                WHERE ($include_hubs OR NOT a:Hub) AND ($repo IS NULL OR a.repo = $repo)
+                MATCH {pattern.format(rel=_identifier(rel))}
+                WHERE $include_hubs OR NOT b:Hub
+                RETURN {returns}
+                {_page(0, limit)}
+            }}
+            RETURN name, a, r, b
+            """,
+            {"names": names, "include_hubs": include_hubs, "repo": repo, "skip": 0, "limit": limit},
+            limit=_batch_cap(names, limit),
+        )
+        found = {name: [] for name in names}
+        for r in records:
+            if minimal:
+                found[r["name"]].append({"a": _compact(r["a"]), "r": r["r"], "b": _compact(r["b"])})
+            else:
+                found[r["name"]].append({"a": r["a"], "r": r["r"], "b": r["b"]})
+        return found
+
+    async def traverse(self, label, key, rel, max_hops, repo=None, projection="full", skip=0, limit=None):
+        node = _minimal_cypher("n") if check_projection(projection) == "minimal" else "n"
+        # LIMIT bounds the expansion itself: paths are produced lazily
+        records = await fetch_rows(f"""
+            MATCH p = (s:{_identifier(label)} {{{_key_pattern(key, 'key').lstrip(', ')}}})
+                      -[:{_identifier(rel)}*1..{int(max_hops)}]->(m)
+            WHERE $repo IS NULL OR s.repo = $repo
+            RETURN [n IN nodes(p) | elementId(n)] AS ids, [n IN nodes(p) | {node}] AS nodes
+            {_page(skip, limit)}
+        """, {"key": key, "repo": repo, "skip": skip, "limit": limit})
+        table = _NodeTable()
+        paths = [
+            [table.index(node_id, lambda n=n: _compact(n)) for node_id, n in zip(r["ids"], r["nodes"])]
+            for r in records
+        ]
+        return {"nodes": table.nodes, "paths": paths}
+
+    async def repositories(self):
+        return await run_query("""
+            MATCH (r:Repository)
+            RETURN r.repo AS repo, r.url AS url, r.ref AS ref, r.commit AS commit,
+                   toString(r.indexed_at) AS indexed_at
+            ORDER BY repo
+        """)
+
+    async def index_markers(self):
+        records = await run_query("""
+            MATCH (r:Repository)
+            RETURN r.repo AS repo, coalesce(r.index_marker, 0) AS marker
+        """)
+        return {r["repo"]: r["marker"] for r in records}
+
+
+# ---------------------------------------------------------
+# In-memory graph
+# ---------------------------------------------------------
+class MemoryBackend(GraphBackend):
+    """
+    Nodes live in parallel lists indexed by node id; dicts map
+    (repo, label, key) and names to ids, and adjacency is kept per
+    relationship type and direction as arrays of node ids, so lookups
+    and single hops are dict accesses. Relationship properties are
+    kept by (source, type, target). Read-only: the graph is the
+    indexer's snapshot.
+    """
+
+    def __init__(self, snapshot: str = ""):
+        self.snapshot = snapshot
+        self._snapshot_mtime: int | None = None
+        self._reload = asyncio.Lock()
+        # The snapshot is loaded by the first read
+        self._reset()
+
+    def _reset(self):
+        self.labels: list[set[str] | None] = []
+        self.props: list[dict | None] = []
+        self.ids: dict[tuple, int] = {}
+        self.names: dict[str, array] = {}
+        self.repo_nodes: dict[str, set[int]] = {}
+        self.out: dict[str, dict[int, array]] = {}
+        self.inc: dict[str, dict[int, array]] = {}
+        self.rel_props: dict[tuple[int, str, int], dict] = {}
+
+    # ---------------------------------------------------------
+    # Snapshot
+    # ---------------------------------------------------------
+    def _read_snapshot(self) -> dict:
+        # Written only by our own indexer (GRAPH_SNAPSHOT is a trusted local path)
+        with open(self.snapshot, "rb") as f:
+            return pickle.load(f)
+
+    def _mtime(self) -> int | None:
+        try:
+            return os.stat(self.snapshot).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    async def _refresh(self):
+        """
+        Reload the snapshot if the indexer saved a newer one. It is
+        unpickled off the event loop; reads go on against the old graph
+        meanwhile, and concurrent reads wait for one reload.
+        """
+        if not self.snapshot or self._mtime() in (None, self._snapshot_mtime):
+            return
+        async with self._reload:
+            mtime = self._mtime()
+            if mtime in (None, self._snapshot_mtime):
+                return
+            state = await asyncio.to_thread(self._read_snapshot)
+            self._snapshot_mtime = mtime
+            if state.get("version") != SNAPSHOT_VERSION:
+                print(f"Ignoring graph snapshot {self.snapshot}: version {state.get('version')}")
+                return
+            for name, value in state.items():
+                if name != "version":
+                    setattr(self, name, value)
+
+    # ---------------------------------------------------------
+    # Nodes
+    # ---------------------------------------------------------
+    @staticmethod
+    def _key(repo: str, label: str, key: dict) -> tuple:
+        return (repo, label, *sorted(key.items()))
+
+    def _node_id(self, repo: str, label: str, key: dict) -> int | None:
+        return self.ids.get(self._key(repo, label, key))
+
+    def _node(self, node: int, projection: str = "full") -> dict:
+        if projection == "minimal":
+            return minimal_node(self.props[node], self.labels[node])
+        return {k: v for k, v in self.props[node].items() if k != "_key"}
+
+    # ---------------------------------------------------------
+    # GraphBackend
+    # ---------------------------------------------------------
+    def _named(self, name: str, repo: str | None, label: str) -> list[int]:
+        return [
+            n for n in self.names.get(name, ())
+            if label in self.labels[n] and (repo is None or self.props[n]["repo"] == repo)
+        ]
+
+    async def find_by_name(self, name, repo=None, projection="full", skip=0, limit=None):
+        check_projection(projection)
+        await self._refresh()
+        found = self._named(name, repo, "Entity")
+        return [self._node(n, projection) for n in islice(found, skip, None if limit is None else skip + limit)]
+
+    async def neighbors(
+        self, name, rel, direction="out", repo=None, label="Entity", include_hubs=True, projection="full",
+        skip=0, limit=None,
+    ):
+        check_projection(projection)
+        await self._refresh()
+        index = {"out": self.out, "in": self.inc}[direction].get(rel, {})
+        pairs = (
+            (a, b)
+            for a in self._named(name, repo, label)
+            if self.props[a].get("name") == name and (include_hubs or "Hub" not in self.labels[a])
+            for b in index.get(a, ())
+            if include_hubs or "Hub" not in self.labels[b]
+        )
+        results = []
+        # Only the requested page is rendered
+        for a, b in islice(pairs, skip, None if limit is None else skip + limit):
+            node_a, node_b = self._node(a, projection), self._node(b, projection)
+            if projection == "minimal":
+                r = rel
+            else:
+                r = (node_a, rel, node_b) if direction == "out" else (node_b, rel, node_a)
+            results.append({"a": node_a, "r": r, "b": node_b})
+        return results
+
+    def _paths(self, starts: list[int], rel: str, max_hops: int):
+        """Depth-first over simple paths, like Cypher's variable-length match, lazily."""
+        adjacency = self.out.get(rel, {})
+        stack = [(start, [start]) for start in reversed(starts)]
+        while stack:
+            node, path = stack.pop()
+            if len(path) > 1:
+                yield path
+            if len(path) <= max_hops:
+                for nxt in reversed(adjacency.get(node, ())):
+                    if nxt not in path:
+                        stack.append((nxt, path + [nxt]))
+
+    async def traverse(self, label, key, rel, max_hops, repo=None, projection="full", skip=0, limit=None):
+        check_projection(projection)
+        await self._refresh()
+        repos = [repo] if repo is not None else list(self.repo_nodes)
+        starts = [n for r in repos if (n := self._node_id(r, label, key)) is not None]
+        table = _NodeTable()
+        paths = [
+            [table.index(n, lambda n=n: self._node(n, projection)) for n in path]
+            for path in islice(self._paths(starts, rel, max_hops), skip, None if limit is None else skip + limit)
+        ]
+        return {"nodes": table.nodes, "paths": paths}
+
+    async def repositories(self):
+        await self._refresh()
+        rows = []
+        for repo, ids in self.repo_nodes.items():
+            node = self._node_id(repo, "Repository", {})
+            if node is not None:
+                props = self.props[node]
+                rows.append({k: props.get(k) for k in ("repo", "url", "ref", "commit", "indexed_at")})
+        return sorted(rows, key=lambda row: row["repo"])
+
+    async def index_markers(self):
+        await self._refresh()
+        markers = {}
+        for repo in self.repo_nodes:
+            node = self._node_id(repo, "Repository", {})
+            if node is not None:
+                markers[repo] = self.props[node].get("index_marker", 0)
+        return markers
+
+
+_backend: GraphBackend | None = None
+
+
+def get_backend() -> GraphBackend:
+    """The configured backend (GRAPH_BACKEND), created on first use."""
+    global _backend
+    if _backend is None:
+        if settings.GRAPH_BACKEND == "neo4j":
+            _backend = Neo4jBackend()
+        elif settings.GRAPH_BACKEND == "memory":
+            _backend = MemoryBackend(settings.GRAPH_SNAPSHOT)
+        else:
+            raise ValueError(f"Unknown GRAPH_BACKEND: {settings.GRAPH_BACKEND}")
+    return _backend
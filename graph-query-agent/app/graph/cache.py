@@ -0,0 +1,261 @@
+# apps/graph-query-agent/app/graph/cache.py
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from ..config import settings
+from .backend import get_backend
+
+# ---------------------------------------------------------
+# Result cache of the lookup tools. Results only depend on
+# the graph, so they are kept until the indexer finishes a
+# write: every completed write bumps its repository's index
+# marker, and when any marker changes the cache is dropped.
+# Markers are read at most every QUERY_CACHE_CHECK_INTERVAL
+# seconds; entries also expire after QUERY_CACHE_TTL.
+#
+# Keys are the tool plus its normalized arguments (the page
+# fingerprint: arguments after defaults, offset and limit).
+# The in-process tier is an LRU of QUERY_CACHE_SIZE entries.
+# The optional disk tier is SQLite in WAL mode, so replicas
+# on one host share it; entries are JSON and are stored with
+# the markers they were computed under. Its calls block, so
+# they run in a worker thread (asyncio.to_thread), one batch
+# of keys per call, never on the event loop.
+# ---------------------------------------------------------
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS entries (
+        key TEXT NOT NULL,
+        marker TEXT NOT NULL,
+        payload TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        created REAL NOT NULL,
+        last_used REAL NOT NULL,
+        PRIMARY KEY (key, marker)
+    )
+"""
+EVICT_EVERY = 100  # puts between size checks
+
+
+class DiskTier:
+    def __init__(self, directory: str, max_bytes: int, ttl: float):
+        Path(directory).mkdir(parents=True, exist_ok=True)
+        self.path = Path(directory) / "query-cache.sqlite3"
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._puts = 0
+        # One connection shared by the worker threads
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            self.path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(SCHEMA)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_lru ON entries (last_used)")
+
+    def get_many(self, keys: list[str], marker: str) -> dict:
+        """{key: value} for the keys stored under `marker` and within their TTL."""
+        found = {}
+        with self._lock:
+            for key in keys:
+                row = self._conn.execute(
+                    "SELECT payload FROM entries WHERE key = ? AND marker = ? AND created > ?",
+                    (key, marker, time.time() - self.ttl),
+                ).fetchone()
+                if row is not None:
+                    found[key] = json.loads(row[0])
+            now = time.time()
+            self._conn.executemany(
+                "UPDATE entries SET last_used = ? WHERE key = ? AND marker = ?",
+                [(now, key, marker) for key in found],
+            )
+        return found
+
+    def put_many(self, values: dict, marker: str):
+        now = time.time()
+        rows = []
+        for key, value in values.items():
+            payload = json.dumps(value, separators=(",", ":"), default=str)
+            rows.append((key, marker, payload, len(payload), now, now))
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)", rows)
+            before = self._puts
+            self._puts += len(rows)
+            if self._puts // EVICT_EVERY != before // EVICT_EVERY:
+                self._evict()
+
+    def drop_stale(self, marker: str) -> int:
+        """Delete entries computed under other markers or past their TTL."""
+        with self._lock:
+            return self._conn.execute(
+                "DELETE FROM entries WHERE marker != ? OR created <= ?",
+                (marker, time.time() - self.ttl),
+            ).rowcount
+
+    def evict(self) -> int:
+        """Drop least recently used entries until the tier fits max_bytes."""
+        with self._lock:
+            return self._evict()
+
+    def _evict(self) -> int:
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return 0
+        stale = []
+        rows = self._conn.execute("SELECT key, marker, size FROM entries ORDER BY last_used").fetchall()
+        for key, marker, size in rows:
+            if total <= self.max_bytes:
+                break
+            stale.append((key, marker))
+            total -= size
+        self._conn.executemany("DELETE FROM entries WHERE key = ? AND marker = ?", stale)
+        return len(stale)
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        return {"path": str(self.path), "entries": entries, "bytes": size, "max_bytes": self.max_bytes}
+
+
+class QueryCache:
+    def __init__(self, size: int, ttl: float, check_interval: float, disk: DiskTier | None = None):
+        self.size = size
+        self.ttl = ttl
+        self.check_interval = check_interval
+        self.disk = disk
+        self.entries: OrderedDict[str, tuple[float, object]] = OrderedDict()
+        self.markers: dict[str, int] | None = None
+        self.marker = ""
+        self.checked_at = float("-inf")
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    async def _check_markers(self):
+        now = time.monotonic()
+        if now - self.checked_at < self.check_interval:
+            return
+        self.checked_at = now
+        markers = await get_backend().index_markers()
+        if markers == self.markers:
+            return
+        if self.markers is not None:
+            self.invalidations += 1
+        self.markers = markers
+        self.marker = hashlib.sha256(json.dumps(markers, sort_keys=True).encode()).hexdigest()[:16]
+        self.entries.clear()
+        if self.disk:
+            await asyncio.to_thread(self.disk.drop_stale, self.marker)
+
+    def _lookup(self, key: str, now: float):
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] > now:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+        return None
+
+    def _remember(self, key: str, value, now: float):
+        self.entries[key] = (now + self.ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    async def get(self, key: str, run):
+        """The cached result for `key`, or the result of `await run()`, which is cached."""
+        async def run_one(keys):
+            return {key: await run()}
+
+        return (await self.get_many([key], run_one))[key]
+
+    async def get_many(self, keys: list[str], run) -> dict:
+        """
+        {key: result} for every key. The keys that are not cached are
+        computed together by `await run(missing)`, which returns {key: result}.
+        """
+        await self._check_markers()
+        now = time.monotonic()
+        found = {}
+        for key in keys:
+            value = self._lookup(key, now)
+            if value is not None:
+                found[key] = value
+        missing = [key for key in keys if key not in found]
+        if missing and self.disk:
+            stored = await asyncio.to_thread(self.disk.get_many, missing, self.marker)
+            self.disk_hits += len(stored)
+            for key, value in stored.items():
+                self._remember(key, value, now)
+            found.update(stored)
+            missing = [key for key in missing if key not in stored]
+        if not missing:
+            return found
+
+        self.misses += len(missing)
+        marker = self.marker
+        computed = await run(missing)
+        found.update(computed)
+        if marker != self.marker:
+            return found  # the graph changed while the query ran
+        for key in missing:
+            self._remember(key, computed[key], now)
+        if self.disk:
+            await asyncio.to_thread(self.disk.put_many, {key: computed[key] for key in missing}, marker)
+        return found
+
+    async def stats(self) -> dict:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "enabled": True,
+            "entries": len(self.entries),
+            "size": self.size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else None,
+            "invalidations": self.invalidations,
+            "index_markers": self.markers,
+            "disk": await asyncio.to_thread(self.disk.stats) if self.disk else None,
+        }
+
+
+_cache: QueryCache | None = None
+
+
+def get_query_cache() -> QueryCache | None:
+    """Process-wide cache (None when QUERY_CACHE_SIZE is 0)."""
+    global _cache
+    if settings.QUERY_CACHE_SIZE <= 0:
+        return None
+    if _cache is None:
+        disk = None
+        if settings.QUERY_CACHE_DIR:
+            disk = DiskTier(settings.QUERY_CACHE_DIR, settings.QUERY_CACHE_MAX_BYTES, settings.QUERY_CACHE_TTL)
+        _cache = QueryCache(
+            settings.QUERY_CACHE_SIZE, settings.QUERY_CACHE_TTL, settings.QUERY_CACHE_CHECK_INTERVAL, disk
+        )
+    return _cache
+
+
+async def cached(key: str, run):
+    """`await run()` through the query cache, when it is enabled."""
+    cache = get_query_cache()
+    if cache is None:
+        return await run()
+    return await cache.get(key, run)
+
+
+async def cached_many(keys: list[str], run) -> dict:
+    """`await run(keys)` through the query cache: only the keys not cached are run."""
+    cache = get_query_cache()
+    if cache is None:
+        return await run(keys)
+    return await cache.get_many(keys, run)
@@ -0,0 +1,149 @@
+# apps/graph-query-agent/app/graph/cypher_guard.py
+import re
+from ..config import settings
+
+# ---------------------------------------------------------
+# Checks run on ad-hoc Cypher (execute_query) before it is
+# executed. The text check works on tokens: string literals,
+# comments and `quoted` names are blanked out first, and
+# property names (n.set), labels (:Set), map keys ({set: 1})
+# and parameters are not keywords, nor are aliases (AS end),
+# so only real clauses are rejected. START/STOP count only
+# before DATABASE and TERMINATE before TRANSACTION(S). The
+# database enforces read-only access as well: queries run
+# in read transactions.
+#
+# Variable-length patterns ([*..n]), quantified path
+# patterns (((a)-->(b)){1,n}) and quantified relationships
+# (-[:CALLS]->{1,n}) need an upper bound of at most
+# CYPHER_MAX_HOPS; + and * quantifiers have none.
+#
+# The plan check reads the EXPLAIN plan (nothing is run):
+# cartesian products and estimated row counts over
+# CYPHER_MAX_ESTIMATED_ROWS at any operator are rejected.
+# ---------------------------------------------------------
+WRITE_CLAUSES = {
+    "CREATE", "MERGE", "DELETE", "DETACH", "SET", "REMOVE", "DROP", "FOREACH",
+    "LOAD", "ALTER", "RENAME", "GRANT", "DENY", "REVOKE",
+}
+# Administration commands whose first word is also a common name
+ADMIN_COMMANDS = {
+    ("START", "DATABASE"), ("STOP", "DATABASE"),
+    ("TERMINATE", "TRANSACTION"), ("TERMINATE", "TRANSACTIONS"),
+}
+# Procedures that only read the schema; any other CALL is rejected
+READ_PROCEDURES = {
+    "DB.LABELS", "DB.RELATIONSHIPTYPES", "DB.PROPERTYKEYS",
+    "DB.SCHEMA.VISUALIZATION", "DB.SCHEMA.NODETYPEPROPERTIES", "DB.SCHEMA.RELTYPEPROPERTIES",
+}
+
+_LITERALS = re.compile(
+    r"""//[^\n]*|/\*.*?\*/|'(?:\\.|[^'\\])*'|"(?:\\.|[^"\\])*"|`[^`]*`""", re.DOTALL
+)
+_KEYWORD = re.compile(r"(?<![\w.:$])([A-Za-z_]\w*(?:\.[A-Za-z_]\w*)*)(?!\s*:)")
+_PROCEDURE = re.compile(r"(?<![\w.:$])CALL\s+([A-Za-z_]\w*(?:\.[A-Za-z_]\w*)*)", re.IGNORECASE)
+_REL_PATTERN = re.compile(r"-\s*\[([^\[\]]*)\]")
+_HOPS = re.compile(r"\*\s*(\d+)?\s*(\.\.)?\s*(\d+)?")
+# A quantifier: + * {n} {m,n} {m,} {,n}
+_QUANTIFIER = re.compile(r"\s*(?:([+*])|\{\s*(\d*)\s*(,)?\s*(\d*)\s*\})")
+# The end of a relationship pattern: ]-  ]->  --  -->
+_REL_END = re.compile(r"(?:\]\s*-|-\s*-)\s*>?")
+_REL_ARROW = re.compile(r"\]\s*-|-\s*\[|<?-\s*-\s*>?")
+
+
+def _strip_literals(query: str) -> str:
+    return _LITERALS.sub(" '' ", query)
+
+
+def _keywords(text: str) -> list[str]:
+    """Upper-cased words of the query, without aliases (the name after AS)."""
+    words = [m.group(1).upper() for m in _KEYWORD.finditer(text)]
+    return [word for previous, word in zip([None, *words], words) if previous != "AS"]
+
+
+def read_only_error(query: str) -> str | None:
+    """Why `query` may not run as ad-hoc read-only Cypher, or None."""
+    text = _strip_literals(query)
+    keywords = _keywords(text)
+    if not keywords:
+        return "Empty query."
+    if keywords[0] in ("EXPLAIN", "PROFILE"):
+        return "Send the query without EXPLAIN/PROFILE."
+    blocked = WRITE_CLAUSES.intersection(keywords)
+    blocked.update(" ".join(pair) for pair in zip(keywords, keywords[1:]) if pair in ADMIN_COMMANDS)
+    if blocked := sorted(blocked):
+        return f"Query blocked for safety. Read-only queries only (found {', '.join(blocked)})."
+    # CALL { ... } subqueries are checked like the rest of the query
+    for procedure in _PROCEDURE.findall(text):
+        if procedure.upper() not in READ_PROCEDURES:
+            return f"Procedure {procedure} is not allowed. Allowed: {sorted(p.lower() for p in READ_PROCEDURES)}"
+    if any(pair == ("IN", "TRANSACTIONS") for pair in zip(keywords, keywords[1:])):
+        return "CALL { ... } IN TRANSACTIONS is not allowed."
+    return _expansion_error(text)
+
+
+def _expansion_error(text: str) -> str | None:
+    # [*] and [*2..] have no upper bound
+    for pattern in _REL_PATTERN.finditer(text):
+        hops = _HOPS.search(pattern.group(1))
+        if hops is None:
+            continue
+        low, dots, high = hops.groups()
+        upper = int(high) if high else (int(low) if low and not dots else None)
+        if upper is None:
+            return (
+                f"Variable-length pattern [{pattern.group(1).strip()}] has no upper bound; "
+                f"use *..{settings.CYPHER_MAX_HOPS} or less."
+            )
+        if upper > settings.CYPHER_MAX_HOPS:
+            return f"Variable-length patterns may span at most {settings.CYPHER_MAX_HOPS} hops."
+    for quantifier in _quantifiers(text):
+        plus_or_star, low, comma, high = quantifier.groups()
+        upper = None if plus_or_star else (int(high) if high else (None if comma else int(low or 0)))
+        if upper is None or upper > settings.CYPHER_MAX_HOPS:
+            return (
+                f"Quantifier {quantifier.group(0).strip()} needs an upper bound of at most "
+                f"{settings.CYPHER_MAX_HOPS}, e.g. {{1,{settings.CYPHER_MAX_HOPS}}}."
+            )
+    return None
+
+
+def _quantifiers(text: str):
+    """Quantifiers of path patterns ((...)-->(...)) and of relationships (-[...]->)."""
+    for end in _REL_END.finditer(text):
+        if quantifier := _QUANTIFIER.match(text, end.end()):
+            yield quantifier
+    opened = []
+    for i, char in enumerate(text):
+        if char == "(":
+            opened.append(i)
+        elif char == ")" and opened:
+            group = text[opened.pop() + 1:i].strip()
+            # A path pattern starts with a node pattern and has a relationship;
+            # any other group is an expression, e.g. count(n) * 2
+            if group.startswith("(") and _REL_ARROW.search(group):
+                if quantifier := _QUANTIFIER.match(text, i + 1):
+                    yield quantifier
+
+
+def _operators(plan: dict):
+    yield plan
+    for child in plan.get("children", []):
+        yield from _operators(child)
+
+
+def plan_error(plan: dict | None) -> str | None:
+    """Why the EXPLAIN plan is too expensive to run, or None."""
+    if not plan:
+        return None
+    for operator in _operators(plan):
+        name = operator.get("operatorType", "").split("@")[0]
+        if name.startswith("CartesianProduct"):
+            return "Query plan has a cartesian product; connect the patterns or split the query."
+        rows = operator.get("args", {}).get("EstimatedRows", 0)
+        if rows > settings.CYPHER_MAX_ESTIMATED_ROWS:
+            return (
+                f"Query plan estimates {int(rows)} rows at {name} "
+                f"(limit {settings.CYPHER_MAX_ESTIMATED_ROWS}); narrow the MATCH."
+            )
+    return None
@@ -1,5 +1,5 @@
 # apps/graph-query-agent/app/graph/driver.py
-from neo4j import AsyncGraphDatabase
+from neo4j import READ_ACCESS, AsyncGraphDatabase, unit_of_work
 from app.config import settings
 
 driver = AsyncGraphDatabase.driver(
@@ -12,3 +12,49 @@ async def run_query(cypher: str, params: dict = None):
         result = await session.run(cypher, params or {})
         records = await result.data()
         return records
+
+# Records are pulled from the server in batches of this size
+FETCH_SIZE = 1000
+
+async def _collect(result, limit: int | None, skip: int) -> list[dict]:
+    rows = []
+    async for record in result:
+        if skip:
+            skip -= 1
+            continue
+        rows.append(record.data())
+        if limit is not None and len(rows) >= limit:
+            break
+    return rows
+
+async def fetch_rows(cypher: str, params: dict = None, limit: int | None = None, skip: int = 0):
+    """
+    Like run_query, but iterates the result record by record and stops
+    after `skip` + `limit` records; the rest is discarded on the server
+    side instead of being buffered, so memory stays bounded by `limit`.
+    """
+    async with driver.session(fetch_size=FETCH_SIZE) as session:
+        result = await session.run(cypher, params or {})
+        return await _collect(result, limit, skip)
+
+async def read_rows(
+    cypher: str, params: dict = None, limit: int | None = None, skip: int = 0, timeout: float | None = None
+):
+    """
+    fetch_rows in a read transaction (execute_read): the server rejects
+    writes and aborts the transaction after `timeout` seconds.
+    """
+    @unit_of_work(timeout=timeout)
+    async def work(tx):
+        result = await tx.run(cypher, params or {})
+        return await _collect(result, limit, skip)
+
+    async with driver.session(fetch_size=FETCH_SIZE, default_access_mode=READ_ACCESS) as session:
+        return await session.execute_read(work)
+
+async def explain(cypher: str, params: dict = None) -> dict | None:
+    """The plan of `cypher` (EXPLAIN: planned, not run)."""
+    async with driver.session(default_access_mode=READ_ACCESS) as session:
+        result = await session.run("EXPLAIN " + cypher, params or {})
+        summary = await result.consume()
+        return summary.plan
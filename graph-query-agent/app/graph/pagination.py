@@ -0,0 +1,65 @@
+# apps/graph-query-agent/app/graph/pagination.py
+import base64
+import hashlib
+import json
+from dataclasses import dataclass
+from ..config import settings
+
+# ---------------------------------------------------------
+# Pagination: every tool returns at most `limit` rows
+# (QUERY_DEFAULT_LIMIT when not given, never more than
+# QUERY_MAX_LIMIT) and a `next_cursor` while more remain.
+# Cursors are opaque to callers: the offset of the next
+# page plus a fingerprint of the query they belong to, so
+# a cursor cannot be replayed against a different query.
+# ---------------------------------------------------------
+
+
+def _fingerprint(query: tuple) -> str:
+    return hashlib.sha256(json.dumps(query, default=str).encode()).hexdigest()[:16]
+
+
+@dataclass(frozen=True)
+class Page:
+    offset: int
+    limit: int
+    fingerprint: str
+
+    @classmethod
+    def start(cls, cursor: str | None, limit: int | None, *query) -> "Page":
+        """The page `cursor` points to (first page without one) of the query identified by `query`."""
+        if limit is None:
+            limit = settings.QUERY_DEFAULT_LIMIT
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+        limit = min(limit, settings.QUERY_MAX_LIMIT)
+        fingerprint = _fingerprint(query)
+        offset = 0
+        if cursor:
+            try:
+                state = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+                offset, cursor_fingerprint = int(state["o"]), state["q"]
+            except (ValueError, KeyError, TypeError):
+                raise ValueError("Invalid cursor") from None
+            if cursor_fingerprint != fingerprint or offset < 0:
+                raise ValueError("Cursor does not belong to this query")
+        return cls(offset, limit, fingerprint)
+
+    @property
+    def fetch(self) -> int:
+        # One row more than the page, to tell whether another page follows
+        return self.limit + 1
+
+    @property
+    def key(self) -> str:
+        # The query and the page of it: the result cache key
+        return f"{self.fingerprint}:{self.offset}:{self.limit}"
+
+    def next_cursor(self, rows: int) -> str | None:
+        if rows <= self.limit:
+            return None
+        state = json.dumps({"o": self.offset + self.limit, "q": self.fingerprint})
+        return base64.urlsafe_b64encode(state.encode()).decode()
+
+    def result(self, rows: list, **extra) -> dict:
+        return {"results": rows[:self.limit], **extra, "next_cursor": self.next_cursor(len(rows))}
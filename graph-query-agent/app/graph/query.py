@@ -1,68 +1,240 @@
-from .driver import run_query
+from neo4j.exceptions import Neo4jError
+from ..config import settings
+from .backend import get_backend
+from .cache import cached, cached_many
+from .cypher_guard import plan_error, read_only_error
+from .driver import explain, read_rows
+from .pagination import Page
+
+# Every query takes an optional `repo` namespace filter (fastapi,
+# starlette, ...); None searches all indexed repositories.
+# Queries go through the configured graph backend (GRAPH_BACKEND),
+# so they also run on the in-memory graph.
+#
+# `projection` selects how much of each node is returned:
+# "minimal" (label, name, qname, file, start, end; relationships
+# as their type) or "full" (every property). Import chains come
+# back as a node table plus paths of indexes into it, so nodes
+# shared by several paths are sent once.
+#
+# Every query returns one page, {"results": [...], "next_cursor"},
+# of at most `limit` rows (see pagination.py); pass next_cursor
+# back to get the next page. Invalid arguments raise ValueError.
+#
+# Pages of the lookups (1-3, 5) go through the result cache
+# (see cache.py), which is dropped when the indexer writes.
+#
+# The batch lookups (8) take a list of names and return, per name,
+# the first page the single lookup would return, cursor included.
+# Names found in the cache are not queried; the rest are resolved
+# by one backend call (one UNWIND query on Neo4j).
 
 # ---------------------------------------------------------
 # 1) Find Entity
 # ---------------------------------------------------------
-async def find_entity_node(name: str):
-    return await run_query("""
-        MATCH (n {name:$name})
-        RETURN n
-    """, {"name": name})
+async def find_entity_node(
+    name: str,
+    repo: str | None = None,
+    projection: str = "minimal",
+    limit: int | None = None,
+    cursor: str | None = None,
+):
+    # Short name (APIRouter) or qualified name (fastapi.routing.APIRouter)
+    page = Page.start(cursor, limit, "find_entity", name, repo, projection)
+
+    async def run():
+        nodes = await get_backend().find_by_name(name, repo, projection, page.offset, page.fetch)
+        return page.result([{"n": node} for node in nodes])
+
+    return await cached(page.key, run)
 
 
 # ---------------------------------------------------------
 # 2) Dependencies (CALLS)
 # ---------------------------------------------------------
-async def get_dependencies_for(name: str):
-    return await run_query("""
-        MATCH (caller:Function {name:$name})-[:CALLS]->(dep)
-        RETURN dep
-    """, {"name": name})
+async def get_dependencies_for(
+    name: str,
+    repo: str | None = None,
+    projection: str = "minimal",
+    limit: int | None = None,
+    cursor: str | None = None,
+):
+    page = Page.start(cursor, limit, "get_dependencies", name, repo, projection)
+
+    async def run():
+        rows = await get_backend().neighbors(
+            name, "CALLS", "out", repo, label="Function", projection=projection, skip=page.offset, limit=page.fetch
+        )
+        return page.result([{"dep": row["b"]} for row in rows])
+
+    return await cached(page.key, run)
 
 
 # ---------------------------------------------------------
 # 3) Dependents (reverse CALLS)
 # ---------------------------------------------------------
-async def get_dependents_for(name: str):
-    return await run_query("""
-        MATCH (dep)<-[:CALLS]-(caller:Function {name:$name})
-        RETURN caller
-    """, {"name": name})
+async def get_dependents_for(
+    name: str,
+    repo: str | None = None,
+    projection: str = "minimal",
+    limit: int | None = None,
+    cursor: str | None = None,
+):
+    page = Page.start(cursor, limit, "get_dependents", name, repo, projection)
+
+    async def run():
+        rows = await get_backend().neighbors(
+            name, "CALLS", "in", repo, projection=projection, skip=page.offset, limit=page.fetch
+        )
+        return page.result([{"caller": row["b"]} for row in rows])
+
+    return await cached(page.key, run)
 
 
 # ---------------------------------------------------------
 # 4) Trace Import Chains
 # ---------------------------------------------------------
-async def trace_import_chain(path: str):
-    return await run_query("""
-        MATCH p = (f:File {path:$path})-[:IMPORTS*1..5]->(m)
-        RETURN p
-    """, {"path": path})
+async def trace_import_chain(
+    path: str,
+    repo: str | None = None,
+    projection: str = "minimal",
+    limit: int | None = None,
+    cursor: str | None = None,
+):
+    # A page is `limit` paths; `nodes` holds the nodes of this page only
+    page = Page.start(cursor, limit, "trace_imports", path, repo, projection)
+    chains = await get_backend().traverse(
+        "File", {"path": path}, "IMPORTS", 5, repo, projection, page.offset, page.fetch
+    )
+    nodes, paths = chains["nodes"], chains["paths"][:page.limit]
+    if len(chains["paths"]) > page.limit:
+        # Drop the nodes only the look-ahead path referenced
+        keep = sorted({i for path in paths for i in path})
+        renumber = {old: new for new, old in enumerate(keep)}
+        nodes = [nodes[i] for i in keep]
+        paths = [[renumber[i] for i in path] for path in paths]
+    return {"results": paths, "nodes": nodes, "next_cursor": page.next_cursor(len(chains["paths"]))}
 
 
 # ---------------------------------------------------------
 # 5) Find Related by Relationship Type
 # ---------------------------------------------------------
-async def find_related_entities(name: str, rel: str):
-    allowed = ["CONTAINS","IMPORTS","CALLS","INHERITS_FROM","DECORATED_BY"]
+async def find_related_entities(
+    name: str,
+    rel: str,
+    include_hubs: bool = False,
+    repo: str | None = None,
+    projection: str = "minimal",
+    limit: int | None = None,
+    cursor: str | None = None,
+):
+    allowed = ["CONTAINS","IMPORTS","CALLS","INHERITS_FROM","DECORATED_BY","HAS_PARAMETER"]
     if rel not in allowed:
         return {"error": f"Invalid relationship type. Allowed: {allowed}"}
 
-    return await run_query(
-        f"""
-        MATCH (a {{name:$name}})-[r:{rel}]->(b)
-        RETURN a,r,b
-        """,
-        {"name": name}
-    )
+    # Hub nodes (modules, imports, decorators, shared parameters) have
+    # thousands of relationships; they are not expanded or returned unless asked for
+    page = Page.start(cursor, limit, "find_related", name, rel, include_hubs, repo, projection)
+
+    async def run():
+        rows = await get_backend().neighbors(
+            name, rel, "out", repo, include_hubs=include_hubs, projection=projection,
+            skip=page.offset, limit=page.fetch,
+        )
+        return page.result(rows)
+
+    return await cached(page.key, run)
+
+
+# ---------------------------------------------------------
+# 6) Indexed Repositories
+# ---------------------------------------------------------
+async def list_repository_nodes(limit: int | None = None, cursor: str | None = None):
+    page = Page.start(cursor, limit, "list_repositories")
+    repositories = await get_backend().repositories()
+    return page.result(repositories[page.offset:page.offset + page.fetch])
 
 
 # ---------------------------------------------------------
-# 6) Safe Cypher Executor
+# 7) Safe Cypher Executor
 # ---------------------------------------------------------
-async def execute_safe_cypher(query: str):
-    blocked = ["DELETE", "DETACH", "REMOVE", "DROP", "MERGE", "SET"]
-    if any(cmd in query.upper() for cmd in blocked):
-        return {"error": "Query blocked for safety. Read-only queries only."}
+async def execute_safe_cypher(query: str, limit: int | None = None, cursor: str | None = None):
+    if error := read_only_error(query):
+        return {"error": error}
+    if settings.GRAPH_BACKEND != "neo4j":
+        return {"error": "Cypher queries need GRAPH_BACKEND=neo4j."}
+
+    # At most CYPHER_MAX_ROWS records are read over all pages
+    page = Page.start(cursor, limit, "execute_query", query)
+    remaining = settings.CYPHER_MAX_ROWS - page.offset
+    if remaining <= 0:
+        raise ValueError(f"Row cap reached: at most {settings.CYPHER_MAX_ROWS} rows per query")
+
+    try:
+        if error := plan_error(await explain(query)):
+            return {"error": error}
+        # The query is not rewritten; its records are read one by one in a
+        # read transaction with a timeout, and reading stops after the page
+        rows = await read_rows(
+            query, skip=page.offset, limit=min(page.fetch, remaining + 1), timeout=settings.CYPHER_TIMEOUT
+        )
+    except Neo4jError as e:
+        return {"error": f"Query failed: {e.message or e}"}
+    if len(rows) > remaining:
+        # More rows than the cap allows: last page, marked as cut short
+        return {**page.result(rows[:remaining]), "truncated": True}
+    return page.result(rows)
+
+
+# ---------------------------------------------------------
+# 8) Batch Lookups
+# ---------------------------------------------------------
+async def _batch(tool: str, names: list[str], limit: int | None, query: tuple, lookup) -> dict:
+    names = list(dict.fromkeys(names))
+    if len(names) > settings.QUERY_MAX_BATCH:
+        raise ValueError(f"At most {settings.QUERY_MAX_BATCH} names per call")
+    # Same pages, and so the same cache entries and cursors, as the single lookup
+    pages = {name: Page.start(None, limit, tool, name, *query) for name in names}
+    by_key = {page.key: name for name, page in pages.items()}
+
+    async def run(keys):
+        wanted = [by_key[key] for key in keys]
+        found = await lookup(wanted, pages[wanted[0]].fetch)  # the same for every page
+        return {pages[name].key: pages[name].result(found[name]) for name in wanted}
+
+    results = await cached_many(list(by_key), run) if names else {}
+    return {"results": {name: results[page.key] for name, page in pages.items()}}
+
+
+async def find_entity_nodes(
+    names: list[str], repo: str | None = None, projection: str = "minimal", limit: int | None = None
+):
+    async def lookup(wanted, fetch):
+        found = await get_backend().find_by_names(wanted, repo, projection, fetch)
+        return {name: [{"n": node} for node in nodes] for name, nodes in found.items()}
+
+    return await _batch("find_entity", names, limit, (repo, projection), lookup)
+
+
+async def get_dependencies_many_for(
+    names: list[str], repo: str | None = None, projection: str = "minimal", limit: int | None = None
+):
+    async def lookup(wanted, fetch):
+        found = await get_backend().neighbors_many(
+            wanted, "CALLS", "out", repo, label="Function", projection=projection, limit=fetch
+        )
+        return {name: [{"dep": row["b"]} for row in rows] for name, rows in found.items()}
+
+    return await _batch("get_dependencies", names, limit, (repo, projection), lookup)
+
+
+async def get_dependents_many_for(
+    names: list[str], repo: str | None = None, projection: str = "minimal", limit: int | None = None
+):
+    async def lookup(wanted, fetch):
+        found = await get_backend().neighbors_many(
+            wanted, "CALLS", "in", repo, projection=projection, limit=fetch
+        )
+        return {name: [{"caller": row["b"]} for row in rows] for name, rows in found.items()}
 
-    return await run_query(query)
+    return await _batch("get_dependents", names, limit, (repo, projection), lookup)
@@ -0,0 +1,137 @@
+# graph-query-agent/benchmarks/find_related.py
+"""
+find_related latency and db hits on an indexed FastAPI graph.
+
+Every case runs with hub expansion on (the old behaviour) and off
+(the default). To compare parameter storage, run a full index
+(POST /api/index) with the indexer's PARAMETER_MODE=shared, then
+again with PARAMETER_MODE=node, and benchmark after each:
+
+    python -m benchmarks.find_related --label shared --out before.json
+    python -m benchmarks.find_related --label node --baseline before.json
+
+--projection full compares result payloads (JSON bytes) with the default
+minimal projection. The result cache is off, so every run reaches the
+database; --cache leaves it on to measure cached lookups.
+
+Run from graph-query-agent/ against the Neo4j configured in app/config.py.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from app.config import settings
+from app.graph.driver import driver
+from app.graph.query import find_related_entities
+
+# (name, relationship): regular entities, then names that reach hub nodes
+CASES = [
+    ("add_api_route", "HAS_PARAMETER"),
+    ("get_request_handler", "CALLS"),
+    ("APIRouter", "INHERITS_FROM"),
+    ("get", "DECORATED_BY"),
+    ("request", "HAS_PARAMETER"),
+    ("self", "HAS_PARAMETER"),
+    ("typing", "IMPORTS"),
+    ("Depends", "DECORATED_BY"),
+]
+
+PROFILE_QUERY = """
+    PROFILE
+    MATCH (a:Entity {{name:$name}})
+    WHERE ($include_hubs OR NOT a:Hub) AND ($repo IS NULL OR a.repo = $repo)
+    MATCH (a)-[r:{rel}]->(b)
+    WHERE $include_hubs OR NOT b:Hub
+    RETURN a,r,b
+"""
+
+
+def _db_hits(plan) -> int:
+    if plan is None:
+        return 0
+    hits = plan.get("dbHits", 0) if isinstance(plan, dict) else getattr(plan, "db_hits", 0)
+    children = plan.get("children", []) if isinstance(plan, dict) else getattr(plan, "children", [])
+    return hits + sum(_db_hits(child) for child in children)
+
+
+async def _profile(name: str, rel: str, include_hubs: bool) -> int:
+    async with driver.session() as session:
+        result = await session.run(
+            PROFILE_QUERY.format(rel=rel), {"name": name, "include_hubs": include_hubs, "repo": None}
+        )
+        summary = await result.consume()
+        return _db_hits(summary.profile)
+
+
+async def _case(name: str, rel: str, include_hubs: bool, runs: int, projection: str) -> dict:
+    # One page of the largest size the server allows
+    limit = settings.QUERY_MAX_LIMIT
+    await find_related_entities(name, rel, include_hubs, projection=projection, limit=limit)  # warm up caches and plans
+    timings, results = [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        page = await find_related_entities(name, rel, include_hubs, projection=projection, limit=limit)
+        results = page["results"]
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        "name": name,
+        "relationship": rel,
+        "include_hubs": include_hubs,
+        "rows": len(results),
+        "payload_bytes": len(json.dumps(results, default=str)),
+        "db_hits": await _profile(name, rel, include_hubs),
+        "p50_ms": round(statistics.median(timings), 2),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 2),
+    }
+
+
+async def run(runs: int, projection: str) -> list[dict]:
+    results = []
+    for name, rel in CASES:
+        for include_hubs in (True, False):
+            results.append(await _case(name, rel, include_hubs, runs, projection))
+    await driver.close()
+    return results
+
+
+def _print(results: list[dict], baseline: list[dict] | None):
+    before = {(r["name"], r["relationship"], r["include_hubs"]): r for r in baseline or []}
+    print(f"{'case':<36} {'hubs':<5} {'rows':>6} {'bytes':>9} {'db hits':>9} {'p50 ms':>8} {'p95 ms':>8}  vs baseline p50")
+    for r in results:
+        key = (r["name"], r["relationship"], r["include_hubs"])
+        delta = ""
+        if key in before and before[key]["p50_ms"]:
+            delta = f"{r['p50_ms'] / before[key]['p50_ms']:.2f}x"
+        print(
+            f"{r['name'] + ' ' + r['relationship']:<36} {str(r['include_hubs']):<5} "
+            f"{r['rows']:>6} {r['payload_bytes']:>9} {r['db_hits']:>9} {r['p50_ms']:>8} {r['p95_ms']:>8}  {delta}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=20, help="timed runs per case")
+    parser.add_argument("--projection", default="minimal", choices=["minimal", "full"])
+    parser.add_argument("--cache", action="store_true", help="keep the query result cache on")
+    parser.add_argument("--label", default="", help="tag stored with the results, e.g. the PARAMETER_MODE")
+    parser.add_argument("--out", help="write results as JSON")
+    parser.add_argument("--baseline", help="JSON from an earlier run to compare against")
+    args = parser.parse_args()
+    if not args.cache:
+        settings.QUERY_CACHE_SIZE = 0
+
+    results = asyncio.run(run(args.runs, args.projection))
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+    _print(results, baseline)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"label": args.label, "runs": args.runs, "projection": args.projection, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,46 +2,159 @@ import os
 from typing import Any
 
 from fastmcp import FastMCP
+from app.graph.cache import get_query_cache
 from app.graph.query import (
     find_entity_node,
     get_dependencies_for,
     get_dependents_for,
     trace_import_chain,
     find_related_entities,
+    list_repository_nodes,
     execute_safe_cypher,
+    find_entity_nodes,
+    get_dependencies_many_for,
+    get_dependents_many_for,
 )
 
 mcp = FastMCP[Any](name="Graph Query Agent")
 
+async def _paged(query) -> dict:
+    # Bad projections, limits and cursors come back as errors
+    try:
+        return await query
+    except ValueError as e:
+        return {"error": str(e)}
+
+# Every tool returns at most `limit` results (QUERY_DEFAULT_LIMIT when
+# omitted, capped at QUERY_MAX_LIMIT) and a `next_cursor`; pass it back
+# as `cursor` for the next page. It is null on the last page.
+
 @mcp.tool
-async def find_entity(name: str) -> dict:
-    """Locate a class, function, module, or file by name."""
-    return {"results": await find_entity_node(name)}
+async def find_entity(
+    name: str,
+    repo: str | None = None,
+    projection: str = "minimal",
+    limit: int | None = None,
+    cursor: str | None = None,
+) -> dict:
+    """
+    Locate a class, function, module, or file by name or qualified name.
+    repo limits the search to one indexed repository (e.g. "starlette").
+    projection: "minimal" (label, name, qname, file, start, end) or "full" (every property).
+    """
+    return await _paged(find_entity_node(name, repo, projection, limit, cursor))
 
 @mcp.tool
-async def get_dependencies(name: str) -> dict:
+async def get_dependencies(
+    name: str,
+    repo: str | None = None,
+    projection: str = "minimal",
+    limit: int | None = None,
+    cursor: str | None = None,
+) -> dict:
     """Find what an entity depends on (CALL graph)."""
-    return {"results": await get_dependencies_for(name)}
+    return await _paged(get_dependencies_for(name, repo, projection, limit, cursor))
 
 @mcp.tool
-async def get_dependents(name: str) -> dict:
+async def get_dependents(
+    name: str,
+    repo: str | None = None,
+    projection: str = "minimal",
+    limit: int | None = None,
+    cursor: str | None = None,
+) -> dict:
     """Find who depends on this entity."""
-    return {"results": await get_dependents_for(name)}
+    return await _paged(get_dependents_for(name, repo, projection, limit, cursor))
+
+@mcp.tool
+async def trace_imports(
+    path: str,
+    repo: str | None = None,
+    projection: str = "minimal",
+    limit: int | None = None,
+    cursor: str | None = None,
+) -> dict:
+    """
+    Follow IMPORTS chain for a module/file. Every node of the page is
+    listed once in `nodes`; each result is a path of indexes into it.
+    """
+    return await _paged(trace_import_chain(path, repo, projection, limit, cursor))
+
+@mcp.tool
+async def find_related(
+    name: str,
+    relationship: str,
+    include_hubs: bool = False,
+    repo: str | None = None,
+    projection: str = "minimal",
+    limit: int | None = None,
+    cursor: str | None = None,
+) -> dict:
+    """
+    Search by relationship: CONTAINS, IMPORTS, CALLS, INHERITS_FROM, DECORATED_BY, HAS_PARAMETER.
+    Hub nodes (modules, imports, decorators) are only expanded with include_hubs=True.
+    With the minimal projection `r` is just the relationship type.
+    """
+    return await _paged(
+        find_related_entities(name, relationship, include_hubs, repo, projection, limit, cursor)
+    )
+
+@mcp.tool
+async def list_repositories(limit: int | None = None, cursor: str | None = None) -> dict:
+    """Indexed repositories: namespace (the `repo` filter), URL, ref and commit."""
+    return await _paged(list_repository_nodes(limit, cursor))
+
+@mcp.tool
+async def execute_query(query: str, limit: int | None = None, cursor: str | None = None) -> dict:
+    """
+    Run read-only Cypher queries. Writes, unbounded variable-length patterns
+    and plans with cartesian products or huge row estimates are rejected;
+    queries run with a timeout and a row cap. Records past the page are never read.
+    """
+    return await _paged(execute_safe_cypher(query, limit, cursor))
+
+# Batch lookups: one call (one query) for several names. Each name gets
+# the first page its single lookup would return; continue a name with
+# the single tool and that page's next_cursor.
+
+@mcp.tool
+async def find_entities(
+    names: list[str],
+    repo: str | None = None,
+    projection: str = "minimal",
+    limit: int | None = None,
+) -> dict:
+    """Locate several entities at once: {"results": {name: page}} (see find_entity)."""
+    return await _paged(find_entity_nodes(names, repo, projection, limit))
 
 @mcp.tool
-async def trace_imports(path: str) -> dict:
-    """Follow IMPORTS chain for a module/file."""
-    return {"results": await trace_import_chain(path)}
+async def get_dependencies_many(
+    names: list[str],
+    repo: str | None = None,
+    projection: str = "minimal",
+    limit: int | None = None,
+) -> dict:
+    """What each of several entities depends on: {"results": {name: page}}."""
+    return await _paged(get_dependencies_many_for(names, repo, projection, limit))
 
 @mcp.tool
-async def find_related(name: str, relationship: str) -> dict:
-    """Search by relationship: CONTAINS, IMPORTS, CALLS, INHERITS_FROM, DECORATED_BY."""
-    return {"results": await find_related_entities(name, relationship)}
+async def get_dependents_many(
+    names: list[str],
+    repo: str | None = None,
+    projection: str = "minimal",
+    limit: int | None = None,
+) -> dict:
+    """Who depends on each of several entities: {"results": {name: page}}."""
+    return await _paged(get_dependents_many_for(names, repo, projection, limit))
 
 @mcp.tool
-async def execute_query(query: str) -> dict:
-    """Run read-only Cypher queries."""
-    return {"results": await execute_safe_cypher(query)}
+async def cache_status() -> dict:
+    """
+    Result cache of the lookup tools: hits (in process and on disk), misses,
+    hit rate, invalidations by index writes and the index markers last seen.
+    """
+    cache = get_query_cache()
+    return await cache.stats() if cache else {"enabled": False}
 
 if __name__ == "__main__":
     transport = os.environ.get("MCP_TRANSPORT", "stdio")
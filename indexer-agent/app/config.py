@@ -1,6 +1,7 @@
 # indexer-agent/app/config.py
 import os
 from pathlib import Path
+from typing import Literal
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 # Resolve .env path relative to this file's location (indexer-agent/.env)
@@ -18,10 +19,75 @@ def _get_neo4j_default():
 class Settings(BaseSettings):
     FASTAPI_REPO_URL: str = "https://github.com/fastapi/fastapi.git"
     REPO_DIR: str = "/tmp/fastapi-repo"
+
+    # Clone shape: history depth (0 = full), partial-clone filter (empty = none),
+    # branch (empty = remote default) and sparse-checkout patterns (empty = all)
+    REPO_CLONE_DEPTH: int = 1
+    REPO_CLONE_FILTER: str = "blob:none"
+    REPO_BRANCH: str = ""
+    REPO_SPARSE_PATHS: list[str] = []
+
+    # Graph namespace (`repo` key) of FASTAPI_REPO_URL (empty = derived from the
+    # URL, e.g. "fastapi"), and where repositories indexed under other
+    # namespaces are cloned (REPOS_DIR/<namespace>)
+    REPO_NAMESPACE: str = ""
+    REPOS_DIR: str = "/tmp/repos"
+
     NEO4J_URI: str = _get_neo4j_default()
     NEO4J_USER: str = "neo4j"
     NEO4J_PASSWORD: str = "password"
 
+    # Graph backend: "neo4j", or "memory" (in-process, no server). The memory
+    # graph is saved to GRAPH_SNAPSHOT (empty = not saved), which the query
+    # and analyst agents load when they run with GRAPH_BACKEND=memory
+    GRAPH_BACKEND: str = "neo4j"
+    GRAPH_SNAPSHOT: str = ""
+
+    # Indexer replicas sharing the graph (compose passes the gateway's
+    # INDEXER_REPLICAS); the memory backend refuses to run with more than one
+    INDEXER_REPLICAS: int = 1
+
+    # Which files get indexed: fnmatch patterns against repo-relative paths
+    # (`*` also matches `/`) and a size cap in bytes (0 = no cap)
+    INDEX_INCLUDE: list[str] = ["*.py"]
+    INDEX_EXCLUDE: list[str] = [
+        "docs_src/*", "docs/*", "tests/*", "*/tests/*",
+        "*/_vendor/*", "*/vendor/*", "*/site-packages/*", ".venv/*", "venv/*",
+    ]
+    INDEX_MAX_FILE_BYTES: int = 1_000_000
+
+    # Indexing pipeline: parse worker processes, parsed-file queue depth and
+    # cap on source bytes read but not yet written (0 = no cap)
+    INDEX_WORKERS: int = os.cpu_count() or 1
+    INDEX_QUEUE_SIZE: int = 64
+    INDEX_MAX_INFLIGHT_BYTES: int = 64 * 1024 * 1024
+
+    # Concurrent file write transactions, and how long the driver keeps
+    # retrying a transaction on transient errors (deadlocks) with backoff
+    INDEX_WRITE_CONCURRENCY: int = 16
+    NEO4J_MAX_RETRY_TIME: float = 30.0
+
+    # How function parameters are stored: "node" (one Parameter node per
+    # function with position, kind, annotation and default), "property"
+    # (lists on the function node) or "shared" (one global node per name)
+    PARAMETER_MODE: Literal["node", "property", "shared"] = "node"
+
+    # Rows per transaction when sweeping stale entities after a reindex
+    GC_BATCH_SIZE: int = 10000
+
+    # On-disk parse cache shared by parse workers and replicas (empty disables)
+    PARSE_CACHE_DIR: str = "/tmp/indexer-cache"
+    PARSE_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+
+    # Per-file checkpoints that let interrupted index runs resume (empty disables)
+    INDEX_CHECKPOINT_DIR: str = "/tmp/indexer-cache"
+
+    # Watch mode: event backend ("auto", "inotify" via watchfiles, or "poll"),
+    # quiet period before a burst of changes is reindexed, and poll interval
+    WATCH_BACKEND: str = "auto"
+    WATCH_DEBOUNCE_MS: int = 500
+    WATCH_POLL_INTERVAL: float = 1.0
+
     model_config = SettingsConfigDict(
         env_file=str(ENV_FILE),
         env_file_encoding="utf-8",
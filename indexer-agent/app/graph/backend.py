@@ -0,0 +1,939 @@
+# apps/indexer-agent/app/graph/backend.py
+import asyncio
+import hashlib
+import os
+import pickle
+import re
+from abc import ABC, abstractmethod
+from array import array
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from neo4j.exceptions import DriverError, Neo4jError
+from ..config import settings
+from ..indexing.ir import ParamRec
+from ..indexing.repo_spec import default_namespace
+from .driver import run_query, run_transaction
+from .schema import (
+    BACKFILL_ENTITY_LABEL, BACKFILL_HUB_LABEL, BACKFILL_REPO, CONSTRAINTS, DROP_CONSTRAINTS, INDEXES,
+)
+
+# ---------------------------------------------------------
+# Graph backends. The writes the indexer makes (batched
+# file writes, retractions, stale-entity sweeps, index
+# state on the Repository node) behind one interface, with
+# two implementations:
+#   neo4j   Cypher through app.graph.driver (default)
+#   memory  an in-process graph with dict and array
+#           adjacency indexes, for single-node use and CI
+# File writes are described as operations on a GraphBatch
+# (upsert_entity, add_edge, ...); only the Neo4j backend
+# turns them into Cypher.
+# Selected with GRAPH_BACKEND. The memory graph is saved
+# to a snapshot file (GRAPH_SNAPSHOT) that the query and
+# analyst agents reload whenever it changes; it lives in
+# one process, so it needs a single indexer replica.
+#
+# Nodes are identified by (repo, label, key): label is the
+# key label (File, Entity, Import, Module, Decorator,
+# Parameter, Docstring, Repository) and key the properties
+# it is unique on, as in graph/schema.py.
+#
+# The query and analyst agents keep the read side of this
+# module; the memory graph's attributes and snapshot
+# format (SNAPSHOT_VERSION) must match across the copies.
+# ---------------------------------------------------------
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+# Seconds the memory backend waits after a write before saving its snapshot,
+# so a burst of writes is saved once
+SNAPSHOT_DELAY = 1.0
+SNAPSHOT_VERSION = 1
+
+# Nodes the indexer writes and the sweeps delete
+INDEXED_NODES = "(n:Entity OR n:File OR n:Docstring)"
+INDEXED_LABELS = ("Entity", "File", "Docstring")
+
+
+def _identifier(name: str) -> str:
+    # Property names are spliced into Cypher
+    if not _IDENTIFIER.match(name):
+        raise ValueError(f"Invalid graph identifier: {name!r}")
+    return name
+
+
+def _doc_hash(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class GraphBatch(ABC):
+    """
+    The writes of one or more files, committed in a single transaction.
+
+    Classes, functions and methods are Entity nodes keyed by their
+    module-qualified name, so edges link exactly one node each. Call
+    and base targets defined elsewhere are created as placeholders
+    and take their real label once their own file is written. Every
+    node and relationship is stamped with `generation` (see
+    graph/sweep.py) and carries the namespace `repo`, part of each
+    node key, so repositories never share nodes. Nodes shared by much
+    of the repo (modules, imports, decorators, shared parameters) are
+    labelled :Hub, so query traversals can avoid expanding them.
+    """
+
+    def __init__(self, generation: int, repo: str):
+        self.generation = generation
+        self.repo = repo
+
+    @abstractmethod
+    def upsert_file(self, path: str, file_hash: str | None) -> None:
+        """The File node of `path`, with its content hash."""
+
+    @abstractmethod
+    def add_import(self, path: str, module: str) -> None:
+        """File -IMPORTS-> Import -DEPENDS_ON-> Module, both shared by name."""
+
+    @abstractmethod
+    def upsert_entity(self, label: str, qname: str, name: str, path: str, start: int, end: int) -> None:
+        """A Class, Function or Method defined in `path`, which CONTAINS it."""
+
+    @abstractmethod
+    def set_parameters(self, qname: str, params: tuple[ParamRec, ...]) -> None:
+        """The parameters of a function or method, stored as PARAMETER_MODE says."""
+
+    @abstractmethod
+    def add_decorator(self, qname: str, name: str) -> None:
+        """Entity -DECORATED_BY-> Decorator, shared by name."""
+
+    @abstractmethod
+    def add_docstring(self, qname: str, text: str) -> None:
+        """Entity -DOCUMENTED_BY-> Docstring, shared by content hash."""
+
+    @abstractmethod
+    def add_edge(self, kind: str, source: str, target: str) -> None:
+        """
+        INHERITS_FROM (class → base) or CALLS (caller → callee, with
+        DEPENDS_ON) by qname; skipped when the source entity is missing.
+        """
+
+    @abstractmethod
+    async def commit(self) -> dict:
+        """Apply the batch; returns the statements and rows it took."""
+
+
+class GraphBackend(ABC):
+    async def ensure_schema(self) -> bool:
+        """Create the constraints and indexes writes rely on; False if that failed."""
+        return True
+
+    @abstractmethod
+    def batch(self, generation: int, repo: str) -> GraphBatch:
+        """A new batch of file writes, stamped with `generation` and namespace `repo`."""
+
+    @abstractmethod
+    async def retract_files(self, paths: list[str], repo: str) -> int:
+        """Delete the File nodes of `paths` and the entities they contain."""
+
+    @abstractmethod
+    async def sweep_stale(self, generation: int, repo: str) -> dict:
+        """Delete every indexed node and relationship of `repo` not written by `generation`."""
+
+    @abstractmethod
+    async def sweep_files(self, paths: list[str], generation: int, repo: str) -> dict:
+        """Delete the entities and relationships of the `paths` files that `generation` did not rewrite."""
+
+    @abstractmethod
+    async def sweep_orphans(self, repo: str) -> int:
+        """Delete shared nodes and call/base placeholders of `repo` that nothing refers to."""
+
+    @abstractmethod
+    async def repository(self, repo: str) -> dict | None:
+        """Properties of the Repository node of `repo`, or None."""
+
+    @abstractmethod
+    async def set_indexed_commit(self, repo: str, commit: str, url: str | None, ref: str) -> None:
+        """Record the commit `repo` was indexed at (and its URL and ref), with the time."""
+
+    @abstractmethod
+    async def increment(self, repo: str, counter: str) -> int:
+        """Add one to a counter property of the Repository node (0 when unset); returns the new value."""
+
+    @abstractmethod
+    async def file_hashes(self, repo: str) -> dict[str, str | None]:
+        """{path: content hash} for every File node of `repo`."""
+
+    @abstractmethod
+    async def repositories(self) -> list[dict]:
+        """Every indexed namespace with its URL, ref and last indexed commit."""
+
+    async def close(self):
+        pass
+
+
+# ---------------------------------------------------------
+# Neo4j
+# ---------------------------------------------------------
+# Batched statements, one UNWIND per entity kind.
+# Order matters: every MATCH must find the nodes merged
+# by the statements that run before it.
+# ---------------------------------------------------------
+# Parameter storage (PARAMETER_MODE). Per-function nodes and properties avoid
+# the global `self`/`request` supernodes of the shared mode.
+PARAMETER_STATEMENTS: dict[str, str] = {
+    "node": """
+        UNWIND $rows AS row
+        MATCH (fn:Entity {repo:$repo, qname:row.fn})
+        MERGE (p:Parameter {repo:$repo, fn:row.fn, name:row.param})
+        SET p.position = row.position, p.kind = row.kind,
+            p.annotation = row.annotation, p.default = row.default, p.gen = $gen
+        MERGE (fn)-[r:HAS_PARAMETER]->(p)
+        SET r.gen = $gen
+    """,
+    "property": """
+        UNWIND $rows AS row
+        MATCH (fn:Entity {repo:$repo, qname:row.fn})
+        SET fn.params = row.params, fn.param_kinds = row.kinds,
+            fn.param_annotations = row.annotations, fn.param_defaults = row.defaults
+    """,
+    "shared": """
+        UNWIND $rows AS row
+        MERGE (p:Parameter {repo:$repo, name:row.param})
+        SET p:Entity:Hub, p.gen = $gen
+        WITH row, p
+        MATCH (fn:Entity {repo:$repo, qname:row.fn})
+        MERGE (fn)-[r:HAS_PARAMETER]->(p)
+        SET r.gen = $gen
+    """,
+}
+
+STATEMENTS: list[tuple[str, str | None]] = [
+    ("files", """
+        UNWIND $rows AS row
+        MERGE (f:File {repo:$repo, path:row.file})
+        SET f.hash = row.hash, f.gen = $gen
+    """),
+    ("imports", """
+        UNWIND $rows AS row
+        MERGE (i:Import {repo:$repo, name:row.module})
+        MERGE (m:Module {repo:$repo, name:row.module})
+        SET i:Entity:Hub, m:Entity:Hub, i.gen = $gen, m.gen = $gen
+        WITH row, i, m
+        MATCH (f:File {repo:$repo, path:row.file})
+        MERGE (f)-[r1:IMPORTS]->(i)
+        MERGE (i)-[r2:DEPENDS_ON]->(m)
+        SET r1.gen = $gen, r2.gen = $gen
+    """),
+    ("classes", """
+        UNWIND $rows AS row
+        MERGE (c:Entity {repo:$repo, qname:row.qname})
+        SET c:Class, c.name = row.name, c.file = row.file, c.start = row.start, c.end = row.end,
+            c.gen = $gen
+        REMOVE c:Function
+        WITH row, c
+        MATCH (f:File {repo:$repo, path:row.file})
+        MERGE (f)-[r:CONTAINS]->(c)
+        SET r.gen = $gen
+    """),
+    ("bases", """
+        UNWIND $rows AS row
+        MATCH (child:Entity {repo:$repo, qname:row.child})
+        MERGE (parent:Entity {repo:$repo, qname:row.parent})
+        ON CREATE SET parent:Class, parent.name = row.parent_name
+        SET parent.gen = $gen
+        MERGE (child)-[r:INHERITS_FROM]->(parent)
+        SET r.gen = $gen
+    """),
+    ("functions", """
+        UNWIND $rows AS row
+        MERGE (fn:Entity {repo:$repo, qname:row.qname})
+        SET fn:Function, fn.name = row.name, fn.file = row.file, fn.start = row.start, fn.end = row.end,
+            fn.gen = $gen
+        WITH row, fn
+        MATCH (f:File {repo:$repo, path:row.file})
+        MERGE (f)-[r:CONTAINS]->(fn)
+        SET r.gen = $gen
+    """),
+    ("methods", """
+        UNWIND $rows AS row
+        MERGE (fn:Entity {repo:$repo, qname:row.qname})
+        SET fn:Method, fn.name = row.name, fn.file = row.file, fn.start = row.start, fn.end = row.end,
+            fn.gen = $gen
+        REMOVE fn:Function
+        WITH row, fn
+        MATCH (f:File {repo:$repo, path:row.file})
+        MERGE (f)-[r:CONTAINS]->(fn)
+        SET r.gen = $gen
+    """),
+    ("parameters", None),  # PARAMETER_STATEMENTS[PARAMETER_MODE]
+    ("decorators", """
+        UNWIND $rows AS row
+        MERGE (d:Decorator {repo:$repo, name:row.dec})
+        SET d:Entity:Hub, d.gen = $gen
+        WITH row, d
+        MATCH (fn:Entity {repo:$repo, qname:row.fn})
+        MERGE (fn)-[r:DECORATED_BY]->(d)
+        SET r.gen = $gen
+    """),
+    ("docstrings", """
+        UNWIND $rows AS row
+        MERGE (d:Docstring {repo:$repo, hash:row.hash})
+        ON CREATE SET d.text = row.doc
+        SET d.gen = $gen
+        WITH row, d
+        MATCH (e:Entity {repo:$repo, qname:row.owner})
+        MERGE (e)-[r:DOCUMENTED_BY]->(d)
+        SET r.gen = $gen
+    """),
+    ("calls", """
+        UNWIND $rows AS row
+        MATCH (caller:Entity {repo:$repo, qname:row.caller})
+        MERGE (callee:Entity {repo:$repo, qname:row.callee})
+        ON CREATE SET callee:Function, callee.name = row.callee_name
+        SET callee.gen = $gen
+        MERGE (caller)-[r1:CALLS]->(callee)
+        MERGE (caller)-[r2:DEPENDS_ON]->(callee)
+        SET r1.gen = $gen, r2.gen = $gen
+    """),
+]
+
+
+# ---------------------------------------------------------
+# Lock ordering: rows are sorted by the keys each statement
+# MERGEs on, shared nodes first, so concurrent transactions
+# acquire their locks in the same order instead of deadlocking.
+# ---------------------------------------------------------
+LOCK_KEYS: dict[str, tuple[str, ...]] = {
+    "files": ("file",),
+    "imports": ("module", "file"),
+    "classes": ("qname",),
+    "bases": ("parent", "child"),
+    "functions": ("qname",),
+    "methods": ("qname",),
+    "decorators": ("dec", "fn"),
+    "docstrings": ("hash", "owner"),
+    "calls": ("callee", "caller"),
+}
+
+
+PARAMETER_LOCK_KEYS: dict[str, tuple[str, ...]] = {
+    "node": ("fn", "param"), "property": ("fn",), "shared": ("param", "fn"),
+}
+
+
+def _ordered_rows(key: str, rows: list[dict]) -> list[dict]:
+    """Deduplicate rows and sort them by the statement's lock keys."""
+    unique = {tuple(sorted(row.items())): row for row in rows}
+    fields = PARAMETER_LOCK_KEYS[settings.PARAMETER_MODE] if key == "parameters" else LOCK_KEYS[key]
+    return sorted(unique.values(), key=lambda row: tuple(str(row[f]) for f in fields))
+
+
+
+ENTITY_STATEMENTS = {"Class": "classes", "Function": "functions", "Method": "methods"}
+
+
+class Neo4jBatch(GraphBatch):
+    """Operations become rows of the UNWIND statements, run in one managed transaction."""
+
+    def __init__(self, generation: int, repo: str):
+        super().__init__(generation, repo)
+        self.rows: dict[str, list[dict]] = defaultdict(list)
+
+    def upsert_file(self, path, file_hash):
+        self.rows["files"].append({"file": path, "hash": file_hash})
+
+    def add_import(self, path, module):
+        self.rows["imports"].append({"file": path, "module": module})
+
+    def upsert_entity(self, label, qname, name, path, start, end):
+        self.rows[ENTITY_STATEMENTS[label]].append(
+            {"qname": qname, "name": name, "file": path, "start": start, "end": end}
+        )
+
+    def set_parameters(self, qname, params):
+        if settings.PARAMETER_MODE == "property":
+            # Written for every function, so removed parameters are cleared too
+            self.rows["parameters"].append({
+                "fn": qname,
+                "params": tuple(p.name for p in params),
+                "kinds": tuple(p.kind for p in params),
+                "annotations": tuple(p.annotation or "" for p in params),
+                "defaults": tuple(p.default or "" for p in params),
+            })
+            return
+        for param in params:
+            self.rows["parameters"].append({
+                "fn": qname, "param": param.name, "position": param.position,
+                "kind": param.kind, "annotation": param.annotation, "default": param.default,
+            })
+
+    def add_decorator(self, qname, name):
+        self.rows["decorators"].append({"fn": qname, "dec": name})
+
+    def add_docstring(self, qname, text):
+        self.rows["docstrings"].append({"owner": qname, "doc": text, "hash": _doc_hash(text)})
+
+    def add_edge(self, kind, source, target):
+        name = target.rpartition(".")[2]
+        if kind == "INHERITS_FROM":
+            self.rows["bases"].append({"child": source, "parent": target, "parent_name": name})
+        elif kind == "CALLS":
+            self.rows["calls"].append({"caller": source, "callee": target, "callee_name": name})
+
+    async def commit(self):
+        statements = []
+        for key, cypher in STATEMENTS:
+            if self.rows.get(key):
+                cypher = cypher or PARAMETER_STATEMENTS[settings.PARAMETER_MODE]
+                params = {"rows": _ordered_rows(key, self.rows[key]), "gen": self.generation, "repo": self.repo}
+                statements.append((cypher, params))
+        await run_transaction(statements)
+        return {
+            "statements": len(statements),
+            "rows": sum(len(params["rows"]) for _, params in statements),
+        }
+
+
+class Neo4jBackend(GraphBackend):
+    """
+    File writes run as a Neo4jBatch; large deletes run in batches
+    of GC_BATCH_SIZE rows (CALL ... IN TRANSACTIONS).
+    """
+
+    def __init__(self):
+        self._schema_ready = False
+
+    async def ensure_schema(self):
+        # Runs once per process; failures are logged and retried on the next call
+        if self._schema_ready:
+            return True
+        try:
+            for statement in DROP_CONSTRAINTS:
+                await run_query(statement)
+            await run_query(BACKFILL_REPO, {"repo": default_namespace(), "url": settings.FASTAPI_REPO_URL})
+            for statement in CONSTRAINTS + INDEXES:
+                await run_query(statement)
+            await run_query(BACKFILL_ENTITY_LABEL)
+            await run_query(BACKFILL_HUB_LABEL)
+        except (Neo4jError, DriverError) as e:
+            print(f"Schema bootstrap error: {e}")
+            return False
+        self._schema_ready = True
+        return True
+
+    def batch(self, generation, repo):
+        return Neo4jBatch(generation, repo)
+
+    async def retract_files(self, paths, repo):
+        await run_query("""
+            UNWIND $paths AS path
+            MATCH (f:File {repo:$repo, path:path})
+            OPTIONAL MATCH (f)-[:CONTAINS]->(e)
+            DETACH DELETE e, f
+        """, {"paths": paths, "repo": repo})
+        return len(paths)
+
+    @staticmethod
+    async def _count(cypher: str, params: dict) -> int:
+        records = await run_query(cypher, params)
+        return records[0]["count"] if records else 0
+
+    async def sweep_stale(self, generation, repo):
+        batch = int(settings.GC_BATCH_SIZE)
+        params = {"gen": generation, "repo": repo}
+        relationships = await self._count(f"""
+            MATCH (n {{repo:$repo}})-[r]->()
+            WHERE {INDEXED_NODES} AND coalesce(r.gen, -1) < $gen
+            CALL {{ WITH r DELETE r }} IN TRANSACTIONS OF {batch} ROWS
+            RETURN count(*) AS count
+        """, params)
+        nodes = await self._count(f"""
+            MATCH (n {{repo:$repo}})
+            WHERE {INDEXED_NODES} AND coalesce(n.gen, -1) < $gen
+            CALL {{ WITH n DETACH DELETE n }} IN TRANSACTIONS OF {batch} ROWS
+            RETURN count(*) AS count
+        """, params)
+        return {"scope": "graph", "nodes": nodes, "relationships": relationships}
+
+    async def sweep_files(self, paths, generation, repo):
+        nodes = relationships = 0
+        batch = int(settings.GC_BATCH_SIZE)
+        for i in range(0, len(paths), batch):
+            params = {"paths": paths[i:i + batch], "gen": generation, "repo": repo}
+            nodes += await self._count("""
+                UNWIND $paths AS path
+                MATCH (:File {repo:$repo, path:path})-[:CONTAINS]->(e)
+                WHERE coalesce(e.gen, -1) < $gen
+                DETACH DELETE e
+                RETURN count(*) AS count
+            """, params)
+            relationships += await self._count("""
+                UNWIND $paths AS path
+                MATCH (:File {repo:$repo, path:path})-[:CONTAINS {gen:$gen}]->()-[r]->()
+                WHERE coalesce(r.gen, -1) < $gen
+                DELETE r
+                RETURN count(*) AS count
+            """, params)
+            relationships += await self._count("""
+                UNWIND $paths AS path
+                MATCH (:File {repo:$repo, path:path})-[r]->()
+                WHERE coalesce(r.gen, -1) < $gen
+                DELETE r
+                RETURN count(*) AS count
+            """, params)
+        return {"scope": "files", "nodes": nodes, "relationships": relationships}
+
+    async def sweep_orphans(self, repo):
+        batch = int(settings.GC_BATCH_SIZE)
+        imports = await self._count(f"""
+            MATCH (i:Import {{repo:$repo}})
+            WHERE NOT ()-[:IMPORTS]->(i)
+            CALL {{ WITH i DETACH DELETE i }} IN TRANSACTIONS OF {batch} ROWS
+            RETURN count(*) AS count
+        """, {"repo": repo})
+        others = await self._count(f"""
+            MATCH (n {{repo:$repo}})
+            WHERE (n:Module OR n:Decorator OR n:Parameter OR n:Docstring
+                   OR (n:Entity AND n.qname IS NOT NULL AND n.file IS NULL))
+              AND NOT ()-->(n)
+            CALL {{ WITH n DETACH DELETE n }} IN TRANSACTIONS OF {batch} ROWS
+            RETURN count(*) AS count
+        """, {"repo": repo})
+        return imports + others
+
+    async def repository(self, repo):
+        records = await run_query("""
+            MATCH (r:Repository {repo:$repo})
+            RETURN r
+        """, {"repo": repo})
+        return records[0]["r"] if records else None
+
+    async def set_indexed_commit(self, repo, commit, url, ref):
+        await run_query("""
+            MERGE (r:Repository {repo:$repo})
+            SET r.commit = $commit, r.url = coalesce($url, r.url), r.ref = $ref,
+                r.indexed_at = datetime()
+        """, {"repo": repo, "commit": commit, "url": url, "ref": ref})
+
+    async def increment(self, repo, counter):
+        counter = _identifier(counter)
+        records = await run_query(f"""
+            MERGE (r:Repository {{repo:$repo}})
+            SET r.{counter} = coalesce(r.{counter}, 0) + 1
+            RETURN r.{counter} AS value
+        """, {"repo": repo})
+        return records[0]["value"]
+
+    async def file_hashes(self, repo):
+        records = await run_query("""
+            MATCH (f:File {repo:$repo})
+            RETURN f.path AS path, f.hash AS hash
+        """, {"repo": repo})
+        return {r["path"]: r["hash"] for r in records}
+
+    async def repositories(self):
+        return await run_query("""
+            MATCH (r:Repository)
+            RETURN r.repo AS repo, r.url AS url, r.ref AS ref, r.commit AS commit,
+                   toString(r.indexed_at) AS indexed_at
+            ORDER BY repo
+        """)
+
+
+# ---------------------------------------------------------
+# In-memory graph
+# ---------------------------------------------------------
+def _stale(props: dict, generation: int) -> bool:
+    gen = props.get("gen")
+    return (-1 if gen is None else gen) < generation
+
+
+class MemoryBatch(GraphBatch):
+    """
+    Applies each operation to the memory graph as it is made, with the
+    semantics of the Neo4j statements: relationships whose source
+    entity does not exist are skipped, as the Cypher MATCH skips them.
+    """
+
+    def __init__(self, graph: "MemoryBackend", generation: int, repo: str):
+        super().__init__(generation, repo)
+        self.graph = graph
+        self.stamp = {"gen": generation}
+        self.operations = 0
+
+    def _exists(self, qname: str) -> bool:
+        return self.graph._node_id(self.repo, "Entity", {"qname": qname}) is not None
+
+    def upsert_file(self, path, file_hash):
+        self.operations += 1
+        self.graph._upsert(self.repo, "File", {"path": path}, {"hash": file_hash, **self.stamp})
+
+    def add_import(self, path, module):
+        self.operations += 1
+        for label in ("Import", "Module"):
+            self.graph._upsert(self.repo, label, {"name": module}, self.stamp, ("Entity", "Hub"))
+        file, imported = ("File", {"path": path}), ("Import", {"name": module})
+        self.graph._add_edge(self.repo, "IMPORTS", file, imported, self.stamp)
+        self.graph._add_edge(self.repo, "DEPENDS_ON", imported, ("Module", {"name": module}), self.stamp)
+
+    def upsert_entity(self, label, qname, name, path, start, end):
+        self.operations += 1
+        props = {"name": name, "file": path, "start": start, "end": end, **self.stamp}
+        self.graph._upsert(
+            self.repo, "Entity", {"qname": qname}, props, (label,),
+            remove_labels=() if label == "Function" else ("Function",),
+        )
+        self.graph._add_edge(self.repo, "CONTAINS", ("File", {"path": path}), ("Entity", {"qname": qname}), self.stamp)
+
+    def set_parameters(self, qname, params):
+        self.operations += 1
+        fn = ("Entity", {"qname": qname})
+        if settings.PARAMETER_MODE == "property":
+            if self._exists(qname):
+                self.graph._upsert(self.repo, *fn, {
+                    "params": tuple(p.name for p in params),
+                    "param_kinds": tuple(p.kind for p in params),
+                    "param_annotations": tuple(p.annotation or "" for p in params),
+                    "param_defaults": tuple(p.default or "" for p in params),
+                })
+            return
+        for param in params:
+            if settings.PARAMETER_MODE == "shared":
+                key = {"name": param.name}
+                self.graph._upsert(self.repo, "Parameter", key, self.stamp, ("Entity", "Hub"))
+            elif self._exists(qname):
+                key = {"fn": qname, "name": param.name}
+                self.graph._upsert(self.repo, "Parameter", key, {
+                    "position": param.position, "kind": param.kind,
+                    "annotation": param.annotation, "default": param.default, **self.stamp,
+                })
+            else:
+                continue
+            self.graph._add_edge(self.repo, "HAS_PARAMETER", fn, ("Parameter", key), self.stamp)
+
+    def add_decorator(self, qname, name):
+        self.operations += 1
+        self.graph._upsert(self.repo, "Decorator", {"name": name}, self.stamp, ("Entity", "Hub"))
+        self.graph._add_edge(self.repo, "DECORATED_BY", ("Entity", {"qname": qname}), ("Decorator", {"name": name}), self.stamp)
+
+    def add_docstring(self, qname, text):
+        self.operations += 1
+        key = {"hash": _doc_hash(text)}
+        self.graph._upsert(self.repo, "Docstring", key, self.stamp, create_props={"text": text})
+        self.graph._add_edge(self.repo, "DOCUMENTED_BY", ("Entity", {"qname": qname}), ("Docstring", key), self.stamp)
+
+    def add_edge(self, kind, source, target):
+        self.operations += 1
+        placeholder = {"INHERITS_FROM": "Class", "CALLS": "Function"}.get(kind)
+        if placeholder is None or not self._exists(source):
+            return
+        self.graph._upsert(
+            self.repo, "Entity", {"qname": target}, self.stamp,
+            create_props={"name": target.rpartition(".")[2]}, create_labels=(placeholder,),
+        )
+        nodes = ("Entity", {"qname": source}), ("Entity", {"qname": target})
+        for rel in (kind, "DEPENDS_ON") if kind == "CALLS" else (kind,):
+            self.graph._add_edge(self.repo, rel, *nodes, self.stamp)
+
+    async def commit(self):
+        # Nothing is sent anywhere: the operations are already applied
+        return {"statements": 0, "rows": self.operations}
+
+
+class MemoryBackend(GraphBackend):
+    """
+    Nodes live in parallel lists indexed by node id; dicts map
+    (repo, label, key) and names to ids, and adjacency is kept per
+    relationship type and direction as arrays of node ids, so lookups
+    and single hops are dict accesses. Relationship properties are
+    kept by (source, type, target). File writes run as a MemoryBatch.
+    """
+
+    def __init__(self, snapshot: str = ""):
+        self.snapshot = snapshot
+        self._save_task: asyncio.Task | None = None
+        self._dirty = False
+        self._reset()
+        self._load()
+
+    def _reset(self):
+        self.labels: list[set[str] | None] = []
+        self.props: list[dict | None] = []
+        self.ids: dict[tuple, int] = {}
+        self.names: dict[str, array] = {}
+        self.repo_nodes: dict[str, set[int]] = {}
+        self.out: dict[str, dict[int, array]] = {}
+        self.inc: dict[str, dict[int, array]] = {}
+        self.rel_props: dict[tuple[int, str, int], dict] = {}
+
+    # ---------------------------------------------------------
+    # Snapshot
+    # ---------------------------------------------------------
+    def _state(self) -> dict:
+        return {
+            "version": SNAPSHOT_VERSION,
+            "labels": self.labels, "props": self.props, "ids": self.ids, "names": self.names,
+            "repo_nodes": self.repo_nodes, "out": self.out, "inc": self.inc, "rel_props": self.rel_props,
+        }
+
+    def _load(self):
+        """Continue from the snapshot a previous run saved."""
+        if not self.snapshot or not os.path.exists(self.snapshot):
+            return
+        # Written only by our own indexer (GRAPH_SNAPSHOT is a trusted local path)
+        with open(self.snapshot, "rb") as f:
+            state = pickle.load(f)
+        if state.get("version") != SNAPSHOT_VERSION:
+            print(f"Ignoring graph snapshot {self.snapshot}: version {state.get('version')}")
+            return
+        for name, value in state.items():
+            if name != "version":
+                setattr(self, name, value)
+
+    async def save(self):
+        """Write the snapshot atomically (no-op without GRAPH_SNAPSHOT)."""
+        if not self.snapshot or not self._dirty:
+            return
+        # Pickled on the event loop so no write interleaves; written off it
+        data = pickle.dumps(self._state(), protocol=pickle.HIGHEST_PROTOCOL)
+        self._dirty = False
+        path = Path(self.snapshot)
+
+        def write():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+
+        await asyncio.to_thread(write)
+
+    def _changed(self):
+        self._dirty = True
+        if self.snapshot and (self._save_task is None or self._save_task.done()):
+            self._save_task = asyncio.get_running_loop().create_task(self._save_later())
+
+    async def _save_later(self):
+        await asyncio.sleep(SNAPSHOT_DELAY)
+        try:
+            await self.save()
+        except OSError as e:
+            print(f"Graph snapshot error: {e}")
+
+    async def close(self):
+        if self._save_task and not self._save_task.done():
+            self._save_task.cancel()
+        await self.save()
+
+    # ---------------------------------------------------------
+    # Node and edge primitives
+    # ---------------------------------------------------------
+    @staticmethod
+    def _key(repo: str, label: str, key: dict) -> tuple:
+        return (repo, label, *sorted(key.items()))
+
+    def _node_id(self, repo: str, label: str, key: dict) -> int | None:
+        return self.ids.get(self._key(repo, label, key))
+
+    def _index_names(self, node: int, props: dict, add: bool):
+        for value in {props.get("name"), props.get("qname")} - {None}:
+            ids = self.names.setdefault(value, array("q"))
+            if add:
+                ids.append(node)
+            else:
+                ids.remove(node)
+                if not ids:
+                    del self.names[value]
+
+    def _node_ids(self, repo: str, *labels: str) -> list[int]:
+        """Ids of the nodes of `repo` that carry any of `labels` (all nodes without labels)."""
+        ids = self.repo_nodes.get(repo, ())
+        if not labels:
+            return list(ids)
+        return [n for n in ids if not self.labels[n].isdisjoint(labels)]
+
+    def _edges(self, node: int, direction: str = "out") -> list[tuple[str, int]]:
+        """(type, other node) for every relationship of a node."""
+        index = self.out if direction == "out" else self.inc
+        return [(rel, other) for rel, adjacency in index.items() for other in adjacency.get(node, ())]
+
+    def _upsert(
+        self, repo: str, label: str, key: dict, props: dict | None = None, labels: tuple[str, ...] = (),
+        *, create_props: dict | None = None, create_labels: tuple[str, ...] = (), remove_labels: tuple[str, ...] = (),
+    ):
+        """MERGE the node (repo, label, key), then SET `props` and `labels`; create_* only on a new node."""
+        node_key = self._key(repo, label, key)
+        node = self.ids.get(node_key)
+        if node is None:
+            node = len(self.props)
+            self.ids[node_key] = node
+            self.labels.append({label, *create_labels})
+            self.props.append({"repo": repo, **key, **(create_props or {}), "_key": node_key})
+            self.repo_nodes.setdefault(repo, set()).add(node)
+        else:
+            self._index_names(node, self.props[node], add=False)
+        self.props[node].update(props or {})
+        self.labels[node].update(labels)
+        self.labels[node].difference_update(remove_labels)
+        self._index_names(node, self.props[node], add=True)
+        self._changed()
+
+    def _add_edge(self, repo: str, rel: str, source: tuple[str, dict], target: tuple[str, dict], props: dict):
+        """MERGE a relationship between two existing (label, key) nodes; skipped if either is missing."""
+        a = self._node_id(repo, *source)
+        b = self._node_id(repo, *target)
+        if a is None or b is None:
+            return
+        edge = (a, rel, b)
+        if edge not in self.rel_props:
+            self.out.setdefault(rel, {}).setdefault(a, array("q")).append(b)
+            self.inc.setdefault(rel, {}).setdefault(b, array("q")).append(a)
+            self.rel_props[edge] = {}
+        self.rel_props[edge].update(props)
+        self._changed()
+
+    def _delete_edge(self, source: int, rel: str, target: int):
+        for index, a, b in ((self.out, source, target), (self.inc, target, source)):
+            adjacency = index[rel]
+            adjacency[a].remove(b)
+            if not adjacency[a]:
+                del adjacency[a]
+        del self.rel_props[(source, rel, target)]
+        self._changed()
+
+    def _delete_node(self, node: int):
+        """Delete a node with all its relationships (DETACH DELETE)."""
+        for rel, other in self._edges(node, "out"):
+            self._delete_edge(node, rel, other)
+        for rel, other in self._edges(node, "in"):
+            self._delete_edge(other, rel, node)
+        props = self.props[node]
+        self._index_names(node, props, add=False)
+        self.repo_nodes[props["repo"]].discard(node)
+        del self.ids[props["_key"]]
+        self.labels[node] = self.props[node] = None
+        self._changed()
+
+    def _repository(self, repo: str) -> dict | None:
+        node = self._node_id(repo, "Repository", {})
+        return None if node is None else self.props[node]
+
+    # ---------------------------------------------------------
+    # Writes
+    # ---------------------------------------------------------
+    def batch(self, generation, repo):
+        return MemoryBatch(self, generation, repo)
+
+    async def retract_files(self, paths, repo):
+        for path in paths:
+            file = self._node_id(repo, "File", {"path": path})
+            if file is not None:
+                for rel, entity in self._edges(file):
+                    if rel == "CONTAINS":
+                        self._delete_node(entity)
+                self._delete_node(file)
+        return len(paths)
+
+    # ---------------------------------------------------------
+    # Sweeps
+    # ---------------------------------------------------------
+    async def sweep_stale(self, generation, repo):
+        indexed = self._node_ids(repo, *INDEXED_LABELS)
+        relationships = nodes = 0
+        for node in indexed:
+            for rel, other in self._edges(node):
+                if _stale(self.rel_props[(node, rel, other)], generation):
+                    self._delete_edge(node, rel, other)
+                    relationships += 1
+        for node in indexed:
+            if _stale(self.props[node], generation):
+                self._delete_node(node)
+                nodes += 1
+        return {"scope": "graph", "nodes": nodes, "relationships": relationships}
+
+    async def sweep_files(self, paths, generation, repo):
+        files = [f for path in paths if (f := self._node_id(repo, "File", {"path": path})) is not None]
+        nodes = relationships = 0
+        # Stale entities first, as in the Cypher, so the relationship count
+        # does not depend on the order the entities were written in
+        for file in files:
+            for rel, entity in self._edges(file):
+                if rel == "CONTAINS" and _stale(self.props[entity], generation):
+                    self._delete_node(entity)
+                    nodes += 1
+        for file in files:
+            for rel, entity in self._edges(file):
+                if rel == "CONTAINS" and self.rel_props[(file, rel, entity)].get("gen") == generation:
+                    for entity_rel, other in self._edges(entity):
+                        if _stale(self.rel_props[(entity, entity_rel, other)], generation):
+                            self._delete_edge(entity, entity_rel, other)
+                            relationships += 1
+            for rel, other in self._edges(file):
+                if _stale(self.rel_props[(file, rel, other)], generation):
+                    self._delete_edge(file, rel, other)
+                    relationships += 1
+        return {"scope": "files", "nodes": nodes, "relationships": relationships}
+
+    async def sweep_orphans(self, repo):
+        deleted = 0
+        for node in self._node_ids(repo, "Import"):
+            if not any(rel == "IMPORTS" for rel, _ in self._edges(node, "in")):
+                self._delete_node(node)
+                deleted += 1
+        for node in self._node_ids(repo, "Module", "Decorator", "Parameter", "Docstring", "Entity"):
+            labels, props = self.labels[node], self.props[node]
+            placeholder = "Entity" in labels and props.get("qname") is not None and props.get("file") is None
+            shared = not labels.isdisjoint(("Module", "Decorator", "Parameter", "Docstring"))
+            if (shared or placeholder) and not self._edges(node, "in"):
+                self._delete_node(node)
+                deleted += 1
+        return deleted
+
+    # ---------------------------------------------------------
+    # Index state
+    # ---------------------------------------------------------
+    async def repository(self, repo):
+        props = self._repository(repo)
+        return None if props is None else {k: v for k, v in props.items() if k != "_key"}
+
+    async def set_indexed_commit(self, repo, commit, url, ref):
+        props = {"commit": commit, "ref": ref, "indexed_at": datetime.now(timezone.utc).isoformat()}
+        if url is not None:
+            props["url"] = url
+        self._upsert(repo, "Repository", {}, props)
+
+    async def increment(self, repo, counter):
+        value = (self._repository(repo) or {}).get(counter, 0) + 1
+        self._upsert(repo, "Repository", {}, {counter: value})
+        return value
+
+    async def file_hashes(self, repo):
+        return {self.props[n]["path"]: self.props[n].get("hash") for n in self._node_ids(repo, "File")}
+
+    async def repositories(self):
+        rows = []
+        for repo in self.repo_nodes:
+            props = self._repository(repo)
+            if props is not None:
+                rows.append({k: props.get(k) for k in ("repo", "url", "ref", "commit", "indexed_at")})
+        return sorted(rows, key=lambda row: row["repo"])
+
+
+_backend: GraphBackend | None = None
+
+
+def get_backend() -> GraphBackend:
+    """The configured backend (GRAPH_BACKEND), created on first use."""
+    global _backend
+    if _backend is None:
+        if settings.GRAPH_BACKEND == "neo4j":
+            _backend = Neo4jBackend()
+        elif settings.GRAPH_BACKEND == "memory":
+            if settings.INDEXER_REPLICAS > 1:
+                # Every replica would hold (and snapshot) a graph of its own
+                raise ValueError(
+                    f"GRAPH_BACKEND=memory keeps the graph in one process; "
+                    f"it cannot be shared by INDEXER_REPLICAS={settings.INDEXER_REPLICAS} replicas"
+                )
+            _backend = MemoryBackend(settings.GRAPH_SNAPSHOT)
+        else:
+            raise ValueError(f"Unknown GRAPH_BACKEND: {settings.GRAPH_BACKEND}")
+    return _backend
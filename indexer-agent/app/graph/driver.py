@@ -4,7 +4,8 @@ from ..config import settings
 
 driver = AsyncGraphDatabase.driver(
     settings.NEO4J_URI,
-    auth=(settings.NEO4J_USER, settings.NEO4J_PASSWORD)
+    auth=(settings.NEO4J_USER, settings.NEO4J_PASSWORD),
+    max_transaction_retry_time=settings.NEO4J_MAX_RETRY_TIME,
 )
 
 async def run_query(cypher: str, params: dict = None):
@@ -12,3 +13,38 @@ async def run_query(cypher: str, params: dict = None):
         result = await session.run(cypher, params or {})
         records = await result.data()
         return records
+
+# Records are pulled from the server in batches of this size
+FETCH_SIZE = 1000
+
+async def fetch_rows(cypher: str, params: dict = None, limit: int | None = None, skip: int = 0):
+    """
+    Like run_query, but iterates the result record by record and stops
+    after `skip` + `limit` records; the rest is discarded on the server
+    side instead of being buffered, so memory stays bounded by `limit`.
+    """
+    rows = []
+    async with driver.session(fetch_size=FETCH_SIZE) as session:
+        result = await session.run(cypher, params or {})
+        async for record in result:
+            if skip:
+                skip -= 1
+                continue
+            rows.append(record.data())
+            if limit is not None and len(rows) >= limit:
+                break
+    return rows
+
+async def run_transaction(statements: list[tuple[str, dict]]):
+    """
+    Run several write statements inside one managed transaction.
+    Transient failures such as deadlocks roll the transaction back and
+    the driver retries it with exponential backoff (NEO4J_MAX_RETRY_TIME).
+    """
+    async def work(tx):
+        for cypher, params in statements:
+            result = await tx.run(cypher, params)
+            await result.consume()
+
+    async with driver.session() as session:
+        await session.execute_write(work)
@@ -0,0 +1,39 @@
+# apps/indexer-agent/app/graph/index_state.py
+from .backend import get_backend
+
+# One Repository node per namespace (`repo`) holds its URL, ref,
+# last indexed commit and current index generation.
+#
+# The index marker is bumped after every completed write (an index
+# run, a single file, a watcher flush); the graph-query agent drops
+# its cached results when any repository's marker changes.
+
+
+async def get_indexed_commit(repo: str) -> str | None:
+    """Return the commit SHA the repository was last fully indexed at."""
+    node = await get_backend().repository(repo)
+    return node.get("commit") if node else None
+
+
+async def set_indexed_commit(repo: str, commit: str, url: str | None = None, ref: str = ""):
+    await get_backend().set_indexed_commit(repo, commit, url, ref)
+
+
+async def next_generation(repo: str) -> int:
+    """Start a new index generation for the repository and return its number."""
+    return await get_backend().increment(repo, "generation")
+
+
+async def bump_index_marker(repo: str) -> int:
+    """Record that a write to the repository finished; returns the new marker."""
+    return await get_backend().increment(repo, "index_marker")
+
+
+async def get_file_hashes(repo: str) -> dict[str, str | None]:
+    """Return {path: content hash} for every indexed file of the repository."""
+    return await get_backend().file_hashes(repo)
+
+
+async def list_repositories() -> list[dict]:
+    """Every indexed namespace with its URL, ref and last indexed commit."""
+    return await get_backend().repositories()
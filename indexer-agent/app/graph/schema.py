@@ -0,0 +1,83 @@
+# apps/indexer-agent/app/graph/schema.py
+from ..config import settings
+
+# Statements the Neo4j backend runs once per process before its first
+# write (Neo4jBackend.ensure_schema); the in-memory backend keys its
+# nodes the way the constraints do
+
+# Labels shared by every named code entity, so that label-less
+# name lookups can use the single `entity_name` index.
+# Per-function Parameter nodes (PARAMETER_MODE=node) are not entities.
+ENTITY_LABELS = ["Class", "Function", "Method", "Module", "Import", "Decorator", "Parameter"]
+
+# Shared nodes with very high in-degree, labelled :Hub so that
+# traversals do not expand them unless asked to.
+HUB_LABELS = ["Module", "Import", "Decorator"]
+
+# Every key includes the repository namespace (`repo`), so
+# several repositories share one database without colliding
+CONSTRAINTS = [
+    "CREATE CONSTRAINT file_repo_path IF NOT EXISTS FOR (n:File) REQUIRE (n.repo, n.path) IS UNIQUE",
+    "CREATE CONSTRAINT entity_repo_qname IF NOT EXISTS FOR (n:Entity) REQUIRE (n.repo, n.qname) IS UNIQUE",
+    "CREATE CONSTRAINT module_repo_name IF NOT EXISTS FOR (n:Module) REQUIRE (n.repo, n.name) IS UNIQUE",
+    "CREATE CONSTRAINT import_repo_name IF NOT EXISTS FOR (n:Import) REQUIRE (n.repo, n.name) IS UNIQUE",
+    "CREATE CONSTRAINT decorator_repo_name IF NOT EXISTS FOR (n:Decorator) REQUIRE (n.repo, n.name) IS UNIQUE",
+    "CREATE CONSTRAINT parameter_repo_key IF NOT EXISTS FOR (n:Parameter) REQUIRE (n.repo, n.fn, n.name) IS UNIQUE",
+    "CREATE CONSTRAINT docstring_repo_hash IF NOT EXISTS FOR (n:Docstring) REQUIRE (n.repo, n.hash) IS UNIQUE",
+    "CREATE CONSTRAINT repository_repo IF NOT EXISTS FOR (n:Repository) REQUIRE n.repo IS UNIQUE",
+]
+
+# Superseded: class/function/method keys by entity_qname (nested functions may
+# share a name within a file), the single-repository keys by the ones above
+DROP_CONSTRAINTS = [
+    "DROP CONSTRAINT class_key IF EXISTS",
+    "DROP CONSTRAINT function_key IF EXISTS",
+    "DROP CONSTRAINT method_key IF EXISTS",
+    *(
+        f"DROP CONSTRAINT {name} IF EXISTS"
+        for name in [
+            "file_path", "entity_qname", "module_name", "import_name", "decorator_name",
+            "parameter_key", "parameter_name", "docstring_hash", "repository_url",
+        ]
+    ),
+]
+
+# Global parameter nodes are unique by name; per-function ones share names
+if settings.PARAMETER_MODE == "shared":
+    CONSTRAINTS.append(
+        "CREATE CONSTRAINT parameter_repo_name IF NOT EXISTS FOR (n:Parameter) REQUIRE (n.repo, n.name) IS UNIQUE"
+    )
+else:
+    DROP_CONSTRAINTS.append("DROP CONSTRAINT parameter_repo_name IF EXISTS")
+
+# Writes match on qname; the query agents still look entities up by short name
+INDEXES = [
+    "CREATE INDEX entity_name IF NOT EXISTS FOR (n:Entity) ON (n.name)",
+    "CREATE INDEX class_name IF NOT EXISTS FOR (n:Class) ON (n.name)",
+    "CREATE INDEX function_name IF NOT EXISTS FOR (n:Function) ON (n.name)",
+    "CREATE INDEX method_name IF NOT EXISTS FOR (n:Method) ON (n.name)",
+]
+
+# Graphs indexed before the :Entity label existed
+BACKFILL_ENTITY_LABEL = f"""
+    MATCH (n)
+    WHERE ({" OR ".join(f"n:{label}" for label in ENTITY_LABELS)}) AND NOT n:Entity
+      AND n.fn IS NULL
+    CALL {{ WITH n SET n:Entity }} IN TRANSACTIONS OF 10000 ROWS
+"""
+
+# Graphs indexed before the :Hub label existed
+BACKFILL_HUB_LABEL = f"""
+    MATCH (n)
+    WHERE ({" OR ".join(f"n:{label}" for label in HUB_LABELS)} OR (n:Parameter AND n.fn IS NULL))
+      AND NOT n:Hub
+    CALL {{ WITH n SET n:Hub }} IN TRANSACTIONS OF 10000 ROWS
+"""
+
+# Graphs indexed before namespaces existed belong to the configured repository
+BACKFILL_REPO = """
+    MATCH (n)
+    WHERE (n:Entity OR n:File OR n:Docstring OR n:Parameter OR (n:Repository AND n.url = $url))
+      AND n.repo IS NULL
+    CALL { WITH n SET n.repo = $repo } IN TRANSACTIONS OF 10000 ROWS
+"""
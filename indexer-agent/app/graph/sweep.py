@@ -0,0 +1,37 @@
+# apps/indexer-agent/app/graph/sweep.py
+from .backend import get_backend
+
+# ---------------------------------------------------------
+# Stale-entity garbage collection. Every index run writes
+# with a new generation number; whatever it did not touch
+# is stale. Full runs sweep the whole graph, incremental
+# runs only the files they rewrote. Large deletes run in
+# batches of GC_BATCH_SIZE rows (CALL ... IN TRANSACTIONS).
+# Nodes and relationships written before generations
+# existed have no `gen` and count as stale. Generations
+# are numbered per repository, so every sweep is scoped
+# to one namespace (`repo`).
+# ---------------------------------------------------------
+
+
+async def sweep_stale(generation: int, repo: str) -> dict:
+    """Delete every indexed node and relationship of `repo` not written by `generation`."""
+    return await get_backend().sweep_stale(generation, repo)
+
+
+async def sweep_files(paths: list[str], generation: int, repo: str) -> dict:
+    """
+    Delete the stale entities and edges of files rewritten by `generation`:
+    entities removed from the source, and calls, parameters, decorators
+    or imports that no longer exist.
+    """
+    return await get_backend().sweep_files(paths, generation, repo)
+
+
+async def sweep_orphans(repo: str) -> int:
+    """
+    Delete shared nodes of `repo` nothing refers to any more: imports no file imports,
+    then modules, decorators, parameters, docstrings and unresolved
+    call/base placeholders without incoming relationships.
+    """
+    return await get_backend().sweep_orphans(repo)
@@ -0,0 +1,58 @@
+# apps/indexer-agent/app/graph/writer.py
+from .backend import GraphBatch, get_backend
+from ..indexing.ir import FileRec
+
+# ---------------------------------------------------------
+# Files are written as GraphBatch operations; the backend
+# decides how they are stored (graph/backend.py). Within a
+# file, definitions come before the edges that start at
+# them, so no edge is skipped for a missing source.
+# ---------------------------------------------------------
+
+
+def add_file(batch: GraphBatch, rec: FileRec) -> None:
+    """Describe a FileRec as operations on `batch`."""
+    batch.upsert_file(rec.path, rec.hash)
+
+    for module in rec.imports:
+        batch.add_import(rec.path, module)
+
+    for cls in rec.classes:
+        batch.upsert_entity("Class", cls.qname, cls.name, rec.path, cls.start, cls.end)
+        if cls.docstring:
+            batch.add_docstring(cls.qname, cls.docstring)
+
+    for fn in rec.functions:
+        label = "Method" if fn.is_method else "Function"
+        batch.upsert_entity(label, fn.qname, fn.name, rec.path, fn.start, fn.end)
+        batch.set_parameters(fn.qname, fn.params)
+        for dec in fn.decorators:
+            batch.add_decorator(fn.qname, dec)
+        if fn.docstring:
+            batch.add_docstring(fn.qname, fn.docstring)
+
+    for edge in rec.edges:
+        batch.add_edge(edge.kind, edge.source, edge.target)
+
+
+async def write_entities(records: list[FileRec], generation: int, repo: str) -> dict:
+    """
+    Write the entities of one or more files to the graph
+    in a single transaction (one GraphBatch).
+    Everything written is stamped with `generation` and namespace `repo`.
+    """
+    batch = get_backend().batch(generation, repo)
+    for rec in records:
+        add_file(batch, rec)
+    return await batch.commit()
+
+
+async def retract_files(paths: list[str], repo: str) -> int:
+    """
+    Remove deleted or renamed files from the graph, together with the
+    entities they contain. Docstrings are shared by content, so the ones
+    left unreferenced are removed by the orphan sweep.
+    """
+    if not paths:
+        return 0
+    return await get_backend().retract_files(paths, repo)
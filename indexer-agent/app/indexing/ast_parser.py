@@ -1,8 +1,14 @@
 # apps/indexer-agent/app/indexing/ast_parser.py
 import ast
-import aiofiles
+import asyncio
+from pathlib import Path
+
+
+def _parse(path: str) -> ast.AST:
+    # Bytes, so ast.parse honours the file's encoding declaration
+    return ast.parse(Path(path).read_bytes(), filename=path)
+
 
 async def parse_python_ast(path: str) -> ast.AST:
-    async with aiofiles.open(path, "r", encoding="utf-8") as f:
-        content = await f.read()
-        return ast.parse(content)
+    """Read and parse a file in one worker-thread hop, off the event loop."""
+    return await asyncio.to_thread(_parse, path)
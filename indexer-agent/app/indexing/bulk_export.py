@@ -0,0 +1,283 @@
+# apps/indexer-agent/app/indexing/bulk_export.py
+"""
+Offline bulk-load mode: turn the whole repository into deduplicated
+node and relationship CSV files for `neo4j-admin database import`.
+
+Cold (re)builds load these in one pass; the online MERGE path
+stays in charge of incremental updates afterwards.
+"""
+import asyncio
+import csv
+import hashlib
+from collections import defaultdict, deque
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from ..config import settings
+from ..graph.schema import ENTITY_LABELS, HUB_LABELS
+from .ir import FileRec
+from .path_policy import PathPolicy, discover_files
+from .pipeline import content_hash, parse_file
+from .repo_manager import update_repo, head_commit
+from .repo_spec import RepoSpec
+
+# Property columns per label, in neo4j-admin header syntax
+NODE_FIELDS: dict[str, list[str]] = {
+    "Repository": ["repo", "url", "ref", "commit"],
+    "File": ["repo", "path", "hash"],
+    "Class": ["repo", "qname", "name", "file", "start:int", "end:int"],
+    "Function": ["repo", "qname", "name", "file", "start:int", "end:int"],
+    "Method": ["repo", "qname", "name", "file", "start:int", "end:int"],
+    "Module": ["repo", "name"],
+    "Import": ["repo", "name"],
+    "Decorator": ["repo", "name"],
+    "Parameter": ["repo", "name"],
+    "Docstring": ["repo", "hash", "text"],
+}
+
+# Separates array elements and labels. Not neo4j-admin's default `;`,
+# which annotations and defaults can contain (Literal['a;b']): they are
+# ast.unparse output, where control characters only appear escaped
+ARRAY_DELIMITER = "\x1f"
+
+# Columns that depend on PARAMETER_MODE
+PARAMETER_FIELDS = {
+    "node": {"Parameter": ["fn", "position:int", "kind", "annotation", "default"]},
+    "property": {
+        label: ["params:string[]", "param_kinds:string[]", "param_annotations:string[]", "param_defaults:string[]"]
+        for label in ("Function", "Method")
+    },
+    "shared": {},
+}
+
+
+def _fields(label: str) -> list[str]:
+    return NODE_FIELDS[label] + PARAMETER_FIELDS[settings.PARAMETER_MODE].get(label, [])
+
+
+def _labels(label: str) -> str:
+    shared = settings.PARAMETER_MODE == "shared"
+    labels = [label]
+    if label in ENTITY_LABELS and (label != "Parameter" or shared):
+        labels.append("Entity")
+    if label in HUB_LABELS or (label == "Parameter" and shared):
+        labels.append("Hub")
+    return ARRAY_DELIMITER.join(labels)
+
+
+def _stable_id(label: str, *key) -> str:
+    """Same entity, same ID: derived from the label and its MERGE key."""
+    digest = hashlib.sha1("\x1f".join(map(str, (label, *key))).encode()).hexdigest()
+    return f"{label}:{digest[:20]}"
+
+
+class _GraphBuilder:
+    """
+    In-memory node/relationship tables that mirror the MERGE semantics.
+    Every node carries the namespace `repo`, which is part of its ID.
+    """
+
+    def __init__(self, repo: str):
+        self.repo = repo
+        self.nodes: dict[str, dict[str, dict]] = defaultdict(dict)
+        self.rels: dict[str, set[tuple[str, str]]] = defaultdict(set)
+        self.labels: dict[str, str] = {}  # qname → label
+
+    def node(self, label: str, key: tuple, **props) -> str:
+        node_id = _stable_id(label, self.repo, *key)
+        self.nodes[label].setdefault(node_id, {}).update(repo=self.repo, **props)
+        return node_id
+
+    def entity_id(self, qname: str) -> str:
+        return _stable_id("Entity", self.repo, qname)
+
+    def entity(self, label: str, qname: str, **props) -> str:
+        """MERGE (n:Entity {repo, qname}) SET n:Label - one node per qualified name."""
+        node_id = self.entity_id(qname)
+        previous = self.labels.get(qname)
+        if previous and previous != label:
+            props = {**self.nodes[previous].pop(node_id), **props}
+        self.labels[qname] = label
+        self.nodes[label].setdefault(node_id, {}).update(props, repo=self.repo, qname=qname)
+        return node_id
+
+    def placeholder(self, label: str, qname: str) -> str:
+        """MERGE ... ON CREATE SET - a call or base target not defined in the repo."""
+        if qname in self.labels:
+            return self.entity_id(qname)
+        return self.entity(label, qname, name=qname.rpartition(".")[2])
+
+    def rel(self, rel_type: str, start: str, end: str):
+        self.rels[rel_type].add((start, end))
+
+    def docstring(self, text: str) -> str:
+        doc_hash = content_hash(text.encode())
+        return self.node("Docstring", (doc_hash,), hash=doc_hash, text=text)
+
+    def add(self, rec: FileRec):
+        """
+        Merge one file. Files can come in any order: a placeholder
+        becomes the definition once the file defining it is added.
+        """
+        f = self.node("File", (rec.path,), path=rec.path, hash=rec.hash)
+        for module in rec.imports:
+            i = self.node("Import", (module,), name=module)
+            m = self.node("Module", (module,), name=module)
+            self.rel("IMPORTS", f, i)
+            self.rel("DEPENDS_ON", i, m)
+        for cls in rec.classes:
+            c = self.entity(
+                "Class", cls.qname,
+                name=cls.name, file=rec.path, start=cls.start, end=cls.end,
+            )
+            self.rel("CONTAINS", f, c)
+        for fn in rec.functions:
+            params = {}
+            if settings.PARAMETER_MODE == "property":
+                params = {
+                    "params": [p.name for p in fn.params],
+                    "param_kinds": [p.kind for p in fn.params],
+                    "param_annotations": [p.annotation or "" for p in fn.params],
+                    "param_defaults": [p.default or "" for p in fn.params],
+                }
+            n = self.entity(
+                "Method" if fn.is_method else "Function", fn.qname,
+                name=fn.name, file=rec.path, start=fn.start, end=fn.end, **params,
+            )
+            self.rel("CONTAINS", f, n)
+
+        for cls in rec.classes:
+            if cls.docstring:
+                self.rel("DOCUMENTED_BY", self.entity_id(cls.qname), self.docstring(cls.docstring))
+        for fn in rec.functions:
+            target = self.entity_id(fn.qname)
+            for param in fn.params:
+                if settings.PARAMETER_MODE == "node":
+                    p = self.node(
+                        "Parameter", (fn.qname, param.name), fn=fn.qname, name=param.name,
+                        position=param.position, kind=param.kind,
+                        annotation=param.annotation, default=param.default,
+                    )
+                elif settings.PARAMETER_MODE == "shared":
+                    p = self.node("Parameter", (param.name,), name=param.name)
+                else:
+                    continue
+                self.rel("HAS_PARAMETER", target, p)
+            for dec in fn.decorators:
+                self.rel("DECORATED_BY", target, self.node("Decorator", (dec,), name=dec))
+            if fn.docstring:
+                self.rel("DOCUMENTED_BY", target, self.docstring(fn.docstring))
+        for edge in rec.edges:
+            source = self.entity_id(edge.source)
+            if edge.kind == "INHERITS_FROM":
+                self.rel("INHERITS_FROM", source, self.placeholder("Class", edge.target))
+            elif edge.kind == "CALLS":
+                callee = self.placeholder("Function", edge.target)
+                self.rel("CALLS", source, callee)
+                self.rel("DEPENDS_ON", source, callee)
+
+    def write(self, out: Path) -> dict:
+        out.mkdir(parents=True, exist_ok=True)
+        nodes, relationships = {}, {}
+
+        for label, table in self.nodes.items():
+            path = out / f"nodes_{label}.csv"
+            fields = _fields(label)
+            labels = _labels(label)
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow(["id:ID", *fields, ":LABEL"])
+                for node_id, props in sorted(table.items()):
+                    values = [props.get(field.split(":")[0]) for field in fields]
+                    values = [ARRAY_DELIMITER.join(v) if isinstance(v, list) else v for v in values]
+                    writer.writerow([node_id, *("" if v is None else v for v in values), labels])
+            nodes[label] = {"file": str(path), "count": len(table)}
+
+        for rel_type, pairs in self.rels.items():
+            path = out / f"rels_{rel_type}.csv"
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow([":START_ID", ":END_ID", ":TYPE"])
+                for start, end in sorted(pairs):
+                    writer.writerow([start, end, rel_type])
+            relationships[rel_type] = {"file": str(path), "count": len(pairs)}
+
+        return {"nodes": nodes, "relationships": relationships}
+
+
+def import_command(result: dict, database: str = "neo4j") -> str:
+    """The neo4j-admin invocation that loads the exported files."""
+    args = [f"--nodes={n['file']}" for n in result["nodes"].values()]
+    args += [f"--relationships={r['file']}" for r in result["relationships"].values()]
+    return " ".join([
+        "neo4j-admin database import full --overwrite-destination",
+        "--multiline-fields=true",
+        f"--array-delimiter=U+{ord(ARRAY_DELIMITER):04X}",
+        # Empty cells (e.g. the missing `file` of placeholder nodes) must stay
+        # unset, not become "", so sweep_orphans' `n.file IS NULL` still matches
+        "--ignore-empty-strings=true",
+        *args, database,
+    ])
+
+
+def _export_sync(paths: Iterable[str], commit: str, out: Path, spec: RepoSpec) -> dict:
+    builder = _GraphBuilder(spec.namespace)
+    builder.node("Repository", (), url=spec.url, ref=spec.ref, commit=commit)
+
+    # As in run_pipeline, at most 2 × INDEX_WORKERS parses are in flight,
+    # and each record is merged and dropped as soon as it is taken
+    exported, failed = 0, []
+    in_flight: deque = deque()
+
+    def take():
+        nonlocal exported
+        path, future = in_flight.popleft()
+        try:
+            rec = future.result()
+        except Exception as e:
+            failed.append({"file": path, "stage": "parse", "error": str(e)})
+            return
+        builder.add(rec)
+        exported += 1
+
+    with ProcessPoolExecutor(max_workers=settings.INDEX_WORKERS) as pool:
+        for path in paths:
+            if len(in_flight) >= settings.INDEX_WORKERS * 2:
+                take()
+            in_flight.append((path, pool.submit(parse_file, path, spec.dir)))
+        while in_flight:
+            take()
+
+    result = builder.write(out)
+    return {
+        "output_dir": str(out),
+        "repo": spec.namespace,
+        "commit": commit,
+        "exported_files": exported,
+        "failed_files": len(failed),
+        "failed": failed,
+        **result,
+        "import_command": import_command(result),
+    }
+
+
+async def export_bulk_csv(
+    output_dir: str,
+    update: bool = True,
+    policy: PathPolicy | None = None,
+    spec: RepoSpec | None = None,
+) -> dict:
+    """
+    Walk the repository and write neo4j-admin import CSVs to output_dir.
+    Load them into a stopped database with the returned import_command.
+    """
+    spec = spec or RepoSpec.from_settings()
+    if update:
+        await update_repo(spec)
+    loop = asyncio.get_event_loop()
+    root = Path(spec.dir).resolve()
+    head = await loop.run_in_executor(None, head_commit, spec.dir)
+    policy = policy or PathPolicy.from_settings()
+    py_files, skipped = await loop.run_in_executor(None, discover_files, root, policy)
+    result = await loop.run_in_executor(None, _export_sync, py_files, head, Path(output_dir), spec)
+    return {**result, "skipped_files": skipped}
@@ -0,0 +1,118 @@
+# apps/indexer-agent/app/indexing/checkpoints.py
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from ..config import settings
+
+# ---------------------------------------------------------
+# Per-file checkpoints of index runs. A run is identified by
+# namespace, commit and mode and keeps its generation, so a
+# job resubmitted after a restart reuses the generation and
+# skips every file already written. Rows are removed once the
+# run is finalized. Lives next to the parse cache so all
+# indexer replicas see the same checkpoints. Calls block on
+# the replicas' locks, so the indexer makes them from worker
+# threads, never on the event loop.
+# ---------------------------------------------------------
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS runs (
+        repo TEXT NOT NULL,
+        commit_sha TEXT NOT NULL,
+        mode TEXT NOT NULL,
+        generation INTEGER NOT NULL,
+        started_at REAL NOT NULL,
+        PRIMARY KEY (repo, commit_sha, mode)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS done (
+        repo TEXT NOT NULL,
+        commit_sha TEXT NOT NULL,
+        generation INTEGER NOT NULL,
+        path TEXT NOT NULL,
+        completed_at REAL NOT NULL,
+        PRIMARY KEY (repo, commit_sha, generation, path)
+    )
+    """,
+]
+# Bumped when the tables change; checkpoints are disposable, so
+# tables of an older version are dropped rather than migrated
+SCHEMA_VERSION = 2
+
+
+class CheckpointStore:
+    def __init__(self, directory: str):
+        Path(directory).mkdir(parents=True, exist_ok=True)
+        self.path = Path(directory) / "index-checkpoints.sqlite3"
+        # One connection shared by the worker threads
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            self.path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            self._conn.execute("DROP TABLE IF EXISTS runs")
+            self._conn.execute("DROP TABLE IF EXISTS done")
+            self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        for statement in SCHEMA:
+            self._conn.execute(statement)
+
+    def _execute(self, sql: str, params: tuple = ()) -> list:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def find_run(self, repo: str, commit: str, mode: str) -> int | None:
+        """Generation of an unfinished run for this commit, if any."""
+        rows = self._execute(
+            "SELECT generation FROM runs WHERE repo = ? AND commit_sha = ? AND mode = ?",
+            (repo, commit, mode),
+        )
+        return rows[0][0] if rows else None
+
+    def start_run(self, repo: str, commit: str, mode: str, generation: int):
+        self._execute(
+            "INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?)",
+            (repo, commit, mode, generation, time.time()),
+        )
+
+    def mark_done(self, repo: str, commit: str, generation: int, path: str):
+        self._execute(
+            "INSERT OR REPLACE INTO done VALUES (?, ?, ?, ?, ?)",
+            (repo, commit, generation, path, time.time()),
+        )
+
+    def completed(self, repo: str, commit: str, generation: int) -> set[str]:
+        rows = self._execute(
+            "SELECT path FROM done WHERE repo = ? AND commit_sha = ? AND generation = ?",
+            (repo, commit, generation),
+        )
+        return {row[0] for row in rows}
+
+    def finish_run(self, repo: str, commit: str, generation: int):
+        """Drop the run and its checkpoints, along with older runs of the namespace."""
+        self._execute(
+            "DELETE FROM runs WHERE repo = ? AND (commit_sha = ? OR generation <= ?)",
+            (repo, commit, generation),
+        )
+        self._execute(
+            "DELETE FROM done WHERE repo = ? AND (commit_sha = ? OR generation <= ?)",
+            (repo, commit, generation),
+        )
+
+
+_store: CheckpointStore | None = None
+_store_pid: int | None = None
+
+
+def get_checkpoints() -> CheckpointStore | None:
+    """Per-process checkpoint store (None when INDEX_CHECKPOINT_DIR is empty)."""
+    global _store, _store_pid
+    if not settings.INDEX_CHECKPOINT_DIR:
+        return None
+    if _store is None or _store_pid != os.getpid():
+        _store = CheckpointStore(settings.INDEX_CHECKPOINT_DIR)
+        _store_pid = os.getpid()
+    return _store
@@ -1,202 +1,266 @@
 import ast
 import builtins
-from app.graph.driver import run_query
+from pathlib import Path
+from sys import intern
+from app.config import settings
+from app.graph.index_state import bump_index_marker, next_generation
+from app.graph.writer import write_entities
+from .repo_spec import RepoSpec
+from .ir import ClassRec, EdgeRec, FileRec, FuncRec, ParamRec, edge, names
 
 PYTHON_BUILTINS = set(dir(builtins))
 
+# Bump whenever collect_entities changes its output, so that
+# cached extraction results from older versions are not reused.
+EXTRACTOR_VERSION = 4
 
-async def extract_entities(tree: ast.AST, file_path: str) -> dict:
+
+def module_name(file_path: str | None, root: str | None = None) -> str:
+    """Dotted module name of a file relative to the repository root (fastapi/routing.py → fastapi.routing)."""
+    if not file_path:
+        return ""
+    path = Path(file_path).resolve()
+    try:
+        rel = path.relative_to(Path(root or settings.REPO_DIR).resolve())
+    except ValueError:
+        rel = Path(path.name)
+    parts = list(rel.with_suffix("").parts)
+    if parts and parts[-1] == "__init__":
+        parts.pop()
+    return ".".join(parts)
+
+
+def _join(scope: str, name: str) -> str:
+    return f"{scope}.{name}" if scope else name
+
+
+def _source(expr: ast.expr | None) -> str | None:
+    return ast.unparse(expr) if expr is not None else None
+
+
+def _params(args: ast.arguments) -> tuple[ParamRec, ...]:
+    """Every parameter of a signature in order, with its annotation and default."""
+    positional = [*args.posonlyargs, *args.args]
+    defaults = [None] * (len(positional) - len(args.defaults)) + list(args.defaults)
+    specs = [
+        (arg, "positional_only" if i < len(args.posonlyargs) else "positional_or_keyword", default)
+        for i, (arg, default) in enumerate(zip(positional, defaults))
+    ]
+    if args.vararg:
+        specs.append((args.vararg, "var_positional", None))
+    specs += [(arg, "keyword_only", default) for arg, default in zip(args.kwonlyargs, args.kw_defaults)]
+    if args.kwarg:
+        specs.append((args.kwarg, "var_keyword", None))
+    return tuple(
+        ParamRec(intern(arg.arg), position, kind, _source(arg.annotation), _source(default))
+        for position, (arg, kind, default) in enumerate(specs)
+    )
+
+
+class _EntityVisitor(ast.NodeVisitor):
     """
-    Extract entities from a Python AST and populate Neo4j
-    according to the required knowledge graph schema.
+    Scope-aware walk of a module. Classes and functions get module-qualified
+    names from an explicit scope stack, and calls are attributed to the
+    function they appear in. Call and base targets are resolved once the
+    whole module has been seen, against its definitions and imports.
     """
 
-    # ------------------------------------------------------
-    # File node
-    # ------------------------------------------------------
-    await run_query(
-        """
-        MERGE (f:File {path:$file})
-        RETURN f
-        """,
-        {"file": file_path},
-    )
+    def __init__(self, module: str, is_package: bool):
+        self.module = module
+        self.package = module if is_package else module.rpartition(".")[0]
+        self.scopes: list[tuple[str, str]] = []  # (kind, qname), innermost last
+        self.defined: set[str] = set()
+        self.aliases: dict[str, str] = {}  # imported local name → qualified target
+        self.imports: list[str] = []
+        self.classes: list[ClassRec] = []
+        self.functions: list[FuncRec] = []
+        self.bases: list[tuple[str, ast.expr, tuple]] = []
+        self.calls: list[tuple[str, ast.expr, tuple]] = []
 
-    current_class: str | None = None
-    current_function: str | None = None
-
-    for node in ast.walk(tree):
-
-        # ==================================================
-        # IMPORTS → Import, Module, IMPORTS, DEPENDS_ON
-        # ==================================================
-        if isinstance(node, ast.Import):
-            for alias in node.names:
-                module = alias.name
-                if module in PYTHON_BUILTINS:
-                    continue
-
-                await run_query(
-                    """
-                    MERGE (i:Import {name:$module})
-                    MERGE (m:Module {name:$module})
-                    WITH i, m
-                    MATCH (f:File {path:$file})
-                    MERGE (f)-[:IMPORTS]->(i)
-                    MERGE (i)-[:DEPENDS_ON]->(m)
-                    """,
-                    {"file": file_path, "module": module},
-                )
-
-        if isinstance(node, ast.ImportFrom) and node.module:
-            module = node.module
-            if module not in PYTHON_BUILTINS:
-                await run_query(
-                    """
-                    MERGE (i:Import {name:$module})
-                    MERGE (m:Module {name:$module})
-                    WITH i, m
-                    MATCH (f:File {path:$file})
-                    MERGE (f)-[:IMPORTS]->(i)
-                    MERGE (i)-[:DEPENDS_ON]->(m)
-                    """,
-                    {"file": file_path, "module": module},
-                )
-
-        # ==================================================
-        # CLASS → Class, CONTAINS, INHERITS_FROM, DOCSTRING
-        # ==================================================
-        if isinstance(node, ast.ClassDef):
-            current_class = node.name
-            current_function = None
-
-            await run_query(
-                """
-                MERGE (c:Class {name:$name, file:$file})
-                SET c.start = $start, c.end = $end
-                WITH c
-                MATCH (f:File {path:$file})
-                MERGE (f)-[:CONTAINS]->(c)
-                """,
-                {
-                    "name": node.name,
-                    "file": file_path,
-                    "start": node.lineno,
-                    "end": node.end_lineno,
-                },
-            )
-
-            # Inheritance
-            for base in node.bases:
-                if isinstance(base, ast.Name):
-                    await run_query(
-                        """
-                        MATCH (child:Class {name:$child})
-                        MERGE (parent:Class {name:$parent})
-                        MERGE (child)-[:INHERITS_FROM]->(parent)
-                        """,
-                        {"child": node.name, "parent": base.id},
-                    )
-
-            # Docstring
-            doc = ast.get_docstring(node)
-            if doc:
-                await run_query(
-                    """
-                    CREATE (d:Docstring {text:$doc})
-                    WITH d
-                    MATCH (c:Class {name:$cls})
-                    MERGE (c)-[:DOCUMENTED_BY]->(d)
-                    """,
-                    {"cls": node.name, "doc": doc},
-                )
-
-        # ==================================================
-        # FUNCTION / METHOD
-        # ==================================================
-        if isinstance(node, ast.FunctionDef):
-            current_function = node.name
-            label = "Method" if current_class else "Function"
-
-            await run_query(
-                f"""
-                MERGE (fn:{label} {{name:$name, file:$file}})
-                SET fn.start = $start, fn.end = $end
-                WITH fn
-                MATCH (f:File {{path:$file}})
-                MERGE (f)-[:CONTAINS]->(fn)
-                """,
-                {
-                    "name": node.name,
-                    "file": file_path,
-                    "start": node.lineno,
-                    "end": node.end_lineno,
-                },
-            )
-
-            # Parameters
-            for arg in node.args.args:
-                await run_query(
-                    """
-                    MERGE (p:Parameter {name:$param})
-                    WITH p
-                    MATCH (fn {name:$fn})
-                    MERGE (fn)-[:HAS_PARAMETER]->(p)
-                    """,
-                    {"fn": node.name, "param": arg.arg},
-                )
-
-            # Decorators
-            for dec in node.decorator_list:
-                if isinstance(dec, ast.Name):
-                    dec_name = dec.id
-                elif isinstance(dec, ast.Attribute):
-                    dec_name = dec.attr
-                else:
-                    continue
-
-                await run_query(
-                    """
-                    MERGE (d:Decorator {name:$dec})
-                    WITH d
-                    MATCH (fn {name:$fn})
-                    MERGE (fn)-[:DECORATED_BY]->(d)
-                    """,
-                    {"fn": node.name, "dec": dec_name},
-                )
-
-            # Docstring
-            doc = ast.get_docstring(node)
-            if doc:
-                await run_query(
-                    """
-                    CREATE (d:Docstring {text:$doc})
-                    WITH d
-                    MATCH (fn {name:$fn})
-                    MERGE (fn)-[:DOCUMENTED_BY]->(d)
-                    """,
-                    {"fn": node.name, "doc": doc},
-                )
-
-        # ==================================================
-        # CALL GRAPH → CALLS + DEPENDS_ON
-        # ==================================================
-        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
-            callee = node.func.id
-
-            if callee in PYTHON_BUILTINS:
-                continue
-            if not current_function:
+    def _qualify(self, name: str) -> str:
+        return _join(self.scopes[-1][1] if self.scopes else self.module, name)
+
+    def _enter(self, kind: str, qname: str, body: list[ast.stmt]):
+        self.scopes.append((kind, qname))
+        for stmt in body:
+            self.visit(stmt)
+        self.scopes.pop()
+
+    # ==================================================
+    # IMPORTS → Import, Module, IMPORTS, DEPENDS_ON
+    # ==================================================
+    def visit_Import(self, node: ast.Import):
+        for alias in node.names:
+            if alias.name in PYTHON_BUILTINS:
                 continue
+            self.imports.append(alias.name)
+            if alias.asname:
+                self.aliases[alias.asname] = alias.name
+            else:
+                top = alias.name.split(".")[0]
+                self.aliases[top] = top
+
+    def visit_ImportFrom(self, node: ast.ImportFrom):
+        if node.module and node.module not in PYTHON_BUILTINS:
+            self.imports.append(node.module)
+
+        # Relative imports are resolved against this module's package
+        base = node.module or ""
+        if node.level:
+            parts = self.package.split(".") if self.package else []
+            parts = parts[: max(len(parts) - (node.level - 1), 0)]
+            base = ".".join(filter(None, [*parts, node.module]))
+        for alias in node.names:
+            if alias.name != "*":
+                self.aliases[alias.asname or alias.name] = _join(base, alias.name)
+
+    # ==================================================
+    # CLASS → Class, CONTAINS, INHERITS_FROM, DOCSTRING
+    # ==================================================
+    def visit_ClassDef(self, node: ast.ClassDef):
+        qname = intern(self._qualify(node.name))
+        self.defined.add(qname)
+        self.classes.append(ClassRec(
+            name=intern(node.name),
+            qname=qname,
+            start=node.lineno,
+            end=node.end_lineno,
+            docstring=ast.get_docstring(node),
+        ))
+
+        # Bases and decorators belong to the enclosing scope
+        scopes = tuple(self.scopes)
+        for base in node.bases:
+            self.bases.append((qname, base, scopes))
+        for child in [*node.decorator_list, *node.bases, *node.keywords]:
+            self.visit(child)
+        self._enter("class", qname, node.body)
+
+    # ==================================================
+    # FUNCTION / METHOD
+    # ==================================================
+    def visit_FunctionDef(self, node: ast.FunctionDef | ast.AsyncFunctionDef):
+        qname = intern(self._qualify(node.name))
+        self.defined.add(qname)
 
-            await run_query(
-                """
-                MATCH (caller {name:$caller})
-                MERGE (callee:Function {name:$callee})
-                MERGE (caller)-[:CALLS]->(callee)
-                MERGE (caller)-[:DEPENDS_ON]->(callee)
-                """,
-                {"caller": current_function, "callee": callee},
-            )
-
-    return {"status": "indexed", "file": file_path}
+        # Decorators
+        decorators = []
+        for dec in node.decorator_list:
+            if isinstance(dec, ast.Name):
+                decorators.append(dec.id)
+            elif isinstance(dec, ast.Attribute):
+                decorators.append(dec.attr)
+
+        # Parameters, docstring
+        self.functions.append(FuncRec(
+            name=intern(node.name),
+            qname=qname,
+            is_method=bool(self.scopes) and self.scopes[-1][0] == "class",
+            start=node.lineno,
+            end=node.end_lineno,
+            params=_params(node.args),
+            decorators=names(decorators),
+            docstring=ast.get_docstring(node),
+        ))
+
+        # Decorators, defaults and annotations are evaluated in the enclosing scope
+        for child in [*node.decorator_list, node.args, *filter(None, [node.returns])]:
+            self.visit(child)
+        self._enter("function", qname, node.body)
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    # ==================================================
+    # CALL GRAPH → CALLS + DEPENDS_ON
+    # ==================================================
+    def visit_Call(self, node: ast.Call):
+        caller = next((q for kind, q in reversed(self.scopes) if kind == "function"), None)
+        if caller:
+            self.calls.append((caller, node.func, tuple(self.scopes)))
+        self.generic_visit(node)
+
+    def resolve(self, expr: ast.expr, scopes: tuple, keep_builtins: bool = False) -> str | None:
+        """Qualified name of a call or base expression, or None if it should be skipped."""
+        if isinstance(expr, ast.Name):
+            name = expr.id
+            # Functions nested in an enclosing function (class bodies are not enclosing scopes)
+            for kind, scope in reversed(scopes):
+                if kind == "function" and _join(scope, name) in self.defined:
+                    return _join(scope, name)
+            if _join(self.module, name) in self.defined:
+                return _join(self.module, name)
+            if name in self.aliases:
+                return self.aliases[name]
+            if name in PYTHON_BUILTINS and not keep_builtins:
+                return None
+            return name
+
+        if isinstance(expr, ast.Attribute) and isinstance(expr.value, ast.Name):
+            owner, attr = expr.value.id, expr.attr
+            if owner in ("self", "cls"):
+                cls = next((q for kind, q in reversed(scopes) if kind == "class"), None)
+                if cls and _join(cls, attr) in self.defined:
+                    return _join(cls, attr)
+                return None
+            if _join(self.module, f"{owner}.{attr}") in self.defined:
+                return _join(self.module, f"{owner}.{attr}")
+            if owner in self.aliases:
+                return f"{self.aliases[owner]}.{attr}"
+        return None
+
+    def edges(self) -> list[EdgeRec]:
+        edges = []
+        for child, base, scopes in self.bases:
+            parent = self.resolve(base, scopes, keep_builtins=True)
+            if parent:
+                edges.append(edge("INHERITS_FROM", child, parent))
+        for caller, func, scopes in self.calls:
+            callee = self.resolve(func, scopes)
+            if callee:
+                edges.append(edge("CALLS", caller, callee))
+        return edges
+
+
+def collect_entities(
+    tree: ast.AST,
+    file_path: str | None,
+    file_hash: str | None = None,
+    module: str | None = None,
+) -> FileRec:
+    """
+    Collect the entities and relationships of a Python AST into a
+    compact FileRec, so the AST itself can be dropped right away.
+    `module` defaults to the file's dotted path under REPO_DIR.
+    """
+    if module is None:
+        module = module_name(file_path)
+    is_package = bool(file_path) and Path(file_path).name == "__init__.py"
+
+    visitor = _EntityVisitor(module, is_package)
+    visitor.visit(tree)
+
+    return FileRec(
+        path=file_path,
+        hash=file_hash,
+        imports=names(visitor.imports),
+        classes=tuple(visitor.classes),
+        functions=tuple(visitor.functions),
+        edges=tuple(visitor.edges()),
+    )
+
+
+async def extract_entities(tree: ast.AST, file_path: str, spec: RepoSpec | None = None) -> dict:
+    """
+    Extract entities from a Python AST and populate Neo4j
+    according to the required knowledge graph schema,
+    under the namespace of `spec` (default: the configured repository).
+
+    All rows of the file are written in one transaction; the
+    returned counts show how many statements and rows it took.
+    """
+    spec = spec or RepoSpec.from_settings()
+    rec = collect_entities(tree, file_path, module=module_name(file_path, spec.dir))
+    generation = await next_generation(spec.namespace)
+    stats = await write_entities([rec], generation, spec.namespace)
+    await bump_index_marker(spec.namespace)
+    return {"status": "indexed", "repo": spec.namespace, "file": file_path, **stats}
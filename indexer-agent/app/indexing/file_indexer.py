@@ -1,28 +1,42 @@
+import asyncio
 from pathlib import Path
-from .ast_parser import parse_python_ast
-from .entity_extractor import extract_entities
-from ..graph.driver import run_query
+from .pipeline import parse_file
+from .repo_spec import RepoSpec
+from ..graph.index_state import bump_index_marker, next_generation
+from ..graph.backend import get_backend
+from ..graph.sweep import sweep_files, sweep_orphans
+from ..graph.writer import write_entities
 
-async def index_file(path: str):
+async def index_file(path: str, orphans: bool = True, spec: RepoSpec | None = None):
     """
     Index a single Python file:
-    - Create/merge File node in Neo4j
-    - Parse Python AST
-    - Extract classes & functions → push to graph
+    - Parse Python AST and hash its content
+    - Extract File, classes & functions → push to graph
+      in one batched transaction
+    - Sweep the entities and edges the file no longer has
+      (and, unless orphans=False, unreferenced shared nodes)
+    The file belongs to `spec` (default: the configured repository).
     """
     path = str(Path(path).resolve())
+    spec = spec or RepoSpec.from_settings()
 
-    # Create the file node in graph
-    await run_query("""
-        MERGE (f:File {path: $path})
-        RETURN f
-    """, {"path": path})
+    await get_backend().ensure_schema()
 
     # Parse + extract
-    tree = await parse_python_ast(path)
-    await extract_entities(tree, path)
+    rec = await asyncio.to_thread(parse_file, path, spec.dir)
+    generation = await next_generation(spec.namespace)
+    stats = await write_entities([rec], generation, spec.namespace)
+    swept = await sweep_files([path], generation, spec.namespace)
+    if orphans:
+        swept["orphans"] = await sweep_orphans(spec.namespace)
+    # The watcher (orphans=False) bumps the marker once per flush
+    if orphans:
+        await bump_index_marker(spec.namespace)
 
     return {
         "status": "indexed",
-        "file": path
+        "repo": spec.namespace,
+        "file": path,
+        **stats,
+        "swept": swept,
     }
@@ -0,0 +1,69 @@
+# apps/indexer-agent/app/indexing/ir.py
+from dataclasses import dataclass
+from sys import intern
+
+# ---------------------------------------------------------
+# Intermediate representation between the AST walk and the
+# graph writer, parse cache and bulk exporter. Records are
+# slotted, immutable and picklable, and repeated names are
+# interned, so the AST can be dropped right after extraction.
+# ---------------------------------------------------------
+
+
+@dataclass(frozen=True, slots=True)
+class ClassRec:
+    name: str
+    qname: str  # module-qualified, e.g. fastapi.routing.APIRouter
+    start: int
+    end: int
+    docstring: str | None = None
+
+
+@dataclass(frozen=True, slots=True)
+class ParamRec:
+    name: str
+    position: int
+    # positional_only, positional_or_keyword, var_positional,
+    # keyword_only or var_keyword (as in inspect.Parameter)
+    kind: str
+    annotation: str | None = None  # source text
+    default: str | None = None  # source text
+
+
+@dataclass(frozen=True, slots=True)
+class FuncRec:
+    name: str
+    qname: str  # e.g. fastapi.routing.APIRouter.add_api_route
+    is_method: bool
+    start: int
+    end: int
+    params: tuple[ParamRec, ...] = ()
+    decorators: tuple[str, ...] = ()
+    docstring: str | None = None
+
+
+@dataclass(frozen=True, slots=True)
+class EdgeRec:
+    # INHERITS_FROM (class → base) or CALLS (caller → callee), by qname;
+    # targets that cannot be resolved statically keep their bare name
+    kind: str
+    source: str
+    target: str
+
+
+@dataclass(frozen=True, slots=True)
+class FileRec:
+    path: str | None
+    hash: str | None
+    imports: tuple[str, ...] = ()
+    classes: tuple[ClassRec, ...] = ()
+    functions: tuple[FuncRec, ...] = ()
+    edges: tuple[EdgeRec, ...] = ()
+
+
+def names(values) -> tuple[str, ...]:
+    return tuple(intern(v) for v in values)
+
+
+def edge(kind: str, source: str, target: str) -> EdgeRec:
+    return EdgeRec(intern(kind), intern(source), intern(target))
@@ -0,0 +1,111 @@
+# apps/indexer-agent/app/indexing/parse_cache.py
+import os
+import pickle
+import sqlite3
+import time
+from pathlib import Path
+from ..config import settings
+
+# ---------------------------------------------------------
+# On-disk cache of extracted FileRec records, keyed by file
+# content hash plus module name, and extractor version.
+# SQLite in WAL mode lets parse workers and indexer
+# replicas share one mounted volume.
+#
+# Entries are pickled: the cache directory must only be
+# writable by indexer replicas.
+# ---------------------------------------------------------
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS entries (
+        hash TEXT NOT NULL,
+        version INTEGER NOT NULL,
+        payload BLOB NOT NULL,
+        size INTEGER NOT NULL,
+        last_used REAL NOT NULL,
+        PRIMARY KEY (hash, version)
+    )
+"""
+EVICT_EVERY = 100  # puts between size checks
+
+
+class ParseCache:
+    def __init__(self, directory: str, max_bytes: int):
+        Path(directory).mkdir(parents=True, exist_ok=True)
+        self.path = Path(directory) / "parse-cache.sqlite3"
+        self.max_bytes = max_bytes
+        self._puts = 0
+        self._conn = sqlite3.connect(
+            self.path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(SCHEMA)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_lru ON entries (last_used)")
+
+    def get(self, file_hash: str, version: int):
+        row = self._conn.execute(
+            "SELECT payload FROM entries WHERE hash = ? AND version = ?",
+            (file_hash, version),
+        ).fetchone()
+        if row is None:
+            return None
+        self._conn.execute(
+            "UPDATE entries SET last_used = ? WHERE hash = ? AND version = ?",
+            (time.time(), file_hash, version),
+        )
+        return pickle.loads(row[0])
+
+    def put(self, file_hash: str, version: int, value):
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        self._conn.execute(
+            "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+            (file_hash, version, payload, len(payload), time.time()),
+        )
+        self._puts += 1
+        if self._puts % EVICT_EVERY == 0:
+            self.evict()
+
+    def evict(self) -> int:
+        """Drop least recently used entries until the cache fits max_bytes."""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return 0
+        stale = []
+        rows = self._conn.execute(
+            "SELECT hash, version, size FROM entries ORDER BY last_used"
+        ).fetchall()
+        for file_hash, version, size in rows:
+            if total <= self.max_bytes:
+                break
+            stale.append((file_hash, version))
+            total -= size
+        self._conn.executemany("DELETE FROM entries WHERE hash = ? AND version = ?", stale)
+        return len(stale)
+
+    def stats(self) -> dict:
+        entries, size = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()
+        return {
+            "path": str(self.path),
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+        }
+
+
+_cache: ParseCache | None = None
+_cache_pid: int | None = None
+
+
+def get_parse_cache() -> ParseCache | None:
+    """
+    Per-process cache handle (None when PARSE_CACHE_DIR is empty).
+    Reopened after a fork, since SQLite connections must not cross processes.
+    """
+    global _cache, _cache_pid
+    if not settings.PARSE_CACHE_DIR:
+        return None
+    if _cache is None or _cache_pid != os.getpid():
+        _cache = ParseCache(settings.PARSE_CACHE_DIR, settings.PARSE_CACHE_MAX_BYTES)
+        _cache_pid = os.getpid()
+    return _cache
@@ -0,0 +1,105 @@
+# apps/indexer-agent/app/indexing/path_policy.py
+import os
+from collections import Counter
+from collections.abc import Iterator
+from dataclasses import dataclass
+from fnmatch import fnmatchcase
+from pathlib import Path
+from ..config import settings
+
+
+@dataclass(frozen=True)
+class PathPolicy:
+    """
+    Which files get indexed. Patterns are fnmatch-style and matched
+    against repo-relative POSIX paths; `*` also matches across `/`.
+    """
+    include: tuple[str, ...]
+    exclude: tuple[str, ...]
+    max_file_bytes: int
+
+    @classmethod
+    def from_settings(
+        cls,
+        include: list[str] | None = None,
+        exclude: list[str] | None = None,
+        max_file_bytes: int | None = None,
+    ) -> "PathPolicy":
+        """Settings defaults, with optional per-request overrides."""
+        return cls(
+            include=tuple(settings.INDEX_INCLUDE if include is None else include),
+            exclude=tuple(settings.INDEX_EXCLUDE if exclude is None else exclude),
+            max_file_bytes=settings.INDEX_MAX_FILE_BYTES if max_file_bytes is None else max_file_bytes,
+        )
+
+    def skip_reason(self, rel_path: str, size: int) -> str | None:
+        """Why the file is skipped, or None if it should be indexed."""
+        if not any(fnmatchcase(rel_path, pattern) for pattern in self.include):
+            return "not_included"
+        if any(fnmatchcase(rel_path, pattern) for pattern in self.exclude):
+            return "excluded"
+        if self.max_file_bytes and size > self.max_file_bytes:
+            return "too_large"
+        return None
+
+
+    def prunes(self, rel_dir: str) -> bool:
+        """
+        Whether a whole directory is excluded. Only patterns ending in `*`
+        are used: if one matches "dir/", it matches everything below it too.
+        """
+        return any(
+            pattern.endswith("*") and fnmatchcase(f"{rel_dir}/", pattern) for pattern in self.exclude
+        )
+
+
+def iter_files(root: Path, policy: PathPolicy, skipped: Counter | None = None) -> Iterator[str]:
+    """
+    Yield the absolute *.py paths to index, walking the tree lazily with
+    os.scandir (no Path objects, one stat per file from the dir entry).
+    Excluded directories are not descended into; skip reasons are
+    counted into `skipped`, with pruned directories as "excluded_dirs".
+    """
+    skipped = Counter() if skipped is None else skipped
+    root = str(Path(root).resolve())
+    stack = [(root, "")]
+    while stack:
+        path, rel = stack.pop()
+        try:
+            entries = os.scandir(path)
+        except (FileNotFoundError, PermissionError, NotADirectoryError):
+            continue
+        with entries:
+            dirs = []
+            for entry in entries:
+                rel_path = f"{rel}{entry.name}"
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name == ".git":
+                        continue
+                    if policy.prunes(rel_path):
+                        skipped["excluded_dirs"] += 1
+                    else:
+                        dirs.append((entry.path, f"{rel_path}/"))
+                elif entry.name.endswith(".py") and entry.is_file():
+                    reason = policy.skip_reason(rel_path, entry.stat().st_size)
+                    if reason:
+                        skipped[reason] += 1
+                    else:
+                        yield entry.path
+        # Sorted, depth-first: the same order on every replica and run
+        stack.extend(sorted(dirs, reverse=True))
+
+
+def discover_files(root: Path, policy: PathPolicy) -> tuple[list[str], dict[str, int]]:
+    """Return the absolute *.py paths to index and skipped-file counts by reason."""
+    skipped: Counter = Counter()
+    files = sorted(iter_files(root, policy, skipped))
+    return files, dict(skipped)
+
+
+def filter_paths(root: Path, paths: list[str], policy: PathPolicy) -> list[str]:
+    """Apply the policy to already discovered absolute paths (e.g. from git diff)."""
+    return [
+        p for p in paths
+        if not policy.skip_reason(Path(p).relative_to(root).as_posix(), Path(p).stat().st_size)
+    ]
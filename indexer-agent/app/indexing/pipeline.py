@@ -0,0 +1,192 @@
+# apps/indexer-agent/app/indexing/pipeline.py
+import ast
+import asyncio
+import hashlib
+import os
+import resource
+from collections.abc import Callable, Iterable
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+from pathlib import Path
+from ..config import settings
+from ..graph.writer import write_entities
+from .entity_extractor import EXTRACTOR_VERSION, collect_entities, module_name
+from .ir import FileRec
+from .parse_cache import get_parse_cache
+from .repo_spec import RepoSpec
+
+_DONE = object()
+
+
+def content_hash(source: bytes) -> str:
+    return hashlib.sha256(source).hexdigest()
+
+
+def hash_file(path: str) -> str:
+    return content_hash(Path(path).read_bytes())
+
+
+def extract_file(path: str, root: str | None = None) -> tuple[FileRec, bool]:
+    """
+    Parse a file and collect its entities, unless the parse cache
+    already holds them for this content. Returns (record, cache_hit).
+    Module names are relative to `root` (default REPO_DIR).
+    Runs in a worker process, so it only returns picklable records.
+    """
+    source = Path(path).read_bytes()
+    file_hash = content_hash(source)
+    module = module_name(path, root)
+    cache = get_parse_cache()
+
+    # Cached records are stored path-free, but qualified names depend on
+    # the module, so identical content is reused under the same module name
+    key = f"{file_hash}:{module}"
+    cached = cache.get(key, EXTRACTOR_VERSION) if cache else None
+    if cached is not None:
+        return replace(cached, path=path), True
+
+    rec = collect_entities(ast.parse(source), path, file_hash, module)
+    if cache:
+        cache.put(key, EXTRACTOR_VERSION, replace(rec, path=None))
+    return rec, False
+
+
+def parse_file(path: str, root: str | None = None) -> FileRec:
+    return extract_file(path, root)[0]
+
+
+def peak_rss() -> dict:
+    """Peak resident set size so far of this process and of its (parse worker) children."""
+    # ru_maxrss is in kilobytes on Linux
+    return {
+        "peak_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        "workers_peak_rss_bytes": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * 1024,
+    }
+
+
+class _ByteBudget:
+    """
+    Caps the source bytes of files between the parse and write stages.
+    A file larger than the whole budget still goes through, on its own.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.used = 0
+        self.peak = 0
+        self._released = asyncio.Condition()
+
+    async def acquire(self, size: int):
+        async with self._released:
+            await self._released.wait_for(
+                lambda: not self.limit or self.used == 0 or self.used + size <= self.limit
+            )
+            self.used += size
+            self.peak = max(self.peak, self.used)
+
+    async def release(self, size: int):
+        async with self._released:
+            self.used -= size
+            self._released.notify_all()
+
+
+async def run_pipeline(
+    paths: Iterable[str],
+    generation: int = 0,
+    on_written: Callable[[str], None] | None = None,
+    spec: RepoSpec | None = None,
+) -> dict:
+    """
+    Two-stage indexing pipeline:
+    - parse stage: a process pool turns files into FileRec records
+    - write stage: INDEX_WRITE_CONCURRENCY async writers drain a
+      bounded queue into Neo4j
+
+    `paths` is consumed lazily, so it can be a discovery generator.
+    Every stage is bounded: at most 2 × INDEX_WORKERS parses in flight,
+    INDEX_QUEUE_SIZE parsed files waiting, and INDEX_MAX_INFLIGHT_BYTES
+    of source between reading a file and writing it, so memory stays
+    flat however many files there are.
+
+    Everything is written with index generation `generation` under the
+    namespace of `spec` (default: the configured repository), and
+    `on_written` is called with each file once it is in the graph. It
+    runs in a worker thread (it records checkpoints in SQLite), and its
+    errors are logged without failing the file, which is already written.
+    Files that fail to parse or write are reported in `failed`.
+    """
+    spec = spec or RepoSpec.from_settings()
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=settings.INDEX_QUEUE_SIZE)
+    writers = settings.INDEX_WRITE_CONCURRENCY
+    budget = _ByteBudget(settings.INDEX_MAX_INFLIGHT_BYTES)
+    stats = {
+        "indexed_files": 0, "failed_files": 0, "statements": 0, "rows": 0,
+        "cache_hits": 0, "cache_misses": 0,
+    }
+    failed: list[dict] = []
+
+    def fail(path: str, stage: str, error: Exception):
+        print(f"{stage.capitalize()} error in {path}: {error}")
+        failed.append({"file": path, "stage": stage, "error": str(error)})
+        stats["failed_files"] += 1
+
+    async def parse(pool: ProcessPoolExecutor, path: str, size: int):
+        try:
+            rec, cache_hit = await loop.run_in_executor(pool, extract_file, path, spec.dir)
+        except Exception as e:
+            fail(path, "parse", e)
+            await budget.release(size)
+            return
+        stats["cache_hits" if cache_hit else "cache_misses"] += 1
+        # Blocks while the writers are behind (backpressure)
+        await queue.put((path, rec, size))
+
+    async def produce():
+        with ProcessPoolExecutor(max_workers=settings.INDEX_WORKERS) as pool:
+            in_flight: set[asyncio.Task] = set()
+            for path in paths:
+                try:
+                    size = os.stat(path).st_size
+                except OSError as e:
+                    fail(path, "parse", e)
+                    continue
+                # Blocks while too many bytes are between reading and writing
+                await budget.acquire(size)
+                if len(in_flight) >= settings.INDEX_WORKERS * 2:
+                    _, in_flight = await asyncio.wait(
+                        in_flight, return_when=asyncio.FIRST_COMPLETED
+                    )
+                in_flight.add(asyncio.create_task(parse(pool, path, size)))
+            if in_flight:
+                await asyncio.wait(in_flight)
+        for _ in range(writers):
+            await queue.put(_DONE)
+
+    async def consume():
+        while (item := await queue.get()) is not _DONE:
+            path, rec, size = item
+            try:
+                result = await write_entities([rec], generation, spec.namespace)
+            except Exception as e:
+                # Raised only once the driver's transient-error retries are exhausted
+                fail(path, "write", e)
+                continue
+            finally:
+                # Drop the record before waiting for the next one
+                item = rec = None
+                await budget.release(size)
+            stats["indexed_files"] += 1
+            if on_written:
+                try:
+                    await asyncio.to_thread(on_written, path)
+                except Exception as e:
+                    print(f"Checkpoint error in {path}: {e}")
+            stats["statements"] += result["statements"]
+            stats["rows"] += result["rows"]
+
+    await asyncio.gather(produce(), *[consume() for _ in range(writers)])
+
+    if cache := get_parse_cache():
+        await loop.run_in_executor(None, cache.evict)
+    return {**stats, "peak_inflight_bytes": budget.peak, **peak_rss(), "failed": failed}
@@ -1,60 +1,355 @@
 # apps/indexer-agent/app/indexing/repository_manager.py
 import asyncio
 import shutil
+from collections import Counter
 from functools import partial
-from git import Repo, InvalidGitRepositoryError
+from git import Repo, InvalidGitRepositoryError, GitCommandError, NoSuchPathError
 from pathlib import Path
 from ..config import settings
-from ..indexing.file_indexer import index_file
+from ..graph.backend import get_backend
+from ..graph.index_state import (
+    bump_index_marker, get_file_hashes, get_indexed_commit, next_generation, set_indexed_commit,
+)
+from ..graph.sweep import sweep_files, sweep_orphans, sweep_stale
+from ..graph.writer import retract_files
+from .checkpoints import get_checkpoints
+from .path_policy import PathPolicy, discover_files, filter_paths, iter_files
+from .pipeline import hash_file, run_pipeline
+from .repo_spec import RepoSpec
 
-def _update_repo_sync():
-    """Synchronous git operations (run in executor)."""
-    repo_dir = Path(settings.REPO_DIR)
-    git_dir = repo_dir / ".git"
-    
-    if git_dir.exists():
-        # Valid git repo exists, pull latest
-        try:
-            Repo(settings.REPO_DIR).remotes.origin.pull()
-        except Exception:
-            # If pull fails, re-clone
-            shutil.rmtree(repo_dir, ignore_errors=True)
-            Repo.clone_from(settings.FASTAPI_REPO_URL, settings.REPO_DIR)
+def _clone_repo(spec: RepoSpec):
+    """
+    Clone only what indexing needs: a shallow history (REPO_CLONE_DEPTH),
+    blobs fetched on demand (REPO_CLONE_FILTER) and, when REPO_SPARSE_PATHS
+    is set, a sparse working tree with just those paths materialized.
+    """
+    if not spec.url:
+        raise ValueError(f"Repository '{spec.namespace}' is not cloned yet; pass its repo_url")
+    options = []
+    if settings.REPO_CLONE_DEPTH:
+        options.append(f"--depth={settings.REPO_CLONE_DEPTH}")
+    if settings.REPO_CLONE_FILTER:
+        options.append(f"--filter={settings.REPO_CLONE_FILTER}")
+    if spec.ref:
+        options.append(f"--branch={spec.ref}")
+    if _sparse_paths(spec):
+        options.append("--sparse")
+
+    repo = Repo.clone_from(spec.url, spec.dir, multi_options=options)
+    _apply_sparse_checkout(repo, spec)
+
+def _sparse_paths(spec: RepoSpec) -> list[str]:
+    # Sparse patterns are written for the configured repository only
+    return settings.REPO_SPARSE_PATHS if spec.is_default else []
+
+def _apply_sparse_checkout(repo: Repo, spec: RepoSpec):
+    if paths := _sparse_paths(spec):
+        # gitignore-style patterns, e.g. "/fastapi/" or "*.py"
+        repo.git.sparse_checkout("set", "--no-cone", *paths)
+
+def _fetch_and_reset(repo: Repo, spec: RepoSpec):
+    """
+    Bring an existing clone to the remote tip without merging:
+    works for shallow clones and recovers from local modifications.
+    """
+    ref = spec.ref or "HEAD"
+    if settings.REPO_CLONE_DEPTH:
+        repo.git.fetch("origin", ref, depth=settings.REPO_CLONE_DEPTH)
     else:
-        # No git repo, remove any existing files and clone fresh
+        repo.git.fetch("origin", ref)
+    repo.git.reset("--hard", "FETCH_HEAD")
+    repo.git.clean("-fd")
+    _apply_sparse_checkout(repo, spec)
+
+def _update_repo_sync(spec: RepoSpec):
+    """Synchronous git operations (run in executor)."""
+    repo_dir = Path(spec.dir)
+
+    try:
+        repo = Repo(spec.dir)
+    except (InvalidGitRepositoryError, NoSuchPathError):
+        # No usable git repo, remove any existing files and clone fresh
         if repo_dir.exists():
             shutil.rmtree(repo_dir, ignore_errors=True)
-        Repo.clone_from(settings.FASTAPI_REPO_URL, settings.REPO_DIR)
+        _clone_repo(spec)
+        return
+
+    # The namespace now points at another repository, or the clone has no
+    # origin (interrupted clone, hand-made checkout): start over
+    origin = repo.remotes.origin.url if "origin" in repo.remotes else None
+    if origin is None or (spec.url and origin != spec.url):
+        shutil.rmtree(repo_dir, ignore_errors=True)
+        _clone_repo(spec)
+        return
+
+    # Fetch + hard reset instead of pull; network errors propagate
+    # rather than triggering a full re-clone
+    _fetch_and_reset(repo, spec)
 
-async def update_repo():
+async def update_repo(spec: RepoSpec | None = None):
     """Run git operations in thread pool to avoid blocking."""
     loop = asyncio.get_event_loop()
-    await loop.run_in_executor(None, _update_repo_sync)
-
-async def index_repository():
-    # clones the repository from the URL in the settings
-    await update_repo()
-    py_files = list(Path(settings.REPO_DIR).rglob("*.py"))
-    
-    # Index files sequentially to avoid Neo4j deadlocks
-    # Batch processing with limited concurrency
-    indexed = 0
-    batch_size = 3  # Small batches to avoid deadlocks
-    
-    for i in range(0, len(py_files), batch_size):
-        batch = py_files[i:i + batch_size]
-        try:
-            await asyncio.gather(*[index_file(str(f)) for f in batch])
-            indexed += len(batch)
-        except Exception as e:
-            # Log but continue with next batch
-            print(f"Batch indexing error: {e}")
-            # Try indexing files one by one in failed batch
-            for f in batch:
-                try:
-                    await index_file(str(f))
-                    indexed += 1
-                except Exception:
-                    pass  # Skip failed files
-    
-    return {"indexed_files": indexed}
+    await loop.run_in_executor(None, _update_repo_sync, spec or RepoSpec.from_settings())
+
+def head_commit(root: str | None = None) -> str:
+    return Repo(root or settings.REPO_DIR).head.commit.hexsha
+
+def _diff_since(root: Path, commit: str) -> tuple[list[str], list[str]] | None:
+    """
+    Return (changed, removed) absolute *.py paths between commit and HEAD,
+    or None if the commit is not available in the local clone.
+    """
+    try:
+        output = Repo(root).git.diff(
+            "--name-status", "-M", commit, "HEAD", "--", "*.py"
+        )
+    except GitCommandError:
+        return None
+
+    changed, removed = [], []
+    for line in output.splitlines():
+        status, *names = line.split("\t")
+        if status[0] == "D":
+            removed.append(str(root / names[0]))
+        elif status[0] == "R":
+            # Renames retract the old path and index the new one
+            removed.append(str(root / names[0]))
+            changed.append(str(root / names[1]))
+        else:
+            changed.append(str(root / names[-1]))
+    return changed, removed
+
+def _head_or_none(root: str) -> str | None:
+    """HEAD of the clone at root, or None if there is no clone (yet)."""
+    try:
+        return head_commit(root)
+    except (InvalidGitRepositoryError, NoSuchPathError):
+        return None
+
+def _changed_by_hash(paths: list[str], stored: dict[str, str | None]) -> list[str]:
+    """Keep only the files whose content differs from what the graph holds."""
+    return [p for p in paths if stored.get(p) != hash_file(p)]
+
+async def _open_run(spec: RepoSpec, head: str, mode: str) -> tuple[int, bool, set[str]]:
+    """
+    Generation of a new run, or of an unfinished run for this commit (the
+    indexer restarted), which is resumed. Returns (generation, resumed,
+    files already checkpointed by the resumed run).
+    """
+    checkpoints = get_checkpoints()
+    if checkpoints:
+        generation = await asyncio.to_thread(checkpoints.find_run, spec.namespace, head, mode)
+        if generation is not None:
+            done = await asyncio.to_thread(checkpoints.completed, spec.namespace, head, generation)
+            return generation, True, done
+    generation = await next_generation(spec.namespace)
+    if checkpoints:
+        await asyncio.to_thread(checkpoints.start_run, spec.namespace, head, mode, generation)
+    return generation, False, set()
+
+async def prepare_index(
+    incremental: bool = False, policy: PathPolicy | None = None, spec: RepoSpec | None = None
+) -> dict:
+    """
+    First step of an index run: update the clone, work out which files
+    need indexing, retract removed files and open a new generation.
+    The returned `files` can be indexed in one go or split into shards
+    across indexer replicas (index_files), followed by finalize_index.
+    `spec` selects the repository and namespace (default: the configured one).
+    """
+    spec = spec or RepoSpec.from_settings()
+    await update_repo(spec)
+    await get_backend().ensure_schema()
+    loop = asyncio.get_event_loop()
+    root = Path(spec.dir).resolve()
+    policy = policy or PathPolicy.from_settings()
+    head = await loop.run_in_executor(None, head_commit, spec.dir)
+    py_files, skipped = await loop.run_in_executor(None, discover_files, root, policy)
+
+    removed: list[str] = []
+    previous = None
+    if incremental:
+        previous = await get_indexed_commit(spec.namespace)
+        stored = await get_file_hashes(spec.namespace)
+        diff = await loop.run_in_executor(None, _diff_since, root, previous) if previous else None
+        if diff is not None:
+            changed, _ = diff
+            changed = [p for p in changed if Path(p).exists()]
+            # Files the policy newly admits are unchanged in git but not in the graph
+            candidates = sorted(set(filter_paths(root, changed, policy)) | (set(py_files) - set(stored)))
+        else:
+            # No usable previous commit: fall back to comparing content hashes
+            candidates = py_files
+        # Deleted and renamed files, and files the policy now excludes
+        removed = sorted(set(stored) - set(py_files))
+        to_index = await loop.run_in_executor(None, _changed_by_hash, candidates, stored)
+    else:
+        to_index = py_files
+
+    await retract_files(removed, spec.namespace)
+
+    # A run for this commit that never finalized (e.g. the indexer restarted)
+    # is resumed: same generation, and checkpointed files are skipped
+    mode = "incremental" if incremental else "full"
+    generation, resumed, done = await _open_run(spec, head, mode)
+    checkpointed = sum(1 for p in to_index if p in done)
+    to_index = [p for p in to_index if p not in done]
+
+    return {
+        "repo": spec.namespace,
+        "url": spec.url,
+        "ref": spec.ref,
+        "mode": mode,
+        "commit": head,
+        "previous_commit": previous,
+        "generation": generation,
+        "resumed": resumed,
+        "checkpointed_files": checkpointed,
+        "skipped_unchanged": len(py_files) - len(to_index) if incremental else 0,
+        "skipped_files": skipped,
+        "removed_files": len(removed),
+        "files": to_index,
+    }
+
+
+async def index_files(
+    paths: list[str], generation: int, commit: str | None = None, spec: RepoSpec | None = None
+) -> dict:
+    """
+    Index a shard of a prepared run. When `commit` is given the local clone
+    is brought to it first, so replicas without a shared clone index the
+    same tree as the replica that prepared the run, and every written file
+    is checkpointed so a retried shard only indexes what is left.
+    """
+    spec = spec or RepoSpec.from_settings()
+    loop = asyncio.get_event_loop()
+    if commit and await loop.run_in_executor(None, _head_or_none, spec.dir) != commit:
+        await update_repo(spec)
+        head = await loop.run_in_executor(None, head_commit, spec.dir)
+        if head != commit:
+            raise RuntimeError(f"Clone is at {head}, expected {commit}")
+    await get_backend().ensure_schema()
+
+    # Files finished before a restart or by an earlier attempt at this shard
+    on_written = None
+    checkpointed = 0
+    checkpoints = get_checkpoints() if commit else None
+    if checkpoints:
+        done = await asyncio.to_thread(checkpoints.completed, spec.namespace, commit, generation)
+        checkpointed = sum(1 for p in paths if p in done)
+        paths = [p for p in paths if p not in done]
+        on_written = partial(checkpoints.mark_done, spec.namespace, commit, generation)
+
+    # CPU-bound parsing runs in worker processes while
+    # async writers stream the results into Neo4j
+    result = await run_pipeline(paths, generation, on_written, spec)
+    return {**result, "checkpointed_files": checkpointed}
+
+
+async def finalize_index(
+    commit: str,
+    generation: int,
+    indexed: list[str],
+    failed_files: int,
+    incremental: bool,
+    spec: RepoSpec | None = None,
+) -> dict:
+    """
+    Last step of an index run: drop what this generation did not rewrite
+    and record the indexed commit. A full run sweeps the whole graph, unless
+    some files failed: their entities still carry the old generation, so
+    only the `indexed` files are swept.
+    """
+    spec = spec or RepoSpec.from_settings()
+    # Files written before an interruption belong to the run as well
+    checkpoints = get_checkpoints()
+    if checkpoints:
+        done = await asyncio.to_thread(checkpoints.completed, spec.namespace, commit, generation)
+        indexed = sorted(set(indexed) | done)
+
+    if incremental or failed_files:
+        swept = await sweep_files(indexed, generation, spec.namespace)
+    else:
+        swept = await sweep_stale(generation, spec.namespace)
+    swept["orphans"] = await sweep_orphans(spec.namespace)
+
+    # Only advance the commit marker once every file made it into the graph,
+    # so that failed files are picked up again by the next incremental run
+    if failed_files == 0:
+        await set_indexed_commit(spec.namespace, commit, spec.url, spec.ref)
+        if checkpoints:
+            await asyncio.to_thread(checkpoints.finish_run, spec.namespace, commit, generation)
+    await bump_index_marker(spec.namespace)
+    return swept
+
+
+async def _index_full(policy: PathPolicy | None, spec: RepoSpec) -> dict:
+    """
+    A full run in one call. Discovered files go straight into the pipeline,
+    so indexing starts with the first file found and no file list is built;
+    the tree is only walked again when some files failed, as finalize_index
+    then sweeps the files that made it.
+    """
+    await update_repo(spec)
+    await get_backend().ensure_schema()
+    loop = asyncio.get_event_loop()
+    root = Path(spec.dir).resolve()
+    policy = policy or PathPolicy.from_settings()
+    head = await loop.run_in_executor(None, head_commit, spec.dir)
+    generation, resumed, done = await _open_run(spec, head, "full")
+
+    checkpoints = get_checkpoints()
+    on_written = partial(checkpoints.mark_done, spec.namespace, head, generation) if checkpoints else None
+    skipped: Counter = Counter()
+    checkpointed = 0
+
+    def pending():
+        nonlocal checkpointed
+        for path in iter_files(root, policy, skipped):
+            if path in done:
+                checkpointed += 1
+                continue
+            yield path
+
+    result = await run_pipeline(pending(), generation, on_written, spec)
+
+    indexed: list[str] = []
+    if failed := {f["file"] for f in result["failed"]}:
+        indexed = [p for p in iter_files(root, policy) if p not in failed]
+    swept = await finalize_index(head, generation, indexed, result["failed_files"], False, spec)
+    return {
+        "repo": spec.namespace,
+        "url": spec.url,
+        "ref": spec.ref,
+        "mode": "full",
+        "commit": head,
+        "previous_commit": None,
+        "generation": generation,
+        "resumed": resumed,
+        "checkpointed_files": checkpointed,
+        "skipped_unchanged": 0,
+        "skipped_files": dict(skipped),
+        "removed_files": 0,
+        "swept": swept,
+        **result,
+    }
+
+
+async def index_repository(
+    incremental: bool = False, policy: PathPolicy | None = None, spec: RepoSpec | None = None
+):
+    spec = spec or RepoSpec.from_settings()
+    if not incremental:
+        return await _index_full(policy, spec)
+    # Incremental runs need the full file list to diff against the graph
+    plan = await prepare_index(incremental, policy, spec)
+    files = plan.pop("files")
+    result = await index_files(files, plan["generation"], plan["commit"], spec)
+    plan["checkpointed_files"] += result.pop("checkpointed_files")
+
+    failed = {f["file"] for f in result["failed"]}
+    plan["swept"] = await finalize_index(
+        plan["commit"], plan["generation"],
+        [p for p in files if p not in failed], result["failed_files"], incremental, spec,
+    )
+    return {**plan, **result}
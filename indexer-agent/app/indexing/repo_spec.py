@@ -0,0 +1,60 @@
+# apps/indexer-agent/app/indexing/repo_spec.py
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from ..config import settings
+
+_NAMESPACE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]*$")
+
+
+def namespace_for(url: str) -> str:
+    """Default namespace of a repository URL (https://github.com/fastapi/fastapi.git → fastapi)."""
+    name = url.rstrip("/").rpartition("/")[2].rpartition(":")[2]
+    return name.removesuffix(".git").lower()
+
+
+def default_namespace() -> str:
+    return settings.REPO_NAMESPACE or namespace_for(settings.FASTAPI_REPO_URL)
+
+
+@dataclass(frozen=True)
+class RepoSpec:
+    """
+    Which repository an index run works on. Every node written for it
+    carries `repo = namespace`, so several repositories (or several refs
+    of one) live side by side in the graph. The default namespace is
+    cloned to REPO_DIR, every other one to REPOS_DIR/<namespace>.
+    """
+    namespace: str
+    url: str | None  # None: reuse the remote of an existing clone
+    ref: str  # branch or tag, "" = remote default
+    dir: str
+
+    @property
+    def is_default(self) -> bool:
+        return self.namespace == default_namespace()
+
+    @classmethod
+    def from_settings(
+        cls,
+        url: str | None = None,
+        ref: str | None = None,
+        namespace: str | None = None,
+    ) -> "RepoSpec":
+        """The configured repository, or the one given by url/ref/namespace."""
+        namespace = namespace or (namespace_for(url) if url else default_namespace())
+        if not _NAMESPACE.match(namespace):
+            raise ValueError(f"Invalid repository namespace: {namespace!r}")
+        if namespace == default_namespace():
+            return cls(
+                namespace=namespace,
+                url=url or settings.FASTAPI_REPO_URL,
+                ref=settings.REPO_BRANCH if ref is None else ref,
+                dir=settings.REPO_DIR,
+            )
+        return cls(
+            namespace=namespace,
+            url=url,
+            ref=ref or "",
+            dir=str(Path(settings.REPOS_DIR) / namespace),
+        )
@@ -0,0 +1,233 @@
+# apps/indexer-agent/app/indexing/watcher.py
+import asyncio
+import os
+import time
+from collections import deque
+from pathlib import Path
+from ..config import settings
+from ..graph.index_state import bump_index_marker
+from ..graph.sweep import sweep_orphans
+from ..graph.writer import retract_files
+from .file_indexer import index_file
+from .path_policy import PathPolicy
+from .repo_spec import RepoSpec
+
+try:
+    # inotify (Linux) / FSEvents / ReadDirectoryChangesW via the Rust notify crate
+    from watchfiles import awatch
+except ImportError:
+    awatch = None
+
+# ---------------------------------------------------------
+# Watch mode: keep the graph in step with the working tree
+# of a repository clone (one watcher per namespace). Filesystem events for *.py files are collected
+# into a pending set (repeated events for a file coalesce),
+# flushed once no new event arrived for WATCH_DEBOUNCE_MS,
+# and each changed file goes through index_file, which
+# retracts the entities it no longer has. Deleted files are
+# retracted from the graph.
+# ---------------------------------------------------------
+
+
+class RepoWatcher:
+    def __init__(self, spec: RepoSpec, policy: PathPolicy, debounce_ms: int, backend: str):
+        self.spec = spec
+        self.root = Path(spec.dir).resolve()
+        self.policy = policy
+        self.debounce = debounce_ms / 1000
+        if backend not in ("auto", "inotify", "poll"):
+            raise ValueError(f"Unknown watch backend: {backend}")
+        if backend == "auto":
+            backend = "inotify" if awatch else "poll"
+        if backend == "inotify" and awatch is None:
+            raise RuntimeError("watchfiles is not installed; use the poll backend")
+        self.backend = backend
+        self.pending: set[str] = set()
+        self.stats = {"events": 0, "flushes": 0, "indexed": 0, "removed": 0, "failed": 0}
+        # Only the latest errors are reported; older ones are dropped
+        self.errors: deque[dict] = deque(maxlen=10)
+        self.last_flush: dict | None = None
+        self._changed = asyncio.Event()
+        self._stop = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+
+    @property
+    def running(self) -> bool:
+        return any(not task.done() for task in self._tasks)
+
+    def start(self):
+        source = self._inotify() if self.backend == "inotify" else self._poll()
+        self._tasks = [asyncio.create_task(source), asyncio.create_task(self._flusher())]
+
+    async def stop(self):
+        self._stop.set()
+        self._changed.set()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def status(self) -> dict:
+        return {
+            "running": self.running,
+            "repo": self.spec.namespace,
+            "backend": self.backend,
+            "root": str(self.root),
+            "debounce_ms": int(self.debounce * 1000),
+            "pending": len(self.pending),
+            **self.stats,
+            "last_flush": self.last_flush,
+            "errors": list(self.errors),
+        }
+
+    def _wanted(self, path: str) -> bool:
+        """*.py files under the root that pass the path policy (deleted files skip the size check)."""
+        p = Path(path)
+        if p.suffix != ".py":
+            return False
+        try:
+            rel = p.relative_to(self.root).as_posix()
+        except ValueError:
+            return False
+        if rel.startswith(".git/"):
+            return False
+        # The file can vanish at any point (deletes, an editor's atomic save)
+        try:
+            size = p.stat().st_size
+        except OSError:
+            size = 0
+        return self.policy.skip_reason(rel, size) is None
+
+    def _record(self, paths):
+        seen = False
+        for path in paths:
+            if self._wanted(path):
+                self.pending.add(str(Path(path).resolve()))
+                self.stats["events"] += 1
+                seen = True
+        if seen:
+            self._changed.set()
+
+    # ---------------------------------------------------------
+    # Event sources
+    # ---------------------------------------------------------
+    async def _inotify(self):
+        # watchfiles only groups events briefly; debouncing happens in _flusher
+        async for changes in awatch(self.root, debounce=50, step=50, stop_event=self._stop):
+            self._record(path for _, path in changes)
+
+    def _snapshot(self) -> dict[str, tuple[int, int]]:
+        snapshot = {}
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [d for d in dirnames if d != ".git"]
+            for name in filenames:
+                if name.endswith(".py"):
+                    path = os.path.join(dirpath, name)
+                    try:
+                        st = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    snapshot[path] = (st.st_mtime_ns, st.st_size)
+        return snapshot
+
+    async def _poll(self):
+        loop = asyncio.get_running_loop()
+        previous = await loop.run_in_executor(None, self._snapshot)
+        while not self._stop.is_set():
+            try:
+                await asyncio.wait_for(self._stop.wait(), settings.WATCH_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            current = await loop.run_in_executor(None, self._snapshot)
+            changed = {p for p, sig in current.items() if previous.get(p) != sig}
+            self._record(changed | (previous.keys() - current.keys()))
+            previous = current
+
+    # ---------------------------------------------------------
+    # Debounced flush
+    # ---------------------------------------------------------
+    async def _flusher(self):
+        while not self._stop.is_set():
+            await self._changed.wait()
+            # Wait for the burst to settle: flush once no event came in for `debounce`
+            while not self._stop.is_set():
+                self._changed.clear()
+                try:
+                    await asyncio.wait_for(self._changed.wait(), self.debounce)
+                except asyncio.TimeoutError:
+                    break
+            if self.pending and not self._stop.is_set():
+                await self._flush()
+
+    async def _flush(self):
+        batch, self.pending = sorted(self.pending), set()
+        started = time.perf_counter()
+        removed = [p for p in batch if not Path(p).exists()]
+        indexed = 0
+
+        for path in batch:
+            if path in removed:
+                continue
+            try:
+                await index_file(path, orphans=False, spec=self.spec)
+                indexed += 1
+            except Exception as e:
+                print(f"Watch reindex error in {path}: {e}")
+                self.errors.append({"file": path, "error": str(e), "at": time.time()})
+                self.stats["failed"] += 1
+        try:
+            await retract_files(removed, self.spec.namespace)
+            await sweep_orphans(self.spec.namespace)
+        except Exception as e:
+            print(f"Watch retraction error: {e}")
+            self.errors.append({"file": None, "error": str(e), "at": time.time()})
+        try:
+            await bump_index_marker(self.spec.namespace)
+        except Exception as e:
+            print(f"Watch index marker error: {e}")
+            self.errors.append({"file": None, "error": str(e), "at": time.time()})
+
+        self.stats["flushes"] += 1
+        self.stats["indexed"] += indexed
+        self.stats["removed"] += len(removed)
+        self.last_flush = {
+            "files": len(batch),
+            "indexed": indexed,
+            "removed": len(removed),
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+            "at": time.time(),
+        }
+
+
+_watchers: dict[str, RepoWatcher] = {}
+
+
+async def start_watching(
+    debounce_ms: int | None = None,
+    backend: str | None = None,
+    policy: PathPolicy | None = None,
+    spec: RepoSpec | None = None,
+) -> dict:
+    """Start watching a clone (restarting its existing watcher with the new options)."""
+    spec = spec or RepoSpec.from_settings()
+    if not Path(spec.dir).is_dir():
+        raise ValueError(f"Repository '{spec.namespace}' is not cloned yet; index it first")
+    await stop_watching(spec.namespace)
+    watcher = RepoWatcher(
+        spec,
+        policy or PathPolicy.from_settings(),
+        settings.WATCH_DEBOUNCE_MS if debounce_ms is None else debounce_ms,
+        backend or settings.WATCH_BACKEND,
+    )
+    watcher.start()
+    _watchers[spec.namespace] = watcher
+    return watcher.status()
+
+
+async def stop_watching(namespace: str | None = None) -> dict:
+    """Stop the watcher of one namespace, or every watcher."""
+    stopped = [ns for ns in _watchers if namespace in (None, ns)]
+    for ns in stopped:
+        await _watchers.pop(ns).stop()
+    return {"stopped": stopped}
+
+
+def watch_status() -> dict:
+    return {"watchers": [watcher.status() for watcher in _watchers.values()]}
@@ -0,0 +1,322 @@
+# indexer-agent/benchmarks/indexing.py
+"""
+Indexing throughput per stage on a synthetic (or existing) repository.
+
+Files go through the indexer stage by stage, in batches, and each
+stage is timed on its own:
+
+    parse     parse_python_ast (read + ast.parse in a worker thread)
+    extract   collect_entities (the AST walk of extract_entities)
+    write     write_entities, against a recording stand-in of the
+              Neo4j driver by default, the in-memory graph backend
+              with --memory, or a real Neo4j with --neo4j
+
+With --pipeline the same files then go through run_pipeline end to
+end (parse worker processes + async writers) against the same target.
+
+    python -m benchmarks.indexing --files 2000 --label before --out before.json
+    python -m benchmarks.indexing --files 2000 --label after --baseline before.json
+    python -m benchmarks.indexing --repo /tmp/repos/fastapi --pipeline
+
+For a local Neo4j (written under namespace --namespace, removed afterwards):
+
+    docker run -d -p 7687:7687 -e NEO4J_AUTH=neo4j/password neo4j:5
+    NEO4J_URI=bolt://localhost:7687 python -m benchmarks.indexing --neo4j
+
+Run from indexer-agent/. The shape of the synthetic repository is set
+with --files/--classes/--methods/--functions/--calls (see synthetic_repo).
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from app.config import settings
+from app.graph import backend as graph_backend
+from app.graph import driver as graph_driver
+from app.graph import writer
+from app.graph.backend import get_backend
+from app.indexing.ast_parser import parse_python_ast
+from app.indexing.entity_extractor import collect_entities, module_name
+from app.indexing.path_policy import PathPolicy, discover_files
+from app.indexing.pipeline import hash_file, peak_rss, run_pipeline
+from app.indexing.repo_spec import RepoSpec
+from benchmarks.synthetic_repo import Shape, generate_repo
+
+STAGES = ("discover", "parse", "extract", "write")
+
+
+class RecordingGraph:
+    """
+    Stands in for app.graph.driver: keeps count of what would be sent
+    to Neo4j (transactions, statements, rows) and returns no records.
+    """
+
+    def __init__(self):
+        self.transactions = 0
+        self.statements = 0
+        self.rows = 0
+        self.queries = 0
+
+    async def run_query(self, cypher: str, params: dict = None):
+        self.queries += 1
+        return []
+
+    async def run_transaction(self, statements: list[tuple[str, dict]]):
+        self.transactions += 1
+        self.statements += len(statements)
+        self.rows += sum(len(params.get("rows", ())) for _, params in statements)
+
+    def install(self):
+        # Patched where the functions were imported, not only in driver.py
+        for module in (graph_driver, graph_backend):
+            module.run_query = self.run_query
+            module.run_transaction = self.run_transaction
+
+    def counts(self) -> dict:
+        return {
+            "transactions": self.transactions,
+            "statements": self.statements,
+            "rows": self.rows,
+            "queries": self.queries,
+        }
+
+
+async def _drop_namespace(repo: str):
+    while True:
+        rows = await graph_driver.run_query("""
+            MATCH (n {repo:$repo})
+            WITH n LIMIT 10000
+            DETACH DELETE n
+            RETURN count(*) AS deleted
+        """, {"repo": repo})
+        if not rows or not rows[0]["deleted"]:
+            return
+
+
+class _Stage:
+    """Accumulated wall time, and the Python heap peak when tracing."""
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.peak_traced = 0
+
+    def __enter__(self):
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        self._start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.seconds += time.perf_counter() - self._start
+        if tracemalloc.is_tracing():
+            self.peak_traced = max(self.peak_traced, tracemalloc.get_traced_memory()[1])
+
+
+def _rate(files: int, stage: _Stage) -> dict:
+    result = {
+        "seconds": round(stage.seconds, 3),
+        "files_per_sec": round(files / stage.seconds, 1) if stage.seconds else None,
+        "ms_per_file": round(stage.seconds * 1000 / files, 3) if files else None,
+    }
+    if tracemalloc.is_tracing():
+        result["peak_traced_bytes"] = stage.peak_traced
+    return result
+
+
+async def run_stages(paths: list[str], spec: RepoSpec, batch: int, write_batch: int) -> dict:
+    """
+    Parse, extract and write `batch` files at a time, so only one batch
+    of ASTs is alive at once, timing every stage separately.
+    """
+    timers = {stage: _Stage() for stage in STAGES[1:]}
+    totals = {"entities": 0, "edges": 0, "statements": 0, "rows": 0}
+    # The benchmark namespace is thrown away afterwards, so generations are fixed
+    generation = 1
+
+    for start in range(0, len(paths), batch):
+        chunk = paths[start:start + batch]
+        with timers["parse"]:
+            trees = [await parse_python_ast(path) for path in chunk]
+        with timers["extract"]:
+            records = [
+                collect_entities(tree, path, hash_file(path), module_name(path, spec.dir))
+                for path, tree in zip(chunk, trees)
+            ]
+        trees = None
+        for rec in records:
+            totals["entities"] += len(rec.classes) + len(rec.functions)
+            totals["edges"] += len(rec.edges)
+        with timers["write"]:
+            for i in range(0, len(records), write_batch):
+                result = await writer.write_entities(records[i:i + write_batch], generation, spec.namespace)
+                totals["statements"] += result["statements"]
+                totals["rows"] += result["rows"]
+        records = None
+
+    files = len(paths)
+    stages = {name: _rate(files, timer) for name, timer in timers.items()}
+    stages["extract"]["entities_per_file"] = round(totals["entities"] / files, 2) if files else 0
+    stages["extract"]["edges_per_file"] = round(totals["edges"] / files, 2) if files else 0
+    stages["write"].update({
+        "write_batch": write_batch,
+        "statements": totals["statements"],
+        "rows": totals["rows"],
+        "statements_per_file": round(totals["statements"] / files, 2) if files else 0,
+        "rows_per_file": round(totals["rows"] / files, 2) if files else 0,
+    })
+    return stages
+
+
+async def run_end_to_end(paths: list[str], spec: RepoSpec) -> dict:
+    start = time.perf_counter()
+    result = await run_pipeline(iter(paths), 2, spec=spec)
+    seconds = time.perf_counter() - start
+    failed = result.pop("failed")
+    return {
+        **result,
+        "failed": len(failed),
+        "seconds": round(seconds, 3),
+        "files_per_sec": round(len(paths) / seconds, 1) if seconds else None,
+        "workers": settings.INDEX_WORKERS,
+        "write_concurrency": settings.INDEX_WRITE_CONCURRENCY,
+    }
+
+
+async def run(args, root: Path) -> dict:
+    spec = RepoSpec(namespace=args.namespace, url=None, ref="", dir=str(root))
+    recorder = None
+    if args.memory:
+        settings.GRAPH_BACKEND = "memory"
+    elif args.neo4j:
+        await get_backend().ensure_schema()
+    else:
+        recorder = RecordingGraph()
+        recorder.install()
+
+    if args.trace_memory:
+        tracemalloc.start()
+    discover = _Stage()
+    with discover:
+        paths, skipped = discover_files(root, PathPolicy.from_settings())
+    if args.limit:
+        paths = paths[:args.limit]
+    stages = {"discover": _rate(len(paths), discover)}
+    stages.update(await run_stages(paths, spec, args.batch, args.write_batch))
+    if args.trace_memory:
+        tracemalloc.stop()
+
+    results = {
+        "label": args.label,
+        "target": "memory" if args.memory else "neo4j" if args.neo4j else "recording",
+        "files": len(paths),
+        "skipped": skipped,
+        "stages": stages,
+        "staged_files_per_sec": round(
+            len(paths) / sum(stages[s]["seconds"] for s in STAGES[1:]), 1
+        ) if paths else None,
+    }
+    try:
+        if args.pipeline:
+            if not args.parse_cache:
+                # Cold parses; also keeps the benchmark out of the real cache.
+                # The environment variable reaches spawned parse workers
+                os.environ["PARSE_CACHE_DIR"] = settings.PARSE_CACHE_DIR = ""
+            results["pipeline"] = await run_end_to_end(paths, spec)
+    finally:
+        if args.neo4j and not args.memory:
+            if not args.keep:
+                await _drop_namespace(spec.namespace)
+            await graph_driver.driver.close()
+    if recorder:
+        results["recorded"] = recorder.counts()
+    results.update(peak_rss())
+    return results
+
+
+def _print(results: dict, baseline: dict | None):
+    before = (baseline or {}).get("stages", {})
+    print(f"{results['files']} files, target {results['target']}")
+    print(f"{'stage':<10} {'seconds':>9} {'files/s':>10} {'ms/file':>9}  vs baseline files/s")
+    for name, stage in results["stages"].items():
+        delta = ""
+        if before.get(name, {}).get("files_per_sec") and stage["files_per_sec"]:
+            delta = f"{stage['files_per_sec'] / before[name]['files_per_sec']:.2f}x"
+        print(
+            f"{name:<10} {stage['seconds']:>9} {stage['files_per_sec'] or '-':>10} "
+            f"{stage['ms_per_file'] or '-':>9}  {delta}"
+        )
+    write = results["stages"]["write"]
+    print(
+        f"statements/file {write['statements_per_file']}, rows/file {write['rows_per_file']}, "
+        f"entities/file {results['stages']['extract']['entities_per_file']}"
+    )
+    if "pipeline" in results:
+        pipeline = results["pipeline"]
+        delta = ""
+        if (baseline or {}).get("pipeline", {}).get("files_per_sec") and pipeline["files_per_sec"]:
+            delta = f" ({pipeline['files_per_sec'] / baseline['pipeline']['files_per_sec']:.2f}x baseline)"
+        print(f"pipeline   {pipeline['seconds']:>9} {pipeline['files_per_sec']:>10} files/s{delta}")
+    print(
+        f"peak RSS {results['peak_rss_bytes'] / 2**20:.1f} MiB, "
+        f"workers {results['workers_peak_rss_bytes'] / 2**20:.1f} MiB"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repo", help="repository to index; generated there first if missing or empty "
+                                       "(default: a temporary synthetic repository)")
+    parser.add_argument("--files", type=int, default=Shape.files)
+    parser.add_argument("--classes", type=int, default=Shape.classes_per_file, help="classes per file")
+    parser.add_argument("--methods", type=int, default=Shape.methods_per_class, help="methods per class")
+    parser.add_argument("--functions", type=int, default=Shape.functions_per_file, help="functions per file")
+    parser.add_argument("--calls", type=int, default=Shape.calls_per_function, help="calls per function")
+    parser.add_argument("--seed", type=int, default=Shape.seed)
+    parser.add_argument("--limit", type=int, default=0, help="index only the first N discovered files")
+    parser.add_argument("--batch", type=int, default=100, help="files per staged batch")
+    parser.add_argument("--write-batch", type=int, default=1, help="files per write transaction")
+    parser.add_argument("--pipeline", action="store_true", help="also time run_pipeline end to end")
+    parser.add_argument("--parse-cache", action="store_true",
+                        help="let the pipeline use PARSE_CACHE_DIR (default: parse every file)")
+    parser.add_argument("--memory", action="store_true", help="write to the in-memory graph backend")
+    parser.add_argument("--neo4j", action="store_true", help="write to the Neo4j in app/config.py")
+    parser.add_argument("--namespace", default="benchmark", help="repository namespace to write under")
+    parser.add_argument("--keep", action="store_true", help="keep the written namespace in Neo4j")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="report the Python heap peak per stage (slows every stage down)")
+    parser.add_argument("--label", default="", help="tag stored with the results")
+    parser.add_argument("--out", help="write results as JSON")
+    parser.add_argument("--baseline", help="JSON from an earlier run to compare against")
+    args = parser.parse_args()
+
+    shape = Shape(
+        files=args.files, classes_per_file=args.classes, methods_per_class=args.methods,
+        functions_per_file=args.functions, calls_per_function=args.calls, seed=args.seed,
+    )
+    root = Path(args.repo) if args.repo else Path(tempfile.mkdtemp(prefix="synthetic-repo-"))
+    try:
+        generated = None
+        if not root.exists() or not any(root.iterdir()):
+            generated = generate_repo(root, shape)
+        results = asyncio.run(run(args, root))
+        results["repo"] = generated or {"root": str(root)}
+    finally:
+        if not args.repo:
+            shutil.rmtree(root, ignore_errors=True)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    _print(results, baseline)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
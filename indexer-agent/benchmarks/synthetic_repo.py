@@ -0,0 +1,148 @@
+# indexer-agent/benchmarks/synthetic_repo.py
+"""
+Generate a synthetic Python repository of a given size and shape.
+
+    python -m benchmarks.synthetic_repo /tmp/synthetic --files 5000 --classes 3 --calls 4
+
+Files are spread over nested packages. Each file imports a few sibling
+modules, defines classes (with bases, decorated methods and docstrings)
+and module-level functions, and every function body calls `calls`
+other functions: local ones, methods through self, and imported ones.
+The same seed always produces the same tree.
+"""
+import argparse
+import random
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+DECORATORS = ["staticmethod", "classmethod", "property", "cache", "validator"]
+ANNOTATIONS = ["int", "str", "bytes", "dict[str, int]", "list[str] | None", "Request"]
+
+
+@dataclass(frozen=True)
+class Shape:
+    files: int = 1000
+    classes_per_file: int = 3
+    methods_per_class: int = 5
+    functions_per_file: int = 4
+    params_per_function: int = 3
+    calls_per_function: int = 3
+    imports_per_file: int = 4
+    files_per_package: int = 20
+    docstring_ratio: float = 0.5
+    seed: int = 0
+
+
+def _module(index: int, shape: Shape) -> str:
+    package = index // shape.files_per_package
+    return f"synth.pkg{package // 10}.sub{package % 10}.mod{index}"
+
+
+def _signature(rng: random.Random, shape: Shape, method: bool) -> str:
+    params = ["self"] if method else []
+    for i in range(shape.params_per_function):
+        param = f"arg{i}: {rng.choice(ANNOTATIONS)}"
+        if i >= shape.params_per_function - 1:
+            param += " = None"
+        params.append(param)
+    return ", ".join(params)
+
+
+def _body(rng: random.Random, targets: list[str], calls: int, indent: str) -> list[str]:
+    lines = [f"{indent}result = 0"]
+    for target in rng.sample(targets, min(calls, len(targets))) if targets else []:
+        lines.append(f"{indent}result += {target}(result)")
+    if rng.random() < 0.3:
+        lines += [f"{indent}for item in range(result):", f"{indent}    result ^= item"]
+    lines.append(f"{indent}return result")
+    return lines
+
+
+def _docstring(rng: random.Random, shape: Shape, indent: str, subject: str) -> list[str]:
+    if rng.random() >= shape.docstring_ratio:
+        return []
+    # A few shared texts, so content-addressed docstrings get deduplicated
+    return [f'{indent}"""{subject} {rng.randrange(50)}: synthetic benchmark code."""']
+
+
+def render_file(index: int, shape: Shape) -> str:
+    rng = random.Random(shape.seed * 1_000_003 + index)
+    lines = ["import os", "import typing", ""]
+
+    imported = []
+    for _ in range(min(shape.imports_per_file, index)):
+        other = rng.randrange(index)
+        alias = f"m{other}"
+        lines.append(f"import {_module(other, shape)} as {alias}")
+        imported.append(f"{alias}.func0")
+    lines.append("")
+
+    functions = [f"func{i}" for i in range(shape.functions_per_file)]
+    for c in range(shape.classes_per_file):
+        base = f"Class{c - 1}" if c else "object"
+        lines.append(f"class Class{c}({base}):")
+        lines += _docstring(rng, shape, "    ", "Class")
+        methods = [f"method{m}" for m in range(shape.methods_per_class)]
+        for m, method in enumerate(methods):
+            if rng.random() < 0.2:
+                lines.append(f"    @{rng.choice(DECORATORS)}")
+            lines.append(f"    def {method}({_signature(rng, shape, True)}):")
+            lines += _docstring(rng, shape, "        ", "Method")
+            targets = [f"self.{name}" for name in methods[:m]] + functions + imported
+            lines += _body(rng, targets, shape.calls_per_function, "        ")
+            lines.append("")
+        lines.append("")
+
+    for f, function in enumerate(functions):
+        lines.append(f"def {function}({_signature(rng, shape, False)}):")
+        lines += _docstring(rng, shape, "    ", "Function")
+        targets = functions[:f] + functions[f + 1:] + imported + ["os.path.join", "len"]
+        lines += _body(rng, targets, shape.calls_per_function, "    ")
+        lines += ["", ""]
+    return "\n".join(lines)
+
+
+def generate_repo(root: str | Path, shape: Shape) -> dict:
+    """Write the repository under root and return its size."""
+    root = Path(root)
+    total_bytes = total_lines = 0
+    packages: set[Path] = set()
+    for index in range(shape.files):
+        path = root / (_module(index, shape).replace(".", "/") + ".py")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        source = render_file(index, shape)
+        path.write_text(source)
+        total_bytes += len(source)
+        total_lines += source.count("\n") + 1
+        packages.update(p for p in path.relative_to(root).parents if p != Path("."))
+    for package in packages:
+        (root / package / "__init__.py").touch()
+    return {
+        "root": str(root),
+        "files": shape.files + len(packages),  # with the __init__.py files
+        "packages": len(packages),
+        "bytes": total_bytes,
+        "lines": total_lines,
+        "shape": asdict(shape),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("root", help="output directory")
+    parser.add_argument("--files", type=int, default=Shape.files)
+    parser.add_argument("--classes", type=int, default=Shape.classes_per_file, help="classes per file")
+    parser.add_argument("--methods", type=int, default=Shape.methods_per_class, help="methods per class")
+    parser.add_argument("--functions", type=int, default=Shape.functions_per_file, help="functions per file")
+    parser.add_argument("--calls", type=int, default=Shape.calls_per_function, help="calls per function")
+    parser.add_argument("--seed", type=int, default=Shape.seed)
+    args = parser.parse_args()
+    shape = Shape(
+        files=args.files, classes_per_file=args.classes, methods_per_class=args.methods,
+        functions_per_file=args.functions, calls_per_function=args.calls, seed=args.seed,
+    )
+    print(generate_repo(args.root, shape))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,136 @@
 import ast
 import os
+import socket
+from contextlib import asynccontextmanager
 from fastmcp import FastMCP
-from app.indexing.repo_manager import index_repository
+from app.config import settings
+from app.graph.backend import get_backend
+from app.indexing.repo_manager import (
+    finalize_index as finalize_repository_index,
+    index_files as index_repository_files,
+    index_repository,
+    prepare_index as prepare_repository_index,
+)
+from app.indexing.bulk_export import export_bulk_csv
 from app.indexing.file_indexer import index_file
 from app.indexing.ast_parser import parse_python_ast
 from app.indexing.entity_extractor import extract_entities
+from app.indexing.parse_cache import get_parse_cache
+from app.indexing.path_policy import PathPolicy
+from app.indexing.repo_spec import RepoSpec
+from app.graph.index_state import list_repositories
+from app.indexing import watcher
 
-mcp = FastMCP(name="Indexer Agent")
+@asynccontextmanager
+async def lifespan(server):
+    # Create constraints/indexes before the first write (idempotent)
+    await get_backend().ensure_schema()
+    yield
+    await watcher.stop_watching()
+    # Saves the in-memory graph's snapshot (GRAPH_BACKEND=memory)
+    await get_backend().close()
+
+mcp = FastMCP(name="Indexer Agent", lifespan=lifespan)
+
+# Which replica served a call: replicas behind one service name share
+# its URL, so the caller cannot tell them apart by endpoint
+REPLICA = f"{socket.gethostname()}:{os.getpid()}"
+
+@mcp.tool
+async def index_repo(
+    incremental: bool = False,
+    include: list[str] | None = None,
+    exclude: list[str] | None = None,
+    max_file_bytes: int | None = None,
+    repo_url: str | None = None,
+    ref: str | None = None,
+    namespace: str | None = None,
+) -> dict:
+    """
+    Index a repository (default: the configured FastAPI repository). With
+    incremental=True only files added or modified since the last indexed
+    commit are reindexed, and deleted or renamed files are retracted.
+    include/exclude (glob patterns on repo-relative paths) and max_file_bytes
+    override the configured path policy for this run.
+    repo_url/ref (branch or tag) select another repository; its nodes are
+    kept apart under `namespace` (default: the repository name, e.g. starlette).
+    """
+    policy = PathPolicy.from_settings(include, exclude, max_file_bytes)
+    return await index_repository(incremental, policy, RepoSpec.from_settings(repo_url, ref, namespace))
+
+# ---------------------------------------------------------
+# Sharded indexing: the gateway calls prepare_index on one
+# replica, fans index_files out across replicas and closes
+# the run with finalize_index.
+# ---------------------------------------------------------
+@mcp.tool
+async def prepare_index(
+    incremental: bool = False,
+    include: list[str] | None = None,
+    exclude: list[str] | None = None,
+    max_file_bytes: int | None = None,
+    repo_url: str | None = None,
+    ref: str | None = None,
+    namespace: str | None = None,
+) -> dict:
+    """
+    Update the clone and plan an index run: returns the files to index,
+    the commit and the generation to pass to index_files and finalize_index,
+    together with the same repo_url/ref/namespace. `graph_backend` tells the
+    caller whether the graph can be shared by several replicas (neo4j) or not.
+    """
+    policy = PathPolicy.from_settings(include, exclude, max_file_bytes)
+    plan = await prepare_repository_index(incremental, policy, RepoSpec.from_settings(repo_url, ref, namespace))
+    return {**plan, "graph_backend": settings.GRAPH_BACKEND}
+
+@mcp.tool
+async def index_files(
+    paths: list[str],
+    generation: int,
+    commit: str | None = None,
+    repo_url: str | None = None,
+    ref: str | None = None,
+    namespace: str | None = None,
+) -> dict:
+    """Index one shard of files prepared by prepare_index; `replica` names the replica that ran it."""
+    spec = RepoSpec.from_settings(repo_url, ref, namespace)
+    return {**await index_repository_files(paths, generation, commit, spec), "replica": REPLICA}
 
 @mcp.tool
-async def index_repo() -> dict:
-    """Index the full FastAPI repository."""
-    return await index_repository()
+async def finalize_index(
+    commit: str,
+    generation: int,
+    indexed: list[str],
+    failed_files: int = 0,
+    incremental: bool = False,
+    repo_url: str | None = None,
+    ref: str | None = None,
+    namespace: str | None = None,
+) -> dict:
+    """Sweep stale entities and record the indexed commit once all shards are done."""
+    spec = RepoSpec.from_settings(repo_url, ref, namespace)
+    return await finalize_repository_index(commit, generation, indexed, failed_files, incremental, spec)
 
 @mcp.tool
-async def index_single_file(path: str) -> dict:
-    """Index a given Python file."""
-    return await index_file(path)
+async def export_bulk(
+    output_dir: str,
+    update: bool = True,
+    repo_url: str | None = None,
+    ref: str | None = None,
+    namespace: str | None = None,
+) -> dict:
+    """
+    Write deduplicated node/relationship CSVs for `neo4j-admin database import`.
+    Use for cold full rebuilds; index_repo stays the path for incremental updates.
+    A full import replaces the database, so it loads this one namespace only.
+    """
+    spec = RepoSpec.from_settings(repo_url, ref, namespace)
+    return await export_bulk_csv(output_dir, update, spec=spec)
+
+@mcp.tool
+async def index_single_file(path: str, namespace: str | None = None) -> dict:
+    """Index a given Python file of an already cloned repository."""
+    return await index_file(path, spec=RepoSpec.from_settings(namespace=namespace))
 
 @mcp.tool
 async def parse_ast(path: str) -> dict:
@@ -25,16 +139,54 @@ async def parse_ast(path: str) -> dict:
     return {"nodes": len(list(ast.walk(tree)))}
 
 @mcp.tool
-async def extract_code_entities(path: str) -> dict:
+async def extract_code_entities(path: str, namespace: str | None = None) -> dict:
     """Extract entities and push to Neo4j."""
     tree = await parse_python_ast(path)
-    await extract_entities(tree, path)
-    return {"status": "ok", "file": path}
+    result = await extract_entities(tree, path, RepoSpec.from_settings(namespace=namespace))
+    return {**result, "status": "ok"}
 
 @mcp.tool
 async def index_status() -> dict:
-    """Indexer health/status."""
-    return {"ready": True, "service": "indexer-agent"}
+    """
+    Indexer health/status, including parse cache size. Lookups happen in
+    the parse workers: hits and misses are in each index run's result
+    (cache_hits, cache_misses).
+    """
+    cache = get_parse_cache()
+    return {
+        "ready": True,
+        "service": "indexer-agent",
+        "graph_backend": settings.GRAPH_BACKEND,
+        "schema_ready": await get_backend().ensure_schema(),
+        "parse_cache": cache.stats() if cache else None,
+        "repositories": await list_repositories(),
+    }
+
+# ---------------------------------------------------------
+# Watch mode: reindex files as they change in REPO_DIR
+# ---------------------------------------------------------
+@mcp.tool
+async def start_watch(
+    debounce_ms: int | None = None, backend: str | None = None, namespace: str | None = None
+) -> dict:
+    """
+    Watch the clone of a namespace (default: REPO_DIR) and reindex changed
+    *.py files continuously. Bursts of changes are debounced (debounce_ms,
+    default WATCH_DEBOUNCE_MS) and deleted files are retracted.
+    backend: "auto", "inotify" or "poll".
+    """
+    spec = RepoSpec.from_settings(namespace=namespace)
+    return await watcher.start_watching(debounce_ms, backend, spec=spec)
+
+@mcp.tool
+async def stop_watch(namespace: str | None = None) -> dict:
+    """Stop watch mode for one namespace, or for all of them."""
+    return await watcher.stop_watching(namespace)
+
+@mcp.tool
+async def watch_status() -> dict:
+    """Watch mode state per namespace: backend, pending files, flush counters and recent errors."""
+    return watcher.watch_status()
 
 if __name__ == "__main__":
     transport = os.environ.get("MCP_TRANSPORT", "stdio")
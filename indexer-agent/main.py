@@ -0,0 +1,29 @@
+# apps/indexer-agent/main.py
+"""Command-line entry point for offline indexer tasks."""
+import argparse
+import asyncio
+import json
+from app.indexing.bulk_export import export_bulk_csv
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Indexer agent CLI")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    bulk = commands.add_parser(
+        "bulk-export",
+        help="Write neo4j-admin import CSVs for a cold full-repository load",
+    )
+    bulk.add_argument("--out", required=True, help="Directory for the CSV files")
+    bulk.add_argument(
+        "--no-update", action="store_true", help="Export the current clone without pulling"
+    )
+
+    args = parser.parse_args()
+    if args.command == "bulk-export":
+        result = asyncio.run(export_bulk_csv(args.out, update=not args.no_update))
+        print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
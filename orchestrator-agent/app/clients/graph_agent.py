@@ -20,6 +20,15 @@ async def find_entity(name: str) -> dict:
     )
 
 
+async def find_entities(names: list[str]) -> dict:
+    """Find several entities in one call: {"results": {name: find_entity result}}."""
+    return await call_mcp_tool(
+        agent_path=GRAPH_AGENT_PATH,
+        tool="find_entities",
+        payload={"names": names},
+    )
+
+
 async def get_dependencies(name: str) -> dict:
     """Find what an entity depends on (CALL graph)."""
     return await call_mcp_tool(
@@ -38,6 +47,24 @@ async def get_dependents(name: str) -> dict:
     )
 
 
+async def get_dependencies_many(names: list[str]) -> dict:
+    """What each of several entities depends on, in one call."""
+    return await call_mcp_tool(
+        agent_path=GRAPH_AGENT_PATH,
+        tool="get_dependencies_many",
+        payload={"names": names},
+    )
+
+
+async def get_dependents_many(names: list[str]) -> dict:
+    """Who depends on each of several entities, in one call."""
+    return await call_mcp_tool(
+        agent_path=GRAPH_AGENT_PATH,
+        tool="get_dependents_many",
+        payload={"names": names},
+    )
+
+
 async def trace_imports(path: str) -> dict:
     """Follow IMPORTS chain for a module/file."""
     return await call_mcp_tool(
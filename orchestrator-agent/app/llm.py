@@ -68,7 +68,7 @@ Given a natural language query about code, extract:
   - "get_dependents": what depends on / uses / calls X
   - "find_related": find entities related by a relationship (specify relationship)
   - "general_query": broad question requiring LLM synthesis (no graph query needed)
-- "relationship": if query_type is "find_related", one of: CONTAINS, IMPORTS, CALLS, INHERITS_FROM, DECORATED_BY (or null)
+- "relationship": if query_type is "find_related", one of: CONTAINS, IMPORTS, CALLS, INHERITS_FROM, DECORATED_BY, HAS_PARAMETER (or null)
 
 Examples:
 - "Find the FastAPI class" → {"entity_name": "FastAPI", "secondary_entity": null, "query_type": "find_entity", "relationship": null}
@@ -136,8 +136,8 @@ async def synthesize_response(query: str, agent_outputs: Dict[str, Any]) -> str:
         if isinstance(result, dict) and "results" in result and len(result.get("results", [])) > 0:
             return result  # Return raw results for simple lookups
     
-    # Format agent outputs for the prompt
-    formatted_outputs = json.dumps(agent_outputs, indent=2, default=str)
+    # Format agent outputs for the prompt (compact: indentation only costs tokens)
+    formatted_outputs = json.dumps(agent_outputs, separators=(",", ":"), default=str)
     
     # Determine if we should rely on LLM knowledge
     needs_llm_knowledge = not has_real_data
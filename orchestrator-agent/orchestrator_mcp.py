@@ -13,6 +13,7 @@ from app.llm import extract_entities
 
 from app.clients.graph_agent import (
     find_entity, 
+    find_entities,
     query_graph, 
     get_dependencies, 
     get_dependents, 
@@ -172,13 +173,17 @@ async def synthesize_response(
             if query_type == "general_query":
                 # For general queries, skip graph query - let LLM synthesize from knowledge
                 agent_outputs["graph_query"] = {"info": "General query - no specific entity to look up"}
+            elif query_type == "find_entity" and entity_name and secondary_entity:
+                # Comparing two entities: look both up in one call
+                batch = await find_entities([entity_name, secondary_entity])
+                if "results" in batch:
+                    agent_outputs["graph_query"] = batch["results"][entity_name]
+                    agent_outputs["graph_query_secondary"] = batch["results"][secondary_entity]
+                else:
+                    agent_outputs["graph_query"] = batch
             elif query_type == "find_entity" and entity_name:
                 # Look up specific entity
                 agent_outputs["graph_query"] = await find_entity(entity_name)
-                # If comparing two entities, look up the second one too
-                if secondary_entity:
-                    second_result = await find_entity(secondary_entity)
-                    agent_outputs["graph_query_secondary"] = second_result
             elif query_type == "get_dependencies" and entity_name:
                 # Find what entity depends on
                 agent_outputs["graph_query"] = await get_dependencies(entity_name)
@@ -0,0 +1,68 @@
+# tests/graph_query_agent/conftest.py
+import pickle
+import sys
+from array import array
+from pathlib import Path
+
+import pytest
+
+# Every agent ships its own top-level `app` package: make this
+# directory's tests import the graph-query agent's
+AGENT_DIR = str(Path(__file__).resolve().parents[2] / "graph-query-agent")
+for name in [m for m in sys.modules if m == "app" or m.startswith("app.")]:
+    del sys.modules[name]
+sys.path.insert(0, AGENT_DIR)
+
+# Bound now: the other agents' conftests replace `app` in sys.modules
+from app.config import settings  # noqa: E402
+from app.graph import backend, cache  # noqa: E402
+
+
+class Snapshot:
+    """Builds a memory-graph snapshot in the format the indexer saves."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.labels, self.props, self.ids, self.names = [], [], {}, {}
+        self.repo_nodes, self.out, self.inc, self.rel_props = {}, {}, {}, {}
+
+    def node(self, label: str, key: dict, *labels: str, repo: str = "demo", **props) -> int:
+        node, node_key = len(self.props), (repo, label, *sorted(key.items()))
+        self.ids[node_key] = node
+        self.labels.append({label, *labels})
+        self.props.append({"repo": repo, **key, **props, "_key": node_key})
+        self.repo_nodes.setdefault(repo, set()).add(node)
+        for value in {props.get("name"), key.get("qname")} - {None}:
+            self.names.setdefault(value, array("q")).append(node)
+        return node
+
+    def entity(self, label: str, qname: str, **props) -> int:
+        return self.node("Entity", {"qname": qname}, label, name=qname.rpartition(".")[2], **props)
+
+    def edge(self, a: int, rel: str, b: int):
+        self.out.setdefault(rel, {}).setdefault(a, array("q")).append(b)
+        self.inc.setdefault(rel, {}).setdefault(b, array("q")).append(a)
+        self.rel_props[(a, rel, b)] = {}
+
+    def save(self) -> str:
+        state = {"version": 1, **{name: getattr(self, name) for name in (
+            "labels", "props", "ids", "names", "repo_nodes", "out", "inc", "rel_props",
+        )}}
+        self.path.write_bytes(pickle.dumps(state))
+        return str(self.path)
+
+
+@pytest.fixture
+def snapshot(tmp_path) -> Snapshot:
+    return Snapshot(tmp_path / "graph.pkl")
+
+
+@pytest.fixture
+def memory_graph(snapshot, monkeypatch):
+    """get_backend() reads `snapshot` on the memory backend; the result cache is off."""
+    monkeypatch.setattr(settings, "GRAPH_BACKEND", "memory")
+    monkeypatch.setattr(settings, "GRAPH_SNAPSHOT", str(snapshot.path))
+    monkeypatch.setattr(settings, "QUERY_CACHE_SIZE", 0)
+    monkeypatch.setattr(backend, "_backend", None)
+    monkeypatch.setattr(cache, "_cache", None)
+    return backend.get_backend
@@ -0,0 +1,75 @@
+# tests/graph_query_agent/test_batch_lookups.py
+import pytest
+
+from app.config import settings
+from app.graph import backend, cache
+from app.graph.query import (
+    find_entity_node, find_entity_nodes, get_dependencies_for, get_dependencies_many_for,
+    get_dependents_for, get_dependents_many_for,
+)
+
+
+@pytest.fixture
+def graph(snapshot, memory_graph):
+    # m.f calls g twice over (m.g and n.g); A.f is another `f`
+    f, g, other_g = (snapshot.entity("Function", q, file="/repo/m.py") for q in ("m.f", "m.g", "n.g"))
+    method = snapshot.entity("Method", "m.A.f", file="/repo/m.py")
+    for callee in (g, other_g):
+        snapshot.edge(f, "CALLS", callee)
+    snapshot.edge(method, "CALLS", g)
+    snapshot.save()
+    return memory_graph()
+
+
+async def test_batch_results_match_single_lookups(graph):
+    names = ["f", "g", "missing", "f"]
+    found = (await find_entity_nodes(names, limit=5))["results"]
+    # One entry per distinct name, as the single lookup returns it
+    assert list(found) == ["f", "g", "missing"]
+    for name in found:
+        assert found[name] == await find_entity_node(name, limit=5)
+    assert sorted(row["n"]["qname"] for row in found["f"]["results"]) == ["m.A.f", "m.f"]
+    assert found["missing"] == {"results": [], "next_cursor": None}
+
+    dependencies = (await get_dependencies_many_for(["f", "g"], projection="full"))["results"]
+    assert dependencies == {name: await get_dependencies_for(name, projection="full") for name in ("f", "g")}
+    # Only the function m.f: the method A.f is not a Function
+    assert sorted(row["dep"]["qname"] for row in dependencies["f"]["results"]) == ["m.g", "n.g"]
+
+    dependents = (await get_dependents_many_for(["g"]))["results"]
+    assert dependents == {"g": await get_dependents_for("g")}
+    # One row per relationship: m.f calls both g's
+    assert sorted(row["caller"]["qname"] for row in dependents["g"]["results"]) == ["m.A.f", "m.f", "m.f"]
+
+
+async def test_batch_size_and_page_caps(graph, monkeypatch):
+    monkeypatch.setattr(settings, "QUERY_MAX_BATCH", 2)
+    with pytest.raises(ValueError, match="At most 2 names"):
+        await find_entity_nodes(["f", "g", "h"])
+    # Repeated names count once
+    assert list((await find_entity_nodes(["f", "g", "f", "g"]))["results"]) == ["f", "g"]
+    assert await find_entity_nodes([]) == {"results": {}}
+
+    # At most `limit` rows per name; the cursor continues the single lookup
+    first = (await find_entity_nodes(["f"], limit=1))["results"]["f"]
+    assert len(first["results"]) == 1 and first["next_cursor"]
+    rest = await find_entity_node("f", limit=1, cursor=first["next_cursor"])
+    assert {row["n"]["qname"] for row in first["results"] + rest["results"]} == {"m.A.f", "m.f"}
+    assert rest["next_cursor"] is None
+
+
+async def test_cached_names_are_not_looked_up_again(graph, monkeypatch):
+    monkeypatch.setattr(settings, "QUERY_CACHE_SIZE", 16)
+    looked_up = []
+    find_by_names = backend.MemoryBackend.find_by_names
+
+    async def record(self, names, *args, **kwargs):
+        looked_up.append(names)
+        return await find_by_names(self, names, *args, **kwargs)
+
+    monkeypatch.setattr(backend.MemoryBackend, "find_by_names", record)
+    await find_entity_node("f")
+    await find_entity_nodes(["f", "g"])
+    await find_entity_nodes(["g", "f"])
+    assert looked_up == [["g"]]
+    assert (await cache.get_query_cache().stats())["hits"] == 3
@@ -0,0 +1,111 @@
+# tests/graph_query_agent/test_cache.py
+from types import SimpleNamespace
+
+import pytest
+
+from app.graph import cache
+from app.graph.cache import DiskTier, QueryCache
+
+
+class Graph:
+    """Stands in for the backend: index markers set by the test."""
+
+    def __init__(self):
+        self.markers = {"demo": 1}
+
+    async def index_markers(self):
+        return dict(self.markers)
+
+
+class Query:
+    """A lookup that counts its runs and returns the run number."""
+
+    def __init__(self):
+        self.runs = 0
+
+    async def __call__(self):
+        self.runs += 1
+        return {"run": self.runs}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(cache, "time", SimpleNamespace(monotonic=lambda: clock.now, time=lambda: clock.now))
+    return clock
+
+
+@pytest.fixture
+def graph(monkeypatch):
+    graph = Graph()
+    monkeypatch.setattr(cache, "get_backend", lambda: graph)
+    return graph
+
+
+async def test_entries_expire_after_the_ttl(clock, graph):
+    results = QueryCache(size=8, ttl=10, check_interval=0)
+    query = Query()
+    assert await results.get("a", query) == await results.get("a", query) == {"run": 1}
+    clock.now += 11
+    assert await results.get("a", query) == {"run": 2}
+    stats = await results.stats()
+    assert (stats["hits"], stats["misses"], stats["invalidations"]) == (1, 2, 0)
+
+
+async def test_least_recently_used_entry_is_dropped(clock, graph):
+    results = QueryCache(size=2, ttl=60, check_interval=0)
+    queries = {key: Query() for key in "abc"}
+    for key in "aba":
+        await results.get(key, queries[key])
+    await results.get("c", queries["c"])
+    assert list(results.entries) == ["a", "c"]
+    await results.get("b", queries["b"])
+    assert queries["b"].runs == 2 and queries["a"].runs == 1
+
+
+async def test_index_marker_change_drops_entries(clock, graph):
+    results = QueryCache(size=8, ttl=60, check_interval=2)
+    query = Query()
+    await results.get("a", query)
+    graph.markers["demo"] = 2
+    # Markers are read at most every check_interval seconds
+    assert await results.get("a", query) == {"run": 1}
+    clock.now += 2
+    assert await results.get("a", query) == {"run": 2}
+    graph.markers["other"] = 1
+    clock.now += 2
+    assert await results.get("a", query) == {"run": 3}
+    stats = await results.stats()
+    assert (stats["invalidations"], stats["index_markers"]) == (2, {"demo": 2, "other": 1})
+
+
+async def test_results_computed_across_a_write_are_not_kept(clock, graph):
+    results = QueryCache(size=8, ttl=60, check_interval=0)
+
+    async def slow():
+        # The indexer writes, and another lookup notices, while this one runs
+        graph.markers["demo"] = 2
+        await results.get("b", Query())
+        return "stale"
+
+    assert await results.get("a", slow) == "stale"
+    assert list(results.entries) == ["b"]
+
+
+async def test_disk_tier_is_shared_and_follows_the_markers(tmp_path, clock, graph):
+    def replica():
+        return QueryCache(size=8, ttl=60, check_interval=0, disk=DiskTier(str(tmp_path), 10**6, ttl=60))
+
+    first, second = replica(), replica()
+    query = Query()
+    await first.get("a", query)
+    assert await second.get("a", query) == {"run": 1}
+    assert (await second.stats())["disk_hits"] == 1
+
+    graph.markers["demo"] = 2
+    assert await second.get("a", query) == {"run": 2}
+    # Entries computed under the old markers are deleted
+    assert (await second.stats())["disk"]["entries"] == 1
+
+    clock.now += 61
+    assert await replica().get("a", query) == {"run": 3}
@@ -0,0 +1,74 @@
+# tests/graph_query_agent/test_cypher_guard.py
+import pytest
+
+from app.config import settings
+from app.graph.cypher_guard import plan_error, read_only_error
+
+
+@pytest.fixture(autouse=True)
+def limits(monkeypatch):
+    monkeypatch.setattr(settings, "CYPHER_MAX_HOPS", 10)
+    monkeypatch.setattr(settings, "CYPHER_MAX_ESTIMATED_ROWS", 1000)
+
+
+@pytest.mark.parametrize("query", [
+    "MATCH (a)-[:CALLS]->(b) RETURN a.name AS start, b.name AS end",
+    "MATCH (n:Function) WITH n AS stop RETURN stop.name",
+    "MATCH (n) WHERE n.set = 'CREATE (m)' RETURN n.name // DELETE n",
+    "MATCH (n {create: 1}) RETURN count(n) * 2, (n.start) + 1",
+    "MATCH (a)-[:CALLS*1..3]->(b) RETURN b",
+    "MATCH (a)-[:CALLS]->{1,3}(b) RETURN b",
+    "MATCH ((a)-[:CALLS]->(b)){2,10} RETURN b",
+    "MATCH ((a)-[:CALLS]->(b)){4} RETURN b",
+    "CALL db.labels()",
+    "MATCH (n) CALL (n) { MATCH (n)-->(m) RETURN m } RETURN m",
+])
+def test_read_only_queries_pass(query):
+    assert read_only_error(query) is None
+
+
+@pytest.mark.parametrize("query, found", [
+    ("MATCH (n) SET n.x = 1", "SET"),
+    ("MATCH (n) DETACH DELETE n", "DELETE, DETACH"),
+    ("UNWIND [1] AS x MERGE (n {x: x})", "MERGE"),
+    ("STOP DATABASE neo4j", "STOP DATABASE"),
+    ("SHOW TRANSACTIONS YIELD transactionId AS id TERMINATE TRANSACTIONS id", "TERMINATE TRANSACTIONS"),
+])
+def test_writes_are_blocked(query, found):
+    assert f"(found {found})" in read_only_error(query)
+
+
+@pytest.mark.parametrize("query", [
+    "MATCH (a)-[:CALLS*]->(b) RETURN b",
+    "MATCH (a)-[:CALLS*2..]->(b) RETURN b",
+    "MATCH (a)-[:CALLS*1..11]->(b) RETURN b",
+    "MATCH ((a)-[:CALLS]->(b))+ RETURN b",
+    "MATCH ((a)-[:CALLS]->(b)) * RETURN b",
+    "MATCH ((a)-[:CALLS]->(b)){1,} RETURN b",
+    "MATCH ((a)-[:CALLS]->(b)){2,50} RETURN b",
+    "MATCH ((a)-[:CALLS]->(b)){,11} RETURN b",
+    "MATCH (a)-[:CALLS]->{1,}(b) RETURN b",
+    "MATCH (a)-[:CALLS]-+(b) RETURN b",
+    "MATCH (a)-->{20}(b) RETURN b",
+])
+def test_unbounded_expansions_are_blocked(query):
+    assert "10" in read_only_error(query)
+
+
+def test_other_checks():
+    assert read_only_error("// nothing") == "Empty query."
+    assert "EXPLAIN" in read_only_error("PROFILE MATCH (n) RETURN n")
+    assert "apoc.periodic.iterate" in read_only_error("CALL apoc.periodic.iterate('a', 'b', {})")
+    assert "IN TRANSACTIONS" in read_only_error("CALL { MATCH (n) RETURN n } IN TRANSACTIONS RETURN n")
+
+
+def test_plan_error():
+    scan = {"operatorType": "NodeByLabelScan@neo4j", "args": {"EstimatedRows": 500.0}}
+    assert plan_error(None) is None
+    assert plan_error({"operatorType": "ProduceResults@neo4j", "children": [scan]}) is None
+    product = {"operatorType": "CartesianProduct@neo4j", "children": [scan, scan]}
+    assert "cartesian product" in plan_error({"operatorType": "ProduceResults", "children": [product]})
+    scan["args"]["EstimatedRows"] = 5000.0
+    assert plan_error({"operatorType": "ProduceResults", "children": [scan]}) == (
+        "Query plan estimates 5000 rows at NodeByLabelScan (limit 1000); narrow the MATCH."
+    )
@@ -0,0 +1,30 @@
+# tests/graph_query_agent/test_memory_backend.py
+import asyncio
+import os
+import threading
+
+from app.graph import backend
+
+
+async def test_reloads_a_changed_snapshot_off_the_loop(snapshot, memory_graph, monkeypatch):
+    snapshot.entity("Function", "m.f", file="/repo/m.py")
+    snapshot.save()
+    loads = []
+    read = backend.MemoryBackend._read_snapshot
+
+    def read_snapshot(self):
+        loads.append(threading.current_thread() is threading.main_thread())
+        return read(self)
+
+    monkeypatch.setattr(backend.MemoryBackend, "_read_snapshot", read_snapshot)
+    graph = memory_graph()
+    assert [n["qname"] for n in await graph.find_by_name("f")] == ["m.f"]
+    assert [n["qname"] for n in await graph.find_by_name("f")] == ["m.f"]
+
+    snapshot.entity("Method", "m.A.f", file="/repo/m.py")
+    mtime = os.stat(snapshot.save()).st_mtime_ns + 10**9
+    os.utime(snapshot.path, ns=(mtime, mtime))
+    # Concurrent reads share one reload
+    found = await asyncio.gather(*(graph.find_by_name("f") for _ in range(3)))
+    assert all(sorted(n["qname"] for n in rows) == ["m.A.f", "m.f"] for rows in found)
+    assert loads == [False, False]
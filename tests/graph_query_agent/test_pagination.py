@@ -0,0 +1,78 @@
+# tests/graph_query_agent/test_pagination.py
+import base64
+import json
+
+import pytest
+
+from app.config import settings
+from app.graph.pagination import Page
+from app.graph.query import find_entity_node
+
+QUERY = ("find_entity", "f", None, "minimal")
+
+
+@pytest.fixture(autouse=True)
+def limits(monkeypatch):
+    monkeypatch.setattr(settings, "QUERY_DEFAULT_LIMIT", 2)
+    monkeypatch.setattr(settings, "QUERY_MAX_LIMIT", 3)
+
+
+def cursor_of(state: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps(state).encode()).decode()
+
+
+def test_limit_defaults_and_cap():
+    assert Page.start(None, None, *QUERY).limit == 2
+    assert Page.start(None, 50, *QUERY).limit == 3
+    with pytest.raises(ValueError, match="at least 1"):
+        Page.start(None, 0, *QUERY)
+
+
+def test_cursor_round_trip():
+    first = Page.start(None, 2, *QUERY)
+    assert first.offset == 0
+    # The look-ahead row says whether another page follows
+    assert first.result(["a", "b"]) == {"results": ["a", "b"], "next_cursor": None}
+    cursor = first.result(["a", "b", "c"])["next_cursor"]
+
+    second = Page.start(cursor, 2, *QUERY)
+    assert (second.offset, second.fingerprint) == (2, first.fingerprint)
+    assert second.key == f"{first.fingerprint}:2:2"
+    # The fingerprint leaves the limit out: the page size may change between pages
+    assert Page.start(cursor, 3, *QUERY).offset == 2
+
+
+@pytest.mark.parametrize("query", [
+    ("find_entity", "g", None, "minimal"),
+    ("find_entity", "f", "demo", "minimal"),
+    ("find_entity", "f", None, "full"),
+    ("get_dependents", "f", None, "minimal"),
+])
+def test_cursors_of_other_queries_are_rejected(query):
+    cursor = Page.start(None, 2, *QUERY).next_cursor(3)
+    with pytest.raises(ValueError, match="does not belong to this query"):
+        Page.start(cursor, 2, *query)
+
+
+def test_malformed_cursors_are_rejected():
+    fingerprint = Page.start(None, 2, *QUERY).fingerprint
+    for cursor in ("not a cursor", cursor_of({"o": 2}), cursor_of({"o": "two", "q": fingerprint})):
+        with pytest.raises(ValueError, match="Invalid cursor"):
+            Page.start(cursor, 2, *QUERY)
+    with pytest.raises(ValueError, match="does not belong"):
+        Page.start(cursor_of({"o": -2, "q": fingerprint}), 2, *QUERY)
+
+
+async def test_cursors_walk_every_row_once(snapshot, memory_graph):
+    for i in range(5):
+        snapshot.entity("Function", f"m{i}.f", file=f"/repo/m{i}.py")
+    snapshot.save()
+
+    found, cursor, pages = [], None, 0
+    while True:
+        page = await find_entity_node("f", limit=2, cursor=cursor)
+        found += [row["n"]["qname"] for row in page["results"]]
+        pages += 1
+        if not (cursor := page["next_cursor"]):
+            break
+    assert (pages, sorted(found)) == (3, [f"m{i}.f" for i in range(5)])
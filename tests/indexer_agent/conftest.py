@@ -0,0 +1,10 @@
+# tests/indexer_agent/conftest.py
+import sys
+from pathlib import Path
+
+# Every agent ships its own top-level `app` package: make this
+# directory's tests import the indexer's
+AGENT_DIR = str(Path(__file__).resolve().parents[2] / "indexer-agent")
+for name in [m for m in sys.modules if m == "app" or m.startswith("app.")]:
+    del sys.modules[name]
+sys.path.insert(0, AGENT_DIR)
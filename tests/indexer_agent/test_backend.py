@@ -0,0 +1,116 @@
+# tests/indexer_agent/test_backend.py
+import os
+import uuid
+
+import pytest
+
+from app.config import settings
+from app.graph import backend, index_state, sweep, writer
+from app.indexing.ir import ClassRec, FileRec, FuncRec, ParamRec, edge
+
+# Every test runs on each backend with the same expectations. Neo4j runs
+# only with TEST_NEO4J=1, against NEO4J_URI; tests write to a throwaway
+# namespace and delete it afterwards.
+BACKENDS = [
+    "memory",
+    pytest.param("neo4j", marks=pytest.mark.skipif(
+        not os.environ.get("TEST_NEO4J"), reason="set TEST_NEO4J=1 to run against NEO4J_URI",
+    )),
+]
+
+
+@pytest.fixture(params=BACKENDS)
+async def repo(request, monkeypatch):
+    monkeypatch.setattr(settings, "GRAPH_BACKEND", request.param)
+    monkeypatch.setattr(settings, "GRAPH_SNAPSHOT", "")
+    monkeypatch.setattr(settings, "PARAMETER_MODE", "node")
+    monkeypatch.setattr(backend, "_backend", None)
+    namespace = f"parity-{uuid.uuid4().hex[:8]}"
+    assert await backend.get_backend().ensure_schema()
+    yield namespace
+    if request.param == "neo4j":
+        from app.graph.driver import run_query
+        await run_query("MATCH (n {repo:$repo}) DETACH DELETE n", {"repo": namespace})
+
+
+def module_a(helper: bool = True) -> FileRec:
+    run = FuncRec(
+        "run", "m.A.run", True, 2, 4,
+        params=(ParamRec("self", 0, "positional_or_keyword"),),
+        decorators=("staticmethod",) if helper else (),
+    )
+    functions = (run, FuncRec("helper", "m.helper", False, 6, 7)) if helper else (run,)
+    edges = [edge("INHERITS_FROM", "m.A", "Base")]
+    if helper:
+        edges += [edge("CALLS", "m.A.run", "m.helper"), edge("CALLS", "m.A.run", "ext.call")]
+    return FileRec(
+        "/repo/m.py", "hash-a" if helper else "hash-a2", imports=("os",),
+        classes=(ClassRec("A", "m.A", 1, 5, "Shared docstring"),), functions=functions, edges=tuple(edges),
+    )
+
+
+MODULE_B = FileRec("/repo/n.py", "hash-b", functions=(FuncRec("b", "n.b", False, 1, 2, docstring="Shared docstring"),))
+
+
+async def test_index_state(repo):
+    assert await index_state.get_indexed_commit(repo) is None
+    assert [await index_state.next_generation(repo) for _ in range(2)] == [1, 2]
+    assert await index_state.bump_index_marker(repo) == 1
+
+    await index_state.set_indexed_commit(repo, "abc", "https://example.com/demo.git", "main")
+    await index_state.set_indexed_commit(repo, "def", None, "main")
+    assert await index_state.get_indexed_commit(repo) == "def"
+    row = next(r for r in await index_state.list_repositories() if r["repo"] == repo)
+    assert (row["url"], row["ref"], row["commit"]) == ("https://example.com/demo.git", "main", "def")
+    assert row["indexed_at"]
+
+
+async def test_write_sweep_and_retract(repo):
+    await writer.write_entities([module_a(), MODULE_B], 1, repo)
+    assert await index_state.get_file_hashes(repo) == {"/repo/m.py": "hash-a", "/repo/n.py": "hash-b"}
+
+    # m.py loses helper(), its calls and the decorator: the helper node, then the
+    # stale DECORATED_BY and the CALLS/DEPENDS_ON edges to ext.call go
+    await writer.write_entities([module_a(helper=False)], 2, repo)
+    assert await sweep.sweep_files(["/repo/m.py"], 2, repo) == {"scope": "files", "nodes": 1, "relationships": 3}
+    # Left without references: the decorator and the ext.call placeholder
+    assert await sweep.sweep_orphans(repo) == 2
+    assert await index_state.get_file_hashes(repo) == {"/repo/m.py": "hash-a2", "/repo/n.py": "hash-b"}
+
+    # A full run that only writes n.py: everything of m.py is stale
+    await writer.write_entities([MODULE_B], 3, repo)
+    swept = await sweep.sweep_stale(3, repo)
+    assert (swept["scope"], swept["nodes"]) == ("graph", 6)
+    assert await index_state.get_file_hashes(repo) == {"/repo/n.py": "hash-b"}
+
+    assert await writer.retract_files(["/repo/n.py"], repo) == 1
+    assert await index_state.get_file_hashes(repo) == {}
+    # The docstring n.b shared with A, and the parameter node of A.run
+    assert await sweep.sweep_orphans(repo) == 2
+    assert await writer.retract_files([], repo) == 0
+
+
+async def test_batch_operations_need_their_source(repo):
+    batch = backend.get_backend().batch(1, repo)
+    batch.upsert_file("/repo/c.py", "hash-c")
+    # No c.missing entity: neither the call nor its ext.f placeholder is written
+    batch.add_edge("CALLS", "c.missing", "ext.f")
+    batch.add_decorator("c.missing", "cache")
+    batch.upsert_entity("Function", "c.f", "f", "/repo/c.py", 1, 2)
+    batch.add_edge("CALLS", "c.f", "ext.g")
+    await batch.commit()
+    # The decorator node is merged before its edge is skipped
+    assert await sweep.sweep_orphans(repo) == 1
+
+    await writer.write_entities([FileRec("/repo/c.py", "hash-c2")], 2, repo)
+    assert await sweep.sweep_files(["/repo/c.py"], 2, repo) == {"scope": "files", "nodes": 1, "relationships": 0}
+    # ext.g lost its only caller
+    assert await sweep.sweep_orphans(repo) == 1
+
+
+def test_memory_backend_refuses_replicas(monkeypatch):
+    monkeypatch.setattr(settings, "GRAPH_BACKEND", "memory")
+    monkeypatch.setattr(settings, "INDEXER_REPLICAS", 2)
+    monkeypatch.setattr(backend, "_backend", None)
+    with pytest.raises(ValueError, match="INDEXER_REPLICAS"):
+        backend.get_backend()
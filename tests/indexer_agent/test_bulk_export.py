@@ -0,0 +1,96 @@
+# tests/indexer_agent/test_bulk_export.py
+import csv
+from pathlib import Path
+
+import pytest
+
+from app.config import settings
+from app.indexing import bulk_export
+from app.indexing.bulk_export import ARRAY_DELIMITER
+from app.indexing.repo_spec import RepoSpec
+
+SOURCES = {
+    # Imported twice, called from b.py before a.py defines it
+    "a.py": "import os\n\ndef helper(mode: Literal['a;b'] = 'x;y'):\n    return os.sep\n",
+    "b.py": "import os\nfrom a import helper\n\nclass B(Base):\n    def run(self):\n        return helper()\n",
+}
+
+
+@pytest.fixture(autouse=True)
+def no_cache(monkeypatch):
+    monkeypatch.setattr(settings, "PARSE_CACHE_DIR", "")
+    monkeypatch.setattr(settings, "INDEX_WORKERS", 1)
+
+
+def export(tmp_path, names=("b.py", "a.py"), sources=SOURCES) -> tuple[dict, dict]:
+    src = tmp_path / "src"
+    src.mkdir(parents=True, exist_ok=True)
+    for name, text in sources.items():
+        (src / name).write_text(text)
+    spec = RepoSpec(namespace="demo", url="https://example.com/demo.git", ref="main", dir=str(src))
+    result = bulk_export._export_sync((str(src / n) for n in names), "c0", tmp_path / "out", spec)
+    tables = {}
+    for path in (tmp_path / "out").glob("*.csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            tables[path.stem] = list(csv.DictReader(f))
+    return result, tables
+
+
+def test_headers_ids_and_dedup(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "PARAMETER_MODE", "node")
+    result, tables = export(tmp_path)
+
+    assert (result["exported_files"], result["failed_files"]) == (2, 0)
+    with open(tmp_path / "out/nodes_Function.csv", newline="") as f:
+        assert next(csv.reader(f)) == ["id:ID", "repo", "qname", "name", "file", "start:int", "end:int", ":LABEL"]
+    # One Module/Import node per name, however many files import it
+    assert sorted(row["name"] for row in tables["nodes_Module"]) == ["a", "os"]
+    assert len(tables["rels_IMPORTS"]) == 3
+    # The call target defined later in the run is the definition, not a placeholder
+    (helper,) = tables["nodes_Function"]
+    assert (helper["qname"], helper["file"]) == ("a.helper", str(tmp_path / "src/a.py"))
+    assert helper[":LABEL"] == ARRAY_DELIMITER.join(["Function", "Entity"])
+    (call,) = tables["rels_CALLS"]
+    assert call[":END_ID"] == helper["id:ID"]
+    assert sorted(row["name"] for row in tables["nodes_Class"]) == ["B", "Base"]
+
+    # IDs only depend on the namespace and the MERGE key
+    _, again = export(tmp_path / "again", names=("a.py", "b.py"))
+    assert again["nodes_Function"][0]["id:ID"] == helper["id:ID"]
+    assert sorted(r["id:ID"] for r in again["nodes_Class"]) == sorted(r["id:ID"] for r in tables["nodes_Class"])
+
+
+def test_property_arrays_keep_semicolons(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "PARAMETER_MODE", "property")
+    _, tables = export(tmp_path)
+    (helper,) = tables["nodes_Function"]
+    assert helper["param_annotations:string[]"].split(ARRAY_DELIMITER) == ["Literal['a;b']"]
+    assert helper["param_defaults:string[]"].split(ARRAY_DELIMITER) == ["'x;y'"]
+    run = next(row for row in tables["nodes_Method"] if row["name"] == "run")
+    assert run["params:string[]"] == "self"
+
+
+def test_parse_failures_are_reported(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "PARAMETER_MODE", "node")
+    result, tables = export(tmp_path, names=("a.py", "bad.py", "b.py"), sources={**SOURCES, "bad.py": "def ("})
+    assert (result["exported_files"], result["failed_files"]) == (2, 1)
+    assert Path(result["failed"][0]["file"]).name == "bad.py"
+    assert len(tables["nodes_File"]) == 2
+    assert "--array-delimiter=U+001F" in result["import_command"]
+
+
+def test_parses_in_flight_are_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "PARAMETER_MODE", "node")
+    sources = {f"m{i}.py": f"def f{i}():\n    return {i}\n" for i in range(10)}
+    merged, ahead = [], []
+    add = bulk_export._GraphBuilder.add
+    monkeypatch.setattr(bulk_export._GraphBuilder, "add", lambda self, rec: merged.append(add(self, rec)))
+
+    def discover():
+        for i, name in enumerate(sources):
+            ahead.append(i - len(merged))
+            yield name
+
+    result, tables = export(tmp_path, names=discover(), sources=sources)
+    assert result["exported_files"] == len(tables["nodes_Function"]) == 10
+    assert max(ahead) == 2 * settings.INDEX_WORKERS
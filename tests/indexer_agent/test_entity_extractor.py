@@ -0,0 +1,90 @@
+# tests/indexer_agent/test_entity_extractor.py
+import ast
+from textwrap import dedent
+
+from app.indexing.entity_extractor import collect_entities
+
+
+def collect(source: str, path: str = "/repo/pkg/mod.py", module: str = "pkg.mod"):
+    return collect_entities(ast.parse(dedent(source)), path, "hash", module)
+
+
+def qnames(rec) -> dict[str, tuple[str, bool]]:
+    return {fn.qname: (fn.name, fn.is_method) for fn in rec.functions}
+
+
+def calls(rec) -> set[tuple[str, str]]:
+    return {(e.source, e.target) for e in rec.edges if e.kind == "CALLS"}
+
+
+def test_nested_classes_and_async_methods():
+    rec = collect("""
+        class Outer:
+            class Inner:
+                async def fetch(self):
+                    return await self.parse()
+
+                def parse(self):
+                    pass
+
+            async def run(self):
+                pass
+    """)
+    assert [c.qname for c in rec.classes] == ["pkg.mod.Outer", "pkg.mod.Outer.Inner"]
+    assert qnames(rec) == {
+        "pkg.mod.Outer.Inner.fetch": ("fetch", True),
+        "pkg.mod.Outer.Inner.parse": ("parse", True),
+        "pkg.mod.Outer.run": ("run", True),
+    }
+    assert calls(rec) == {("pkg.mod.Outer.Inner.fetch", "pkg.mod.Outer.Inner.parse")}
+
+
+def test_same_name_in_different_scopes():
+    rec = collect("""
+        def helper():
+            pass
+
+        def outer():
+            def helper():
+                pass
+            return helper()
+
+        class Service:
+            def helper(self):
+                return helper()
+
+        def caller():
+            return helper()
+    """)
+    assert qnames(rec) == {
+        "pkg.mod.helper": ("helper", False),
+        "pkg.mod.outer": ("outer", False),
+        "pkg.mod.outer.helper": ("helper", False),
+        "pkg.mod.Service.helper": ("helper", True),
+        "pkg.mod.caller": ("caller", False),
+    }
+    # The nested helper shadows the module one; class bodies do not enclose methods
+    assert calls(rec) == {
+        ("pkg.mod.outer", "pkg.mod.outer.helper"),
+        ("pkg.mod.Service.helper", "pkg.mod.helper"),
+        ("pkg.mod.caller", "pkg.mod.helper"),
+    }
+
+
+def test_imports_and_bases_resolve_to_qualified_names():
+    rec = collect("""
+        import os.path as osp
+        from .base import Base
+        from ..util import tool as t
+
+        class Child(Base, dict):
+            def run(self):
+                t()
+                osp.join("a", "b")
+                len([])
+    """, path="/repo/pkg/sub/__init__.py", module="pkg.sub")
+    assert rec.imports[0] == "os.path"
+    bases = {(e.source, e.target) for e in rec.edges if e.kind == "INHERITS_FROM"}
+    assert bases == {("pkg.sub.Child", "pkg.sub.base.Base"), ("pkg.sub.Child", "dict")}
+    # Builtin calls are skipped
+    assert calls(rec) == {("pkg.sub.Child.run", "pkg.util.tool"), ("pkg.sub.Child.run", "os.path.join")}
@@ -0,0 +1,68 @@
+# tests/indexer_agent/test_parse_cache.py
+from itertools import count
+from types import SimpleNamespace
+
+import pytest
+
+from app.config import settings
+from app.indexing import parse_cache, pipeline
+from app.indexing.pipeline import extract_file
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "PARSE_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(parse_cache, "_cache", None)
+
+
+def source(root, name: str = "pkg/mod.py", text: str = "def f(x):\n    return x\n") -> str:
+    path = root / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    return str(path)
+
+
+def test_hits_after_the_first_parse(tmp_path):
+    path = source(tmp_path / "repo")
+    rec, hit = extract_file(path, str(tmp_path / "repo"))
+    assert not hit and rec.functions[0].qname == "pkg.mod.f"
+
+    cached, hit = extract_file(path, str(tmp_path / "repo"))
+    assert hit and cached == rec
+
+    # Same content and module in another clone: reused under the new path
+    other = source(tmp_path / "clone")
+    moved, hit = extract_file(other, str(tmp_path / "clone"))
+    assert hit and moved.path == other and moved.functions == rec.functions
+
+
+def test_misses_when_content_module_or_extractor_change(tmp_path, monkeypatch):
+    root = str(tmp_path / "repo")
+    path = source(tmp_path / "repo")
+    extract_file(path, root)
+
+    source(tmp_path / "repo", text="def f(x):\n    return x + 1\n")
+    rec, hit = extract_file(path, root)
+    assert not hit and rec.functions[0].end == 2
+
+    # Identical content under another module name is parsed again
+    renamed, hit = extract_file(source(tmp_path / "repo", "pkg/other.py", "def f(x):\n    return x + 1\n"), root)
+    assert not hit and renamed.functions[0].qname == "pkg.other.f"
+
+    monkeypatch.setattr(pipeline, "EXTRACTOR_VERSION", pipeline.EXTRACTOR_VERSION + 1)
+    assert extract_file(path, root)[1] is False
+    assert extract_file(path, root)[1] is True
+    assert parse_cache.get_parse_cache().stats()["entries"] == 4
+
+
+def test_evicts_least_recently_used(tmp_path, monkeypatch):
+    clock = count()
+    monkeypatch.setattr(parse_cache, "time", SimpleNamespace(time=lambda: next(clock)))
+    cache = parse_cache.ParseCache(str(tmp_path / "lru"), max_bytes=10**6)
+    for key in ("a", "b", "c"):
+        cache.put(key, 1, "x" * 1000)
+    cache.get("a", 1)
+    cache.max_bytes = 2500
+    assert cache.evict() == 1
+    assert cache.get("b", 1) is None
+    assert cache.get("a", 1) == cache.get("c", 1) == "x" * 1000
@@ -0,0 +1,78 @@
+# tests/indexer_agent/test_pipeline.py
+import asyncio
+
+import pytest
+
+from app.config import settings
+from app.indexing import pipeline
+
+FILE_BYTES = 100
+
+
+@pytest.fixture(autouse=True)
+def small_pipeline(monkeypatch):
+    monkeypatch.setattr(settings, "PARSE_CACHE_DIR", "")
+    monkeypatch.setattr(settings, "INDEX_WORKERS", 1)
+    monkeypatch.setattr(settings, "INDEX_QUEUE_SIZE", 1)
+    monkeypatch.setattr(settings, "INDEX_WRITE_CONCURRENCY", 1)
+    monkeypatch.setattr(settings, "INDEX_MAX_INFLIGHT_BYTES", 2 * FILE_BYTES)
+
+
+class Writer:
+    """Stands in for write_entities: slow, and failing for the files in `fail`."""
+
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.written: list[str] = []
+
+    async def __call__(self, recs, generation, repo):
+        await asyncio.sleep(0.01)
+        for rec in recs:
+            if rec.path in self.fail:
+                raise RuntimeError("write failed")
+            self.written.append(rec.path)
+        return {"statements": 1, "rows": len(recs)}
+
+
+def source_file(path, body: str = "X = 1"):
+    path.write_text(body.ljust(FILE_BYTES - 1) + "\n")
+    return str(path)
+
+
+async def test_backpressure_bounds_discovery_and_bytes(tmp_path, monkeypatch):
+    writer = Writer()
+    monkeypatch.setattr(pipeline, "write_entities", writer)
+    paths = [source_file(tmp_path / f"m{i}.py") for i in range(12)]
+    ahead = []
+
+    def discover():
+        for path in paths:
+            # Files taken from discovery but not in the graph yet
+            ahead.append(paths.index(path) - len(writer.written))
+            yield path
+
+    result = await pipeline.run_pipeline(discover(), generation=3)
+
+    assert (result["indexed_files"], result["failed_files"]) == (12, 0)
+    assert sorted(writer.written) == sorted(paths)
+    assert result["peak_inflight_bytes"] <= settings.INDEX_MAX_INFLIGHT_BYTES
+    # Two files fit the byte budget, and one more waits for it
+    assert max(ahead) <= 3
+
+
+async def test_failed_files_do_not_stop_the_run(tmp_path, monkeypatch):
+    writer = Writer(fail={str(tmp_path / "unwritable.py")})
+    monkeypatch.setattr(pipeline, "write_entities", writer)
+    good = source_file(tmp_path / "good.py")
+    broken = source_file(tmp_path / "broken.py", "def (")
+    unwritable = source_file(tmp_path / "unwritable.py")
+    missing = str(tmp_path / "missing.py")
+    written = []
+
+    result = await pipeline.run_pipeline([broken, missing, unwritable, good], on_written=written.append)
+
+    assert written == writer.written == [good]
+    assert (result["indexed_files"], result["failed_files"]) == (1, 3)
+    assert sorted((f["file"], f["stage"]) for f in result["failed"]) == sorted(
+        [(broken, "parse"), (missing, "parse"), (unwritable, "write")]
+    )
@@ -0,0 +1,232 @@
+# tests/indexer_agent/test_repo_manager.py
+import sqlite3
+from pathlib import Path
+
+import pytest
+from git import Actor, Repo
+
+from app.config import settings
+from app.graph import backend
+from app.graph.index_state import get_file_hashes, get_indexed_commit
+from app.indexing import checkpoints, pipeline, repo_manager
+from app.indexing.path_policy import PathPolicy
+from app.indexing.repo_spec import RepoSpec
+
+AUTHOR = Actor("Test", "test@example.com")
+
+
+class Upstream:
+    """A working repository pushing to a local bare remote."""
+
+    def __init__(self, root: Path):
+        self.bare = root / "remote.git"
+        Repo.init(self.bare, bare=True, initial_branch="main")
+        self.work = Repo.init(root / "work", initial_branch="main")
+        self.work.create_remote("origin", str(self.bare))
+        self.url = f"file://{self.bare}"
+
+    def commit(self, files: dict[str, str | None], message: str) -> str:
+        """Write (or delete, for None) files, commit and push; returns the commit SHA."""
+        root = Path(self.work.working_tree_dir)
+        for name, content in files.items():
+            path = root / name
+            if content is None:
+                self.work.index.remove([name], working_tree=True)
+                continue
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(content)
+            self.work.index.add([name])
+        sha = self.work.index.commit(message, author=AUTHOR, committer=AUTHOR).hexsha
+        self.work.git.push("origin", "main")
+        return sha
+
+    def rename(self, old: str, new: str) -> str:
+        self.work.index.move([old, new])
+        sha = self.work.index.commit(f"rename {old}", author=AUTHOR, committer=AUTHOR).hexsha
+        self.work.git.push("origin", "main")
+        return sha
+
+
+@pytest.fixture
+def upstream(tmp_path):
+    return Upstream(tmp_path)
+
+
+@pytest.fixture
+def spec(tmp_path, upstream):
+    return RepoSpec(namespace="demo", url=upstream.url, ref="", dir=str(tmp_path / "clone"))
+
+
+@pytest.fixture(autouse=True)
+def shallow_clone(monkeypatch):
+    # The default clone shape: depth 1, blobs fetched on demand
+    monkeypatch.setattr(settings, "REPO_CLONE_DEPTH", 1)
+    monkeypatch.setattr(settings, "REPO_CLONE_FILTER", "blob:none")
+
+
+def test_update_clones_then_fetches_new_commits(upstream, spec):
+    first = upstream.commit({"pkg/a.py": "A = 1\n"}, "first")
+    repo_manager._update_repo_sync(spec)
+    assert repo_manager.head_commit(spec.dir) == first
+    assert Repo(spec.dir).git.rev_parse("--is-shallow-repository") == "true"
+
+    second = upstream.commit({"pkg/b.py": "B = 2\n"}, "second")
+    repo_manager._update_repo_sync(spec)
+    assert repo_manager.head_commit(spec.dir) == second
+    assert (Path(spec.dir) / "pkg/b.py").read_text() == "B = 2\n"
+
+
+def test_fetch_and_reset_discards_local_changes(upstream, spec):
+    upstream.commit({"a.py": "A = 1\n"}, "first")
+    repo_manager._update_repo_sync(spec)
+    clone = Path(spec.dir)
+    (clone / "a.py").write_text("A = 'edited'\n")
+    (clone / "stray.py").write_text("junk\n")
+
+    latest = upstream.commit({"a.py": "A = 2\n"}, "second")
+    repo_manager._fetch_and_reset(Repo(spec.dir), spec)
+
+    assert repo_manager.head_commit(spec.dir) == latest
+    assert (clone / "a.py").read_text() == "A = 2\n"
+    assert not (clone / "stray.py").exists()
+
+
+def test_update_reclones_when_the_remote_changes(tmp_path, upstream, spec):
+    upstream.commit({"a.py": "A = 1\n"}, "first")
+    repo_manager._update_repo_sync(spec)
+
+    other = Upstream(tmp_path / "other")
+    sha = other.commit({"z.py": "Z = 1\n"}, "other")
+    moved = RepoSpec(namespace=spec.namespace, url=other.url, ref="", dir=spec.dir)
+    repo_manager._update_repo_sync(moved)
+
+    assert repo_manager.head_commit(spec.dir) == sha
+    assert Repo(spec.dir).remotes.origin.url == other.url
+    assert not (Path(spec.dir) / "a.py").exists()
+
+
+def test_update_reclones_without_origin(upstream, spec):
+    upstream.commit({"a.py": "A = 1\n"}, "first")
+    repo_manager._update_repo_sync(spec)
+    Repo(spec.dir).delete_remote("origin")
+    (Path(spec.dir) / "stray.py").write_text("junk\n")
+
+    latest = upstream.commit({"b.py": "B = 1\n"}, "second")
+    repo_manager._update_repo_sync(spec)
+
+    assert repo_manager.head_commit(spec.dir) == latest
+    assert Repo(spec.dir).remotes.origin.url == upstream.url
+    assert not (Path(spec.dir) / "stray.py").exists()
+
+
+def test_diff_since_after_shallow_fetch(upstream, spec):
+    base = upstream.commit(
+        {
+            "keep.py": "K = 1\n",
+            "edit.py": "E = 1\n",
+            "gone.py": "G = 1\n",
+            "old_name.py": "def moved():\n    return 'same content, new path'\n",
+            "README.md": "docs\n",
+        },
+        "base",
+    )
+    repo_manager._update_repo_sync(spec)
+
+    upstream.commit({"edit.py": "E = 2\n", "new.py": "N = 1\n", "gone.py": None, "README.md": "more\n"}, "change")
+    upstream.rename("old_name.py", "new_name.py")
+    repo_manager._update_repo_sync(spec)
+
+    root = Path(spec.dir)
+    changed, removed = repo_manager._diff_since(root, base)
+    assert sorted(changed) == sorted(str(root / n) for n in ("edit.py", "new.py", "new_name.py"))
+    assert sorted(removed) == sorted(str(root / n) for n in ("gone.py", "old_name.py"))
+
+
+def test_diff_since_unknown_commit(upstream, spec):
+    upstream.commit({"a.py": "A = 1\n"}, "first")
+    repo_manager._update_repo_sync(spec)
+    assert repo_manager._diff_since(Path(spec.dir), "0" * 40) is None
+
+
+@pytest.fixture
+def memory_graph(monkeypatch):
+    monkeypatch.setattr(settings, "GRAPH_BACKEND", "memory")
+    monkeypatch.setattr(settings, "GRAPH_SNAPSHOT", "")
+    monkeypatch.setattr(settings, "PARSE_CACHE_DIR", "")
+    monkeypatch.setattr(settings, "INDEX_CHECKPOINT_DIR", "")
+    monkeypatch.setattr(settings, "INDEX_WORKERS", 1)
+    monkeypatch.setattr(backend, "_backend", None)
+    return backend.get_backend()
+
+
+async def test_full_then_incremental_index(upstream, spec, memory_graph):
+    upstream.commit(
+        {"app/a.py": "def a():\n    return b()\n", "app/b.py": "def b():\n    return 1\n", "gen/c.py": "C = 1\n"},
+        "base",
+    )
+    result = await repo_manager.index_repository(spec=spec)
+    root = Path(spec.dir).resolve()
+    assert result["mode"] == "full" and result["indexed_files"] == 3 and result["failed_files"] == 0
+    assert sorted(await get_file_hashes("demo")) == [str(root / n) for n in ("app/a.py", "app/b.py", "gen/c.py")]
+
+    # A tightened policy retracts gen/ on the git-diff path as well
+    upstream.commit({"app/b.py": "def b():\n    return 2\n"}, "edit")
+    policy = PathPolicy.from_settings(exclude=["gen/*"])
+    result = await repo_manager.index_repository(incremental=True, policy=policy, spec=spec)
+    assert result["previous_commit"] is not None
+    assert (result["indexed_files"], result["removed_files"]) == (1, 1)
+    assert sorted(await get_file_hashes("demo")) == [str(root / n) for n in ("app/a.py", "app/b.py")]
+
+
+@pytest.fixture
+def checkpoint_store(tmp_path, monkeypatch, memory_graph):
+    monkeypatch.setattr(settings, "INDEX_CHECKPOINT_DIR", str(tmp_path / "checkpoints"))
+    monkeypatch.setattr(checkpoints, "_store", None)
+    return checkpoints.get_checkpoints()
+
+
+def failing_writes(monkeypatch, failing: set[str]):
+    """Make write_entities fail for the files named in `failing`."""
+    write = pipeline.write_entities
+
+    async def flaky(recs, generation, repo):
+        if any(Path(rec.path).name in failing for rec in recs):
+            raise RuntimeError("Neo4j unavailable")
+        return await write(recs, generation, repo)
+
+    monkeypatch.setattr(pipeline, "write_entities", flaky)
+
+
+async def test_resubmitted_run_skips_finished_files(upstream, spec, checkpoint_store, monkeypatch):
+    head = upstream.commit({"a.py": "A = 1\n", "b.py": "B = 1\n", "c.py": "C = 1\n"}, "base")
+
+    write = pipeline.write_entities
+    failing_writes(monkeypatch, {"c.py"})
+    first = await repo_manager.index_repository(spec=spec)
+    assert (first["indexed_files"], first["failed_files"], first["resumed"]) == (2, 1, False)
+    assert await get_indexed_commit("demo") is None
+
+    # The same commit again: the unfinished run is resumed
+    monkeypatch.setattr(pipeline, "write_entities", write)
+    second = await repo_manager.index_repository(spec=spec)
+    assert (second["resumed"], second["generation"], second["commit"]) == (True, first["generation"], head)
+    assert (second["checkpointed_files"], second["indexed_files"], second["failed_files"]) == (2, 1, 0)
+    assert await get_indexed_commit("demo") == head
+    assert len(await get_file_hashes("demo")) == 3
+
+    # Finalized: the next run starts afresh
+    third = await repo_manager.index_repository(spec=spec)
+    assert (third["resumed"], third["checkpointed_files"], third["indexed_files"]) == (False, 0, 3)
+    assert third["generation"] > first["generation"]
+
+
+async def test_checkpoint_errors_do_not_fail_the_run(upstream, spec, checkpoint_store, monkeypatch):
+    upstream.commit({"a.py": "A = 1\n", "b.py": "B = 1\n"}, "base")
+
+    def locked(*args):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(checkpoint_store, "mark_done", locked)
+    result = await repo_manager.index_repository(spec=spec)
+    assert (result["indexed_files"], result["failed_files"]) == (2, 0)
+    assert len(await get_file_hashes("demo")) == 2
@@ -0,0 +1,67 @@
+# tests/indexer_agent/test_watcher.py
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from app.config import settings
+from app.graph import backend
+from app.graph.index_state import get_file_hashes
+from app.indexing import watcher
+from app.indexing.path_policy import PathPolicy
+from app.indexing.repo_spec import RepoSpec
+
+
+@pytest.fixture
+def spec(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "GRAPH_BACKEND", "memory")
+    monkeypatch.setattr(settings, "GRAPH_SNAPSHOT", "")
+    monkeypatch.setattr(settings, "PARSE_CACHE_DIR", "")
+    monkeypatch.setattr(settings, "WATCH_POLL_INTERVAL", 0.02)
+    monkeypatch.setattr(backend, "_backend", None)
+    root = tmp_path / "clone"
+    root.mkdir()
+    return RepoSpec(namespace="watched", url="", ref="", dir=str(root))
+
+
+async def wait_for(condition, timeout: float = 5.0):
+    async with asyncio.timeout(timeout):
+        while not condition():
+            await asyncio.sleep(0.01)
+
+
+async def test_poll_debounces_indexes_and_retracts(spec):
+    root = Path(spec.dir).resolve()
+    (root / "a.py").write_text("A = 1\n")
+    status = await watcher.start_watching(debounce_ms=200, backend="poll", spec=spec)
+    assert (status["backend"], status["running"]) == ("poll", True)
+    (w,) = watcher._watchers.values()
+    try:
+        # A burst of changes is flushed once, after it settles
+        for i in range(3):
+            (root / "a.py").write_text(f"A = {i + 2}\n")
+            (root / "b.py").write_text(f"def b():\n    return {i}\n")
+            (root / "notes.txt").write_text("not python\n")
+            await asyncio.sleep(0.05)
+        await wait_for(lambda: w.stats["flushes"] == 1)
+        assert (w.last_flush["files"], w.last_flush["indexed"]) == (2, 2)
+        assert sorted(await get_file_hashes("watched")) == [str(root / "a.py"), str(root / "b.py")]
+
+        (root / "b.py").unlink()
+        await wait_for(lambda: w.stats["flushes"] == 2)
+        assert w.last_flush["removed"] == 1
+        assert list(await get_file_hashes("watched")) == [str(root / "a.py")]
+        assert (w.stats["indexed"], w.stats["removed"], w.stats["failed"]) == (2, 1, 0)
+    finally:
+        assert (await watcher.stop_watching("watched"))["stopped"] == ["watched"]
+    assert not w.running
+
+
+def test_wanted_survives_files_vanishing(spec, monkeypatch):
+    w = watcher.RepoWatcher(spec, PathPolicy.from_settings(), 100, "poll")
+    gone = str(Path(w.root) / "gone.py")
+    # Deleted between the event and the size check
+    monkeypatch.setattr(Path, "exists", lambda self: True)
+    assert w._wanted(gone)
+    assert not w._wanted(str(Path(w.root) / ".git/hooks/x.py"))
+    assert not w._wanted("/elsewhere/x.py")